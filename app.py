@@ -1,15 +1,24 @@
 import streamlit as st
-import requests
-import httpx
-import asyncio
-from urllib.parse import urlparse
-import re
-import json
-from collections import Counter
 import pandas as pd
-from typing import List, Dict, Any
-import time
-import random
+import numpy as np
+from typing import List, Dict, Any, Union
+
+from webintel.analyzer import HTMLAnalyzer, analysis_version
+from webintel.archive import ARCHIVE_AVAILABLE, ARCHIVE_FORMATS, DEFAULT_ARCHIVE_DIR, archive_bytes, frame_records, list_runs, load_archive, write_archive
+from webintel.body import DEFAULT_MAX_BODY_BYTES
+from webintel.cache import AnalysisCache, FetchCache
+from webintel.crawl import DEFAULT_MAX_DEPTH, DEFAULT_MAX_PAGES, SiteCrawler, format_crawl_stats
+from webintel.fetcher import AsyncFetcher, DEFAULT_CONCURRENCY, DEFAULT_PER_HOST, DEFAULT_HEDGE_DELAY
+from webintel.fetchmetrics import PHASES, FetchMetrics
+from webintel.frame import DEFAULT_CONFIDENCE, compare_groups, results_frame, short_text
+from webintel.history import CHANGE_DIRECTIONS, DEFAULT_HISTORY_PATH, METRIC_NAMES, HistoryStore
+from webintel.incremental import PageSnapshots, format_incremental_stats
+from webintel.pipeline import AnalysisPipeline
+from webintel.profiling import BatchProfile
+from webintel.ratelimit import DEFAULT_RATE, HostRateLimiter
+from webintel.registry import METRIC_GROUPS
+from webintel.runs import BatchRun, ReplayFetcher, RunCache, run_key
+from webintel.sitemap import SitemapReader, format_sitemap_stats
 
 # Configure page
 st.set_page_config(
@@ -19,574 +28,34 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-class HTMLAnalyzer:
-    def __init__(self):
-        self.session = requests.Session()
-        # Rotate between multiple realistic user agents
-        self.user_agents = [
-            # Chrome on Windows
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
-            
-            # Firefox on Windows
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0',
-            
-            # Chrome on Mac
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            
-            # Safari on Mac
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebLib/605.1.15 (KHTML, like Gecko) Version/16.6 Safari/605.1.15',
-            
-            # Edge on Windows
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
-            
-            # Chrome on Linux
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        ]
-        
-        # Base headers that will be updated per request
-        self.base_headers = {
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Cache-Control': 'max-age=0',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Upgrade-Insecure-Requests': '1',
-            'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-            'sec-ch-ua-mobile': '?0',
-            'sec-ch-ua-platform': '"Windows"'
-        }
-    
-    def get_stealth_headers(self):
-        """Generate realistic, randomized headers for each request"""
-        user_agent = random.choice(self.user_agents)
-        headers = self.base_headers.copy()
-        headers['User-Agent'] = user_agent
-        
-        # Add some randomization to headers
-        if random.random() > 0.5:
-            headers['DNT'] = '1'
-        
-        # Randomize Accept-Language slightly
-        languages = ['en-US,en;q=0.9', 'en-US,en;q=0.9,es;q=0.8', 'en-US,en;q=0.9,fr;q=0.8']
-        headers['Accept-Language'] = random.choice(languages)
-        
-        # Sometimes add referer (as if coming from Google)
-        if random.random() > 0.7:
-            headers['Referer'] = 'https://www.google.com/'
-        
-        return headers
+# Head-to-head group colors, in group order
+GROUP_MARKERS = ['🔵', '🔴', '🟢', '🟡', '🟣', '🟠', '🟤', '⚫']
 
-    def fetch_html(self, url: str, timeout: int = 10) -> Dict[str, Any]:
-        """
-        Fetch HTML content from URL with advanced anti-detection methods
-        """
-        try:
-            # Ensure URL has protocol
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
-            
-            # Add small random delay to avoid detection
-            time.sleep(random.uniform(0.25, 1.0))
-            
-            # Method 1: Stealth requests with rotating headers
-            stealth_headers = self.get_stealth_headers()
-            
-            # Create a fresh session for each request to avoid tracking
-            fresh_session = requests.Session()
-            fresh_session.headers.update(stealth_headers)
-            
-            # Set additional session parameters
-            fresh_session.max_redirects = 10
-            
-            response = fresh_session.get(
-                url, 
-                timeout=timeout, 
-                allow_redirects=True,
-                verify=True,  # Keep SSL verification
-                stream=False
-            )
-            response.raise_for_status()
-            
-            return {
-                'success': True,
-                'html': response.text,
-                'status_code': response.status_code,
-                'headers': dict(response.headers),
-                'url': str(response.url),
-                'method': 'stealth_requests'
-            }
-            
-        except requests.exceptions.RequestException as e:
-            # Method 2: Try with httpx and different headers
-            try:
-                stealth_headers = self.get_stealth_headers()
-                
-                with httpx.Client(
-                    timeout=timeout,
-                    headers=stealth_headers,
-                    follow_redirects=True,
-                    verify=True
-                ) as client:
-                    response = client.get(url)
-                    response.raise_for_status()
-                    
-                    return {
-                        'success': True,
-                        'html': response.text,
-                        'status_code': response.status_code,
-                        'headers': dict(response.headers),
-                        'url': str(response.url),
-                        'method': 'stealth_httpx'
-                    }
-                    
-            except Exception as httpx_error:
-                # Method 3: Try with minimal headers (sometimes less is more)
-                try:
-                    minimal_headers = {
-                        'User-Agent': random.choice(self.user_agents),
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
-                    }
-                    
-                    response = requests.get(
-                        url,
-                        headers=minimal_headers,
-                        timeout=timeout,
-                        allow_redirects=True
-                    )
-                    response.raise_for_status()
-                    
-                    return {
-                        'success': True,
-                        'html': response.text,
-                        'status_code': response.status_code,
-                        'headers': dict(response.headers),
-                        'url': str(response.url),
-                        'method': 'minimal_headers'
-                    }
-                    
-                except Exception as minimal_error:
-                    return {
-                        'success': False,
-                        'error': f"All methods failed - Primary method: {str(e)} | Secondary method: {str(httpx_error)} | Minimal headers: {str(minimal_error)}",
-                        'url': url
-                    }
-    
-    def analyze_html_structure(self, html: str, fetch_result: Dict = None) -> Dict[str, Any]:
-        """
-        Analyze HTML structure and provide insights
-        """
-        analysis = {}
-        
-        # Basic metrics
-        analysis['total_length'] = len(html)
-        analysis['total_lines'] = len(html.split('\n'))
-        
-        # Tag analysis
-        tags = re.findall(r'<(\w+)[^>]*>', html, re.IGNORECASE)
-        tag_counts = Counter(tags)
-        analysis['total_tags'] = len(tags)
-        analysis['unique_tags'] = len(tag_counts)
-        analysis['most_common_tags'] = tag_counts.most_common(10)
-        
-        # HTML5 semantic tags
-        semantic_tags = ['header', 'nav', 'main', 'section', 'article', 'aside', 'footer']
-        analysis['semantic_tags_used'] = [tag for tag in semantic_tags if tag in tag_counts]
-        
-        # Meta tags
-        meta_tags = re.findall(r'<meta[^>]*>', html, re.IGNORECASE)
-        analysis['meta_tags_count'] = len(meta_tags)
-        
-        # External resources
-        analysis['external_css'] = len(re.findall(r'<link[^>]*rel=["\']stylesheet["\'][^>]*>', html, re.IGNORECASE))
-        analysis['external_js'] = len(re.findall(r'<script[^>]*src=[^>]*>', html, re.IGNORECASE))
-        analysis['inline_css'] = len(re.findall(r'<style[^>]*>.*?</style>', html, re.IGNORECASE | re.DOTALL))
-        analysis['inline_js'] = len(re.findall(r'<script[^>]*>.*?</script>', html, re.IGNORECASE | re.DOTALL))
-        
-        # Images
-        img_tags = re.findall(r'<img[^>]*>', html, re.IGNORECASE)
-        analysis['images_count'] = len(img_tags)
-        
-        # Forms
-        analysis['forms_count'] = len(re.findall(r'<form[^>]*>', html, re.IGNORECASE))
-        
-        # Framework detection
-        frameworks = self.detect_frameworks(html)
-        analysis['frameworks_detected'] = frameworks
-        
-        # Performance insights
-        analysis['performance_insights'] = self.get_performance_insights(analysis)
-        
-        # New AEO Analysis Dimensions
-        current_url = fetch_result.get('url', '') if fetch_result else ''
-        analysis.update(self.analyze_html_tables(html))
-        analysis.update(self.analyze_atomic_paragraphs(html))
-        analysis.update(self.analyze_year_inclusion(html, current_url))
-        analysis.update(self.analyze_bulleted_lists(html))
-        analysis.update(self.analyze_semantic_urls(current_url, html))
-        analysis.update(self.analyze_subfolder_structure(current_url, html))
-        analysis.update(self.analyze_html_vs_js(html))
-        analysis.update(self.analyze_schema_markup(html))
-        analysis.update(self.analyze_h_tags(html))
-        
-        return analysis
-    
-    def detect_frameworks(self, html: str) -> List[str]:
-        """
-        Detect popular frameworks and libraries
-        """
-        frameworks = []
-        
-        # React
-        if 'react' in html.lower() or 'data-reactroot' in html.lower():
-            frameworks.append('React')
-        
-        # Vue.js
-        if 'vue' in html.lower() or 'v-if' in html.lower() or 'v-for' in html.lower():
-            frameworks.append('Vue.js')
-        
-        # Angular
-        if 'angular' in html.lower() or 'ng-' in html.lower():
-            frameworks.append('Angular')
-        
-        # jQuery
-        if 'jquery' in html.lower():
-            frameworks.append('jQuery')
-        
-        # Bootstrap
-        if 'bootstrap' in html.lower():
-            frameworks.append('Bootstrap')
-        
-        # Tailwind CSS
-        if 'tailwind' in html.lower() or re.search(r'class="[^"]*\b(flex|grid|bg-|text-|p-|m-)', html):
-            frameworks.append('Tailwind CSS')
-        
-        # WordPress
-        if 'wp-content' in html.lower() or 'wordpress' in html.lower():
-            frameworks.append('WordPress')
-        
-        return frameworks
-    
-    def get_performance_insights(self, analysis: Dict) -> List[str]:
-        """
-        Generate performance insights based on analysis
-        """
-        insights = []
-        
-        if analysis['external_css'] > 5:
-            insights.append(f"High number of external CSS files ({analysis['external_css']}) - consider bundling")
-        
-        if analysis['external_js'] > 10:
-            insights.append(f"High number of external JS files ({analysis['external_js']}) - consider bundling")
-        
-        if analysis['images_count'] > 20:
-            insights.append(f"High number of images ({analysis['images_count']}) - consider lazy loading")
-        
-        if analysis['total_length'] > 1000000:  # 1MB
-            insights.append("Large HTML size - consider minification and optimization")
-        
-        if not analysis['semantic_tags_used']:
-            insights.append("No HTML5 semantic tags found - consider improving accessibility")
-        
-        return insights
-    
-    def analyze_html_tables(self, html: str) -> Dict[str, Any]:
-        """Analyze HTML table structure and data density"""
-        table_tags = re.findall(r'<table[^>]*>.*?</table>', html, re.IGNORECASE | re.DOTALL)
-        
-        analysis = {
-            'tables_count': len(table_tags),
-            'avg_rows_per_table': 0,
-            'table_data_density': 0
-        }
-        
-        if table_tags:
-            total_rows = 0
-            total_data_cells = 0
-            total_cells = 0
-            
-            for table in table_tags:
-                # Count rows
-                rows = re.findall(r'<tr[^>]*>', table, re.IGNORECASE)
-                total_rows += len(rows)
-                
-                # Count cells with numeric data
-                cells = re.findall(r'<(?:td|th)[^>]*>(.*?)</(?:td|th)>', table, re.IGNORECASE | re.DOTALL)
-                total_cells += len(cells)
-                
-                for cell in cells:
-                    # Check if cell contains numeric data
-                    if re.search(r'\d+', cell):
-                        total_data_cells += 1
-            
-            analysis['avg_rows_per_table'] = total_rows / len(table_tags)
-            analysis['table_data_density'] = total_data_cells / total_cells if total_cells > 0 else 0
-        
-        return analysis
-    
-    def analyze_atomic_paragraphs(self, html: str) -> Dict[str, Any]:
-        """Analyze paragraph structure for AEO optimization"""
-        # Find all paragraph tags
-        paragraphs = re.findall(r'<p[^>]*>(.*?)</p>', html, re.IGNORECASE | re.DOTALL)
-        
-        analysis = {
-            'paragraphs_count': len(paragraphs),
-            'avg_paragraph_length': 0,
-            'atomic_paragraph_ratio': 0
-        }
-        
-        if paragraphs:
-            word_counts = []
-            atomic_count = 0
-            
-            for p in paragraphs:
-                # Remove HTML tags and count words
-                clean_text = re.sub(r'<[^>]+>', '', p)
-                words = len(clean_text.split())
-                word_counts.append(words)
-                
-                # Count atomic paragraphs (≤ 100 words)
-                if words <= 100:
-                    atomic_count += 1
-            
-            analysis['avg_paragraph_length'] = sum(word_counts) / len(word_counts)
-            analysis['atomic_paragraph_ratio'] = atomic_count / len(paragraphs)
-        
-        return analysis
-    
-    def analyze_year_inclusion(self, html: str, url: str) -> Dict[str, Any]:
-        """Analyze 2025 year inclusion for freshness signals"""
-        analysis = {
-            'url_year_inclusion': 0,
-            'title_year_inclusion': 0,
-            'meta_year_inclusion': 0,
-            'early_content_year_inclusion': 0
-        }
-        
-        # URL year inclusion
-        if url and '2025' in url:
-            analysis['url_year_inclusion'] = 1
-        
-        # Title year inclusion
-        title_match = re.search(r'<title[^>]*>(.*?)</title>', html, re.IGNORECASE | re.DOTALL)
-        if title_match and '2025' in title_match.group(1):
-            analysis['title_year_inclusion'] = 1
-        
-        # Meta description year inclusion
-        meta_desc = re.search(r'<meta[^>]*name=["\']description["\'][^>]*content=["\']([^"\']*)["\']', html, re.IGNORECASE)
-        if meta_desc and '2025' in meta_desc.group(1):
-            analysis['meta_year_inclusion'] = 1
-        
-        # First 200 characters of visible text
-        # Remove script and style content
-        clean_html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.IGNORECASE | re.DOTALL)
-        clean_html = re.sub(r'<style[^>]*>.*?</style>', '', clean_html, flags=re.IGNORECASE | re.DOTALL)
-        
-        # Extract visible text
-        visible_text = re.sub(r'<[^>]+>', '', clean_html)
-        visible_text = re.sub(r'\s+', ' ', visible_text).strip()
-        
-        if len(visible_text) >= 200 and '2025' in visible_text[:200]:
-            analysis['early_content_year_inclusion'] = 1
-        
-        return analysis
-    
-    def analyze_bulleted_lists(self, html: str) -> Dict[str, Any]:
-        """Analyze list structures for snippet optimization"""
-        ul_lists = re.findall(r'<ul[^>]*>.*?</ul>', html, re.IGNORECASE | re.DOTALL)
-        ol_lists = re.findall(r'<ol[^>]*>.*?</ol>', html, re.IGNORECASE | re.DOTALL)
-        all_lists = ul_lists + ol_lists
-        
-        # Count paragraphs for coverage ratio
-        paragraphs = re.findall(r'<p[^>]*>', html, re.IGNORECASE)
-        
-        analysis = {
-            'lists_count': len(all_lists),
-            'avg_items_per_list': 0,
-            'list_coverage_ratio': 0
-        }
-        
-        if all_lists:
-            total_items = 0
-            
-            for list_html in all_lists:
-                items = re.findall(r'<li[^>]*>', list_html, re.IGNORECASE)
-                total_items += len(items)
-            
-            analysis['avg_items_per_list'] = total_items / len(all_lists)
-            analysis['list_coverage_ratio'] = total_items / (len(paragraphs) + total_items) if (len(paragraphs) + total_items) > 0 else 0
-        
-        return analysis
-    
-    def analyze_semantic_urls(self, url: str, html: str) -> Dict[str, Any]:
-        """Analyze URL semantic structure"""
-        analysis = {
-            'url_token_count': 0,
-            'keyword_presence_ratio': 0,
-            'stopword_ratio': 0
-        }
-        
-        if not url:
-            return analysis
-        
-        # Parse URL path
-        parsed_url = urlparse(url)
-        path = parsed_url.path.strip('/')
-        
-        if path:
-            # Split on common separators
-            tokens = re.split(r'[-_/]+', path)
-            tokens = [t for t in tokens if t]  # Remove empty tokens
-            
-            analysis['url_token_count'] = len(tokens)
-            
-            if tokens:
-                # Get H2/H3 keywords for comparison
-                h2_h3_text = ''
-                h2_matches = re.findall(r'<h[23][^>]*>(.*?)</h[23]>', html, re.IGNORECASE | re.DOTALL)
-                for match in h2_matches:
-                    h2_h3_text += re.sub(r'<[^>]+>', '', match).lower() + ' '
-                
-                # Count keyword matches
-                keyword_matches = 0
-                for token in tokens:
-                    if token.lower() in h2_h3_text:
-                        keyword_matches += 1
-                
-                analysis['keyword_presence_ratio'] = keyword_matches / len(tokens)
-                
-                # Count stopwords
-                stopwords = {'and', 'the', 'of', 'to', 'a', 'in', 'for', 'is', 'on', 'with', 'as', 'by', 'at', 'or', 'an'}
-                stopword_count = sum(1 for token in tokens if token.lower() in stopwords)
-                analysis['stopword_ratio'] = stopword_count / len(tokens)
-        
-        return analysis
-    
-    def analyze_subfolder_structure(self, url: str, html: str) -> Dict[str, Any]:
-        """Analyze subfolder organization and depth"""
-        analysis = {
-            'subfolder_page_ratio': 0,
-            'url_depth': 0,
-            'deep_link_density': 0,
-            'most_common_subfolder': ''
-        }
-        
-        if not url:
-            return analysis
-        
-        parsed_url = urlparse(url)
-        path_segments = [s for s in parsed_url.path.split('/') if s]
-        
-        analysis['url_depth'] = len(path_segments)
-        analysis['subfolder_page_ratio'] = 1 if len(path_segments) >= 2 else 0
-        
-        if path_segments:
-            analysis['most_common_subfolder'] = path_segments[0]
-        
-        # Analyze internal links depth
-        domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
-        internal_links = re.findall(rf'href=["\']({re.escape(domain)}[^"\']*)["\']', html, re.IGNORECASE)
-        
-        if internal_links:
-            deep_links = 0
-            for link in internal_links:
-                link_path = urlparse(link).path
-                link_segments = [s for s in link_path.split('/') if s]
-                if len(link_segments) >= 2:
-                    deep_links += 1
-            
-            analysis['deep_link_density'] = deep_links / len(internal_links)
-        
-        return analysis
-    
-    def analyze_html_vs_js(self, html: str) -> Dict[str, Any]:
-        """Analyze HTML vs JavaScript content balance"""
-        # Calculate HTML content size
-        html_size = len(html.encode('utf-8'))
-        
-        # Find and calculate JavaScript content size
-        js_content = re.findall(r'<script[^>]*>(.*?)</script>', html, re.IGNORECASE | re.DOTALL)
-        js_size = sum(len(js.encode('utf-8')) for js in js_content)
-        
-        # Count external JS references
-        external_js = re.findall(r'<script[^>]*src=[^>]*>', html, re.IGNORECASE)
-        
-        # Count script tag hooks
-        script_tags = re.findall(r'<script[^>]*>', html, re.IGNORECASE)
-        total_tags = len(re.findall(r'<[^>]+>', html))
-        
-        analysis = {
-            'html_js_byte_ratio': html_size / (html_size + js_size) if (html_size + js_size) > 0 else 1,
-            'script_tag_density': len(script_tags) / total_tags if total_tags > 0 else 0,
-            'external_js_count': len(external_js),
-            'inline_js_size': js_size
-        }
-        
-        return analysis
-    
-    def analyze_schema_markup(self, html: str) -> Dict[str, Any]:
-        """Analyze Schema.org structured data"""
-        # Find JSON-LD blocks
-        jsonld_blocks = re.findall(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', 
-                                  html, re.IGNORECASE | re.DOTALL)
-        
-        analysis = {
-            'schema_blocks_count': len(jsonld_blocks),
-            'jsonld_blocks_count': len(jsonld_blocks),
-            'schema_types': [],
-            'schema_type_count': 0
-        }
-        
-        schema_types = set()
-        
-        for block in jsonld_blocks:
-            try:
-                data = json.loads(block.strip())
-                
-                # Handle both single objects and arrays
-                if isinstance(data, list):
-                    for item in data:
-                        if isinstance(item, dict) and '@type' in item:
-                            schema_types.add(item['@type'])
-                elif isinstance(data, dict) and '@type' in data:
-                    schema_types.add(data['@type'])
-                    
-            except json.JSONDecodeError:
-                continue
-        
-        analysis['schema_types'] = list(schema_types)
-        analysis['schema_type_count'] = len(schema_types)
-        
-        return analysis
-    
-    def analyze_h_tags(self, html: str) -> Dict[str, Any]:
-        """Analyze heading tag structure for AEO"""
-        h2_tags = re.findall(r'<h2[^>]*>', html, re.IGNORECASE)
-        h3_tags = re.findall(r'<h3[^>]*>', html, re.IGNORECASE)
-        
-        # Count content blocks (paragraphs and div elements that could be content)
-        paragraphs = re.findall(r'<p[^>]*>', html, re.IGNORECASE)
-        content_divs = re.findall(r'<div[^>]*class=[^>]*(?:content|text|article)[^>]*>', html, re.IGNORECASE)
-        total_content_blocks = len(paragraphs) + len(content_divs)
-        
-        # Count paragraphs that follow H2/H3 tags
-        # This is a simplified approach - we'll count H2/H3 tags as proxies
-        headings_count = len(h2_tags) + len(h3_tags)
-        
-        analysis = {
-            'h2_count': len(h2_tags),
-            'h3_count': len(h3_tags),
-            'heading_coverage_ratio': headings_count / total_content_blocks if total_content_blocks > 0 else 0
-        }
-        
-        return analysis
+# Sidebar names of the metric groups in webintel.registry
+METRIC_GROUP_LABELS = {
+    'structure': "🏗️ Structure",
+    'content': "🎯 Paragraphs & headings",
+    'freshness': "🗓️ Freshness",
+    'tables_lists': "📊 Tables & lists",
+    'urls': "🔗 URLs & links",
+    'javascript': "⚡ HTML vs JavaScript",
+    'frameworks_schema': "📱 Frameworks & schema",
+}
+
+@st.cache_resource
+def get_analysis_cache() -> AnalysisCache:
+    """Analysis memo shared by every session of this server"""
+    return AnalysisCache()
+
+@st.cache_resource
+def get_run_cache() -> RunCache:
+    """Finished batches shared by every session, so repeating a batch costs no network"""
+    return RunCache()
+
+@st.cache_resource
+def get_history_store(path: str) -> HistoryStore:
+    """History database at ``path``, opened once per server"""
+    return HistoryStore(path)
 
 def main():
     st.title("🔍 WebIntel - AEO HTML Analysis Tool")
@@ -610,8 +79,8 @@ def main():
     st.header("📊 Analysis Mode")
     analysis_mode = st.radio(
         "Choose your analysis mode:",
-        ["🔍 Single Analysis", "⚔️ Head-to-Head Comparison"],
-        help="Single Analysis: Analyze one set of URLs. Head-to-Head: Compare two sets of URLs against each other."
+        ["🔍 Single Analysis", "⚔️ Head-to-Head Comparison", "🕸️ Site Crawl", "📂 Archived Results", "📈 Trends"],
+        help="Single Analysis: Analyze one set of URLs. Head-to-Head: Compare two or more sets of URLs against each other. Site Crawl: Follow internal links from start URLs and analyze every page. Archived Results: Reopen saved runs without fetching anything. Trends: Follow metrics across recorded runs."
     )
     
     # Sidebar configuration
@@ -619,27 +88,98 @@ def main():
         st.header("⚙️ Configuration")
         timeout = st.slider("Request Timeout (seconds)", 5, 60, 15)
         max_urls = st.number_input("Max URLs to process per group", 1, 50, 10)
+        concurrency = st.slider("Concurrent requests", 1, 20, DEFAULT_CONCURRENCY, help="Maximum requests in flight at once")
+        per_host = st.slider("Concurrent requests per host", 1, 8, DEFAULT_PER_HOST, help="Maximum requests in flight against a single host")
+        max_page_mb = st.slider("Max page size (MB)", 1, 50, DEFAULT_MAX_BODY_BYTES // (1024 * 1024), help="Larger pages and non-HTML responses are dropped while downloading")
         
         st.subheader("🌐 Request Settings")
         st.info("Advanced request features:")
         st.write("✅ Rotating User Agents (11 different browsers)")
         st.write("✅ Randomized Headers")
-        st.write("✅ Random Delays (0.5-2.0s)")
-        st.write("✅ Fresh Sessions per Request")
+        st.write("✅ Per-Host Rate Limiting with Jitter")
+        st.write("✅ Pooled Keep-Alive Connections")
         st.write("✅ Multiple Fallback Methods")
+        st.write("✅ Concurrent Fetching")
         
-        stealth_delay = st.checkbox("Additional Delays", value=False, help="Add longer random delays between requests (2-5 seconds)")
+        http2 = st.checkbox("HTTP/2", value=False, help="Multiplex requests to the same host over HTTP/2 where the server supports it")
+        hedged = st.checkbox("Hedged Fallbacks", value=False, help=f"Start the next fallback method if a request has not answered within {DEFAULT_HEDGE_DELAY:.0f}s; the request timeout bounds the whole chain")
+        rate = st.slider("Requests per second per host", 0.2, 5.0, DEFAULT_RATE, 0.1, help="Different hosts are fetched in parallel; each host gets at most this rate")
+        crawl_delay = st.checkbox("Respect robots.txt Crawl-delay", value=False, help="Slow a host down further when its robots.txt asks for it")
+        stealth_delay = st.checkbox("Additional Delays", value=False, help="Space requests to the same host 2-5 seconds apart")
         
         if stealth_delay:
             st.warning("⏱️ Extra delays enabled - analysis will be slower")
+        
+        st.subheader("💾 Fetch Cache")
+        use_cache = st.checkbox("Cache fetched pages", value=True, help="Reuse recently fetched pages and revalidate older ones with ETag/Last-Modified")
+        cache_ttl_hours = st.slider("Cache freshness (hours)", 1, 168, 24, help="Pages younger than this are not refetched")
+        fetch_cache = FetchCache(ttl=cache_ttl_hours * 3600) if use_cache else None
+        if st.button("🗑️ Clear Cache", help="Forget fetched pages and finished batches"):
+            if fetch_cache is not None:
+                fetch_cache.clear()
+            get_run_cache().clear()
+            st.session_state.pop('single_run', None)
+            st.session_state.pop('head_to_head_runs', None)
+            st.session_state.pop('crawl_run', None)
+            st.success("Cache cleared")
+        
+        st.subheader("🗄️ Results Archive")
+        archive_settings = {
+            'root': st.text_input("Archive folder", value=DEFAULT_ARCHIVE_DIR, help="Runs are saved here partitioned by date and domain, for DuckDB or pandas"),
+            'fmt': st.selectbox("Archive format", ARCHIVE_FORMATS, help="Parquet for analysis tools, Arrow IPC for fast local loading"),
+        } if ARCHIVE_AVAILABLE else None
+        if not ARCHIVE_AVAILABLE:
+            st.caption("Install pyarrow to export and archive results")
+        
+        st.subheader("📈 History")
+        record_history = st.checkbox("Record runs in history", value=True, help="Keep every run's metrics in a local SQLite database for the Trends view")
+        incremental = st.checkbox("Incremental re-analysis", value=True, help="Pages byte-identical to their previous run reuse its metrics instead of being analyzed again")
+        history_path = st.text_input("History database", value=DEFAULT_HISTORY_PATH)
+        history = get_history_store(history_path)
+        history_settings = {
+            'store': history if record_history else None,
+            # Page fingerprints are kept in the same database
+            'snapshots': history_path if incremental else None,
+        }
+        
+        st.subheader("🧮 Metrics")
+        metric_groups = st.multiselect("Metric groups", list(METRIC_GROUPS), default=list(METRIC_GROUPS),
+                                       format_func=METRIC_GROUP_LABELS.get,
+                                       help="Only the analyzers behind the chosen groups run; metrics of the other groups show as 0")
+        # None runs every analyzer
+        metrics = metric_groups if 0 < len(metric_groups) < len(METRIC_GROUPS) else None
+        
+        st.subheader("⏱️ Diagnostics")
+        profile_analyzers = st.checkbox("Profile analyzers", value=False, help="Time every analyzer and show the slowest analyzers and pages (bypasses the analysis cache)")
+    
+    # Passed through to AsyncFetcher
+    fetch_settings = {
+        'concurrency': concurrency,
+        'per_host': per_host,
+        'http2': http2,
+        'hedge_delay': DEFAULT_HEDGE_DELAY if hedged else None,
+        'cache': fetch_cache,
+        'max_bytes': max_page_mb * 1024 * 1024,
+        # Shared by both groups of a comparison so a host is never hit twice as fast
+        'rate_limiter': HostRateLimiter(rate=0.5, burst=1, jitter=3.0, crawl_delay=crawl_delay) if stealth_delay
+                        else HostRateLimiter(rate=rate, crawl_delay=crawl_delay),
+    }
     
     if analysis_mode == "🔍 Single Analysis":
-        run_single_analysis(timeout, max_urls, stealth_delay)
+        run_single_analysis(timeout, max_urls, stealth_delay, fetch_settings, profile_analyzers, archive_settings, history_settings, metrics)
+    elif analysis_mode == "⚔️ Head-to-Head Comparison":
+        run_head_to_head_analysis(timeout, max_urls, stealth_delay, fetch_settings, profile_analyzers, archive_settings, history_settings, metrics)
+    elif analysis_mode == "🕸️ Site Crawl":
+        run_site_crawl(timeout, fetch_settings, profile_analyzers, archive_settings, history_settings, metrics)
+    elif analysis_mode == "📂 Archived Results":
+        run_archive_browser(archive_settings)
     else:
-        run_head_to_head_analysis(timeout, max_urls, stealth_delay)
+        run_trend_view(history)
 
-def run_single_analysis(timeout: int, max_urls: int, stealth_delay: bool):
-    """Run single URL set analysis"""
+def run_single_analysis(timeout: int, max_urls: int, stealth_delay: bool, fetch_settings: Dict[str, Any] = None,
+                        profile_analyzers: bool = False, archive_settings: Dict[str, str] = None,
+                        history_settings: Dict[str, Any] = None, metrics: List[str] = None):
+    """Run single URL set analysis; the last run is kept across reruns"""
     # URL input section
     st.header("1. Enter URLs to Analyze")
     
@@ -647,8 +187,10 @@ def run_single_analysis(timeout: int, max_urls: int, stealth_delay: bool):
     urls_text = st.text_area(
         "Enter URLs (one per line):",
         placeholder="https://example.com\nhttps://google.com\nhttps://github.com",
-        height=150
+        height=150,
+        key="single_urls"
     )
+    sitemap_loader("single_urls", max_urls, timeout)
     
     # Option 2: File upload
     uploaded_file = st.file_uploader("Or upload a text file with URLs", type=['txt', 'csv'])
@@ -659,336 +201,656 @@ def run_single_analysis(timeout: int, max_urls: int, stealth_delay: bool):
     
     # Process URLs
     if st.button("🚀 Analyze URLs", type="primary"):
-        results = analyze_url_list(urls_text, max_urls, timeout, "Analyzing URLs", stealth_delay)
-        
-        if results:
-            display_results(results)
+        st.session_state['single_run'] = analyze_url_list(urls_text, max_urls, timeout, "Analyzing URLs", stealth_delay, fetch_settings, profile_analyzers, history_settings, metrics)
+        add_to_history(st.session_state['single_run'], history_settings, "Single Analysis")
+    
+    # Widget interactions rerun the script; show the stored run instead of losing it
+    run = st.session_state.get('single_run')
+    if run:
+        display_run_details(run, "Analyzing URLs", archive_settings)
+        if run['results']:
+            display_results(run['results'], run['frame'])
 
-def run_head_to_head_analysis(timeout: int, max_urls: int, stealth_delay: bool):
-    """Run head-to-head comparison analysis"""
+def run_head_to_head_analysis(timeout: int, max_urls: int, stealth_delay: bool, fetch_settings: Dict[str, Any] = None,
+                              profile_analyzers: bool = False, archive_settings: Dict[str, str] = None,
+                              history_settings: Dict[str, Any] = None, metrics: List[str] = None):
+    """Run head-to-head comparison analysis; the last comparison is kept across reruns"""
     st.header("1. Enter URLs for Comparison")
     
-    col1, col2 = st.columns(2)
+    group_count = st.number_input("Groups to compare", min_value=2, max_value=len(GROUP_MARKERS), value=2,
+                                  help="Group A is the baseline the other groups are measured against")
+    names = [group_name(i) for i in range(group_count)]
     
-    with col1:
-        st.subheader("🔵 Group A (e.g., Your Site)")
-        urls_a_text = st.text_area(
-            "Enter Group A URLs (one per line):",
-            placeholder="https://yoursite.com/page1\nhttps://yoursite.com/page2",
-            height=150,
-            key="urls_a"
-        )
-        
-        uploaded_file_a = st.file_uploader("Or upload Group A URLs", type=['txt', 'csv'], key="file_a")
-        if uploaded_file_a is not None:
-            content = uploaded_file_a.read().decode('utf-8')
-            urls_a_text = content
-    
-    with col2:
-        st.subheader("🔴 Group B (e.g., Competitor)")
-        urls_b_text = st.text_area(
-            "Enter Group B URLs (one per line):",
-            placeholder="https://competitor.com/page1\nhttps://competitor.com/page2",
-            height=150,
-            key="urls_b"
-        )
-        
-        uploaded_file_b = st.file_uploader("Or upload Group B URLs", type=['txt', 'csv'], key="file_b")
-        if uploaded_file_b is not None:
-            content = uploaded_file_b.read().decode('utf-8')
-            urls_b_text = content
+    urls_texts = {}
+    for i, (name, column) in enumerate(group_columns(names).items()):
+        key = name[-1].lower()
+        with column:
+            st.subheader(f"{GROUP_MARKERS[i]} {name} (e.g., {'Your Site' if i == 0 else 'Competitor'})")
+            site = 'yoursite' if i == 0 else ('competitor' if i == 1 else f"competitor{i}")
+            urls_texts[name] = st.text_area(
+                f"Enter {name} URLs (one per line):",
+                placeholder=f"https://{site}.com/page1\nhttps://{site}.com/page2",
+                height=150,
+                key=f"urls_{key}"
+            )
+            sitemap_loader(f"urls_{key}", max_urls, timeout)
+            
+            uploaded_file = st.file_uploader(f"Or upload {name} URLs", type=['txt', 'csv'], key=f"file_{key}")
+            if uploaded_file is not None:
+                urls_texts[name] = uploaded_file.read().decode('utf-8')
     
     # Process comparison
     if st.button("⚔️ Compare Groups", type="primary"):
-        if not urls_a_text.strip() or not urls_b_text.strip():
-            st.error("Please enter URLs for both groups")
+        url_lists = {name: parse_urls(text, max_urls) for name, text in urls_texts.items()}
+        missing = [name for name, urls in url_lists.items() if not urls]
+        if missing:
+            st.error(f"Please enter URLs for {', '.join(missing)}")
             return
         
-        # Analyze both groups
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.info("🔵 Analyzing Group A...")
-            results_a = analyze_url_list(urls_a_text, max_urls, timeout, "Group A", stealth_delay)
-        
-        with col2:
-            st.info("🔴 Analyzing Group B...")
-            results_b = analyze_url_list(urls_b_text, max_urls, timeout, "Group B", stealth_delay)
-        
-        if results_a and results_b:
-            display_head_to_head_results(results_a, results_b)
+        # One batch for every group: different sites are fetched side by side
+        st.info(f"⚔️ Analyzing {len(url_lists)} groups together...")
+        runs = analyze_url_groups(url_lists, timeout, stealth_delay, fetch_settings, profile_analyzers, history_settings, metrics)
+        for name, run in runs.items():
+            add_to_history(run, history_settings, name)
+        st.session_state['head_to_head_runs'] = runs
+    
+    runs = st.session_state.get('head_to_head_runs')
+    if runs:
+        for name, column in group_columns(list(runs)).items():
+            with column:
+                display_run_details(runs[name], name, archive_settings, batch_details=False)
+        display_batch_details(next(iter(runs.values())), "All groups")
+        if all(run['results'] for run in runs.values()):
+            display_head_to_head_results({name: run['frame'] for name, run in runs.items()})
 
-def analyze_url_list(urls_text: str, max_urls: int, timeout: int, group_name: str, stealth_delay: bool = False) -> List[Dict]:
-    """Analyze a list of URLs and return results"""
-    # Parse URLs
-    urls = [url.strip() for url in urls_text.split('\n') if url.strip()]
-    urls = urls[:max_urls]  # Limit number of URLs
+def group_name(index: int) -> str:
+    return f"Group {chr(ord('A') + index)}"
+
+def group_columns(names: List[str]) -> Dict[str, Any]:
+    """A Streamlit column per group, at most three to a row"""
+    per_row = 2 if len(names) in (2, 4) else 3
+    columns = {}
+    for start in range(0, len(names), per_row):
+        columns.update(zip(names[start:start + per_row], st.columns(per_row)))
+    return columns
+
+def run_site_crawl(timeout: int, fetch_settings: Dict[str, Any] = None, profile_analyzers: bool = False,
+                   archive_settings: Dict[str, str] = None, history_settings: Dict[str, Any] = None,
+                   metrics: List[str] = None):
+    """Crawl sites from start URLs; the last crawl is kept across reruns"""
+    st.header("1. Enter Start URLs")
+    seeds_text = st.text_area(
+        "Start URLs (one per line):",
+        placeholder="https://example.com\nhttps://example.com/blog/",
+        height=100
+    )
     
-    if not urls:
-        st.error(f"No valid URLs found for {group_name}")
-        return []
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        max_depth = st.slider("Link depth", 0, 10, DEFAULT_MAX_DEPTH, help="Follow links at most this many clicks away from a start URL")
+    with col2:
+        max_pages = st.number_input("Page budget", 1, 5000, DEFAULT_MAX_PAGES, help="Stop after fetching this many pages")
+    with col3:
+        same_path = st.checkbox("Stay under start folder", value=False, help="Only follow links below the start URL's directory")
+        respect_robots = st.checkbox("Respect robots.txt", value=True)
     
-    analyzer = HTMLAnalyzer()
-    results = []
+    if st.button("🕸️ Crawl Site", type="primary"):
+        seeds = [url.strip() for url in seeds_text.split('\n') if url.strip()]
+        if not seeds:
+            st.error("Please enter at least one start URL")
+        else:
+            crawler_settings = {'max_depth': max_depth, 'max_pages': max_pages, 'same_path': same_path, 'respect_robots': respect_robots}
+            st.session_state['crawl_run'] = crawl_site(seeds, timeout, crawler_settings, fetch_settings, profile_analyzers, history_settings, metrics)
+            add_to_history(st.session_state['crawl_run'], history_settings, f"Site Crawl: {', '.join(seeds)}")
+    
+    run = st.session_state.get('crawl_run')
+    if run:
+        st.caption(format_crawl_stats(run['crawl_stats']))
+        display_run_details(run, "Site Crawl", archive_settings)
+        if run['results']:
+            display_results(run['results'], run['frame'])
+
+def crawl_site(seeds: List[str], timeout: int, crawler_settings: Dict[str, Any], fetch_settings: Dict[str, Any] = None,
+               profile_analyzers: bool = False, history_settings: Dict[str, Any] = None,
+               metrics: List[str] = None) -> Dict[str, Any]:
+    """Crawl from ``seeds`` and return the run in the shape ``analyze_url_list`` uses"""
+    fetcher = AsyncFetcher(HTMLAnalyzer(), timeout=timeout, **(fetch_settings or {}))
+    crawler = SiteCrawler(fetcher, **crawler_settings)
+    snapshots = open_snapshots(history_settings, profile_analyzers, metrics)
+    pipeline = AnalysisPipeline(crawler, analysis_cache=get_analysis_cache(), instrument=profile_analyzers, snapshots=snapshots,
+                                metrics=metrics)
+    results, errors = [], []
     
-    # Progress bar
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    for i, url in enumerate(urls):
-        status_text.text(f"Processing {group_name} {i+1}/{len(urls)}: {url}")
-        progress_bar.progress((i + 1) / len(urls))
-        
-        # Add extra delay if enabled
-        if stealth_delay and i > 0:  # Don't delay the first request
-            extra_delay = random.uniform(2.0, 5.0)
-            status_text.text(f"⏱️ Additional delay ({extra_delay:.1f}s) - Processing {group_name} {i+1}/{len(urls)}: {url}")
-            time.sleep(extra_delay)
-        
-        # Fetch and analyze
-        fetch_result = analyzer.fetch_html(url, timeout)
-        
-        if fetch_result['success']:
-            analysis = analyzer.analyze_html_structure(fetch_result['html'], fetch_result)
-            analysis['url'] = url
-            analysis['status_code'] = fetch_result['status_code']
-            analysis['method'] = fetch_result['method']
-            analysis['final_url'] = fetch_result['url']
-            results.append(analysis)
+    def on_result(i: int, url: str, fetch_result: Dict, record: Dict):
+        if record is None:
+            errors.append((url, fetch_result['error']))
         else:
-            st.error(f"Failed to fetch {url}: {fetch_result['error']}")
+            record['crawl_depth'] = fetch_result['crawl_depth']
+            results.append(record)
+        done = len(results) + len(errors)
+        status_text.text(f"Crawling {done}/{crawler.max_pages} (depth {fetch_result.get('crawl_depth', 0)}): {url}")
+        progress_bar.progress(min(1.0, done / crawler.max_pages))
     
-    status_text.text(f"{group_name} analysis complete!")
+    try:
+        pipeline.run_stream(seeds, on_result)
+    finally:
+        if snapshots is not None:
+            snapshots.close()
+    status_text.text(f"Crawl complete: {len(results)} pages analyzed")
     progress_bar.progress(1.0)
     
-    return results
+    return {
+        'results': results,
+        'frame': results_frame(results),
+        'errors': errors,
+        'metrics': fetcher.metrics,
+        'profiled': profile_analyzers,
+        'metric_groups': metrics,
+        'reused': False,
+        'crawl_stats': dict(crawler.stats),
+        'incremental': snapshots.stats if snapshots is not None else None,
+    }
 
-def calculate_group_averages(results: List[Dict]) -> Dict[str, float]:
-    """Calculate average metrics for a group of results"""
-    if not results:
-        return {}
+def run_archive_browser(archive_settings: Dict[str, str] = None):
+    """Reopen archived runs or an exported file without fetching anything"""
+    st.header("1. Load Archived Results")
+    if archive_settings is None:
+        st.error("Loading archived results needs pyarrow: pip install pyarrow")
+        return
     
-    n = len(results)
-    averages = {
-        # Basic metrics
-        'html_size_kb': sum(r['total_length'] for r in results) / n / 1024,
-        'total_tags': sum(r['total_tags'] for r in results) / n,
-        'unique_tags': sum(r['unique_tags'] for r in results) / n,
-        
-        # AEO metrics
-        'paragraphs_count': sum(r.get('paragraphs_count', 0) for r in results) / n,
-        'avg_paragraph_length': sum(r.get('avg_paragraph_length', 0) for r in results) / n,
-        'atomic_paragraph_ratio': sum(r.get('atomic_paragraph_ratio', 0) for r in results) / n,
-        'h2_count': sum(r.get('h2_count', 0) for r in results) / n,
-        'h3_count': sum(r.get('h3_count', 0) for r in results) / n,
-        'heading_coverage_ratio': sum(r.get('heading_coverage_ratio', 0) for r in results) / n,
-        
-        # Freshness signals
-        'url_year_inclusion': sum(r.get('url_year_inclusion', 0) for r in results) / n,
-        'title_year_inclusion': sum(r.get('title_year_inclusion', 0) for r in results) / n,
-        'meta_year_inclusion': sum(r.get('meta_year_inclusion', 0) for r in results) / n,
-        'early_content_year_inclusion': sum(r.get('early_content_year_inclusion', 0) for r in results) / n,
-        
-        # Tables and lists
-        'tables_count': sum(r.get('tables_count', 0) for r in results) / n,
-        'avg_rows_per_table': sum(r.get('avg_rows_per_table', 0) for r in results) / n,
-        'table_data_density': sum(r.get('table_data_density', 0) for r in results) / n,
-        'lists_count': sum(r.get('lists_count', 0) for r in results) / n,
-        'avg_items_per_list': sum(r.get('avg_items_per_list', 0) for r in results) / n,
-        'list_coverage_ratio': sum(r.get('list_coverage_ratio', 0) for r in results) / n,
-        
-        # URL and structure
-        'url_depth': sum(r.get('url_depth', 0) for r in results) / n,
-        'url_token_count': sum(r.get('url_token_count', 0) for r in results) / n,
-        'keyword_presence_ratio': sum(r.get('keyword_presence_ratio', 0) for r in results) / n,
-        'stopword_ratio': sum(r.get('stopword_ratio', 0) for r in results) / n,
-        'deep_link_density': sum(r.get('deep_link_density', 0) for r in results) / n,
-        
-        # Technical
-        'html_js_byte_ratio': sum(r.get('html_js_byte_ratio', 1) for r in results) / n,
-        'script_tag_density': sum(r.get('script_tag_density', 0) for r in results) / n,
-        'external_js_count': sum(r.get('external_js_count', 0) for r in results) / n,
-        'inline_js_size_kb': sum(r.get('inline_js_size', 0) for r in results) / n / 1024,
-        
-        # Schema
-        'schema_blocks_count': sum(r.get('schema_blocks_count', 0) for r in results) / n,
-        'schema_type_count': sum(r.get('schema_type_count', 0) for r in results) / n,
-        
-        # Resources
-        'external_css': sum(r.get('external_css', 0) for r in results) / n,
-        'external_js': sum(r.get('external_js', 0) for r in results) / n,
-        'images_count': sum(r.get('images_count', 0) for r in results) / n,
-        'forms_count': sum(r.get('forms_count', 0) for r in results) / n,
-    }
+    uploaded_file = st.file_uploader("Open an exported Parquet or Arrow file", type=['parquet', 'arrow', 'feather'])
+    if uploaded_file is not None:
+        frame = load_archive(uploaded_file.getvalue())
+    else:
+        runs = list_runs(archive_settings['root'])
+        if runs.empty:
+            st.info(f"No archived runs in {archive_settings['root']} yet. Save a run from its results, or run the CLI with --archive.")
+            return
+        labels = {
+            row.run_id: f"{row.run_id} - {row.pages} pages, {row.domains} domains"
+            for row in runs.itertuples()
+        }
+        run_ids = st.multiselect("Runs", list(labels), default=list(labels)[:1], format_func=labels.get)
+        if not run_ids:
+            return
+        frame = load_archive(archive_settings['root'], run_ids=run_ids)
     
-    return averages
+    domains = st.multiselect("Only these domains", sorted(frame['domain'].unique()))
+    if domains:
+        frame = frame[frame['domain'].isin(domains)]
+    records = frame_records(frame)
+    if records:
+        display_results(records, results_frame(records))
 
-def display_head_to_head_results(results_a: List[Dict], results_b: List[Dict]):
-    """Display head-to-head comparison results"""
-    st.header("⚔️ Head-to-Head Comparison Results")
+def run_trend_view(history: HistoryStore):
+    """Metrics across the runs recorded in the history database"""
+    st.header("1. Metric Trends")
+    runs = history.runs()
+    if runs.empty:
+        st.info(f"No runs recorded in {history.path} yet. Analyze with 'Record runs in history' on, or run the CLI with --history.")
+        return
     
-    # Calculate averages
-    avg_a = calculate_group_averages(results_a)
-    avg_b = calculate_group_averages(results_b)
+    metric = st.selectbox("Metric", METRIC_NAMES, index=METRIC_NAMES.index('atomic_paragraph_ratio'))
+    col1, col2 = st.columns(2)
+    with col1:
+        domain = st.selectbox("Domain", history.domains())
+    with col2:
+        url = st.selectbox("Page (optional)", [''] + history.urls(domain, limit=5000), help="Leave empty for the mean over the domain")
     
-    # Summary stats
-    col1, col2, col3 = st.columns(3)
+    if url:
+        trend = history.metric_history(url, metric)
+        st.line_chart(trend, x='analyzed_at', y=metric)
+    else:
+        trend = history.domain_trend(domain, metric)
+        st.line_chart(trend, x='analyzed_at', y=['mean', 'min', 'max'])
+    st.dataframe(trend, use_container_width=True, hide_index=True)
     
+    st.header("2. Changes Between Runs")
+    labels = {row.run_id: f"{row.run_id} - {row.label or 'unlabeled'}, {row.pages} pages" for row in runs.itertuples()}
+    col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("🔵 Group A URLs", len(results_a))
+        run_id = st.selectbox("Run", list(labels), format_func=labels.get)
     with col2:
-        st.metric("🔴 Group B URLs", len(results_b))
+        against = st.selectbox("Compared with", [''] + list(labels), format_func=lambda run: labels.get(run, "Each page's previous run"))
     with col3:
-        # Calculate overall winner
-        wins_a = 0
-        total_comparisons = 0
-        
-        key_metrics = [
-            'atomic_paragraph_ratio', 'heading_coverage_ratio', 'schema_blocks_count',
-            'html_js_byte_ratio', 'table_data_density', 'list_coverage_ratio'
-        ]
-        
-        for metric in key_metrics:
-            if metric in avg_a and metric in avg_b:
-                total_comparisons += 1
-                if avg_a[metric] > avg_b[metric]:
-                    wins_a += 1
-        
-        if total_comparisons > 0:
-            winner = "🔵 Group A" if wins_a > total_comparisons/2 else "🔴 Group B" if wins_a < total_comparisons/2 else "🤝 Tie"
-            st.metric("🏆 Overall Winner", winner)
+        direction = st.radio("Show", CHANGE_DIRECTIONS, format_func={'drop': 'Drops', 'rise': 'Rises', 'any': 'Any change'}.get, horizontal=True)
+    min_change = st.number_input("Ignore changes up to", min_value=0.0, value=0.0, format="%.3f")
+    
+    changes = history.changes(metric, run_id, against or None, direction, min_change, limit=1000)
+    if changes.empty:
+        st.success(f"No page's {metric} changed that way")
+    else:
+        st.caption(f"{len(changes)} pages" + (" (first 1000)" if len(changes) == 1000 else ""))
+        st.dataframe(changes, use_container_width=True, hide_index=True)
+
+def add_to_history(run: Dict[str, Any], history_settings: Dict[str, Any], label: str):
+    """Record a fresh run; reused pages are no new observation"""
+    history = (history_settings or {}).get('store')
+    if history is not None and run and run['results'] and not run['reused']:
+        run['history_id'] = history.record_run(run['results'], label=label)
+
+def open_snapshots(history_settings: Dict[str, Any], profile_analyzers: bool, metrics: List[str] = None) -> PageSnapshots:
+    """Snapshots of the previous run for incremental analysis, if enabled (profiling needs fresh timings)"""
+    path = (history_settings or {}).get('snapshots')
+    return PageSnapshots(path, version=analysis_version(metrics)) if path and not profile_analyzers else None
+
+def sitemap_loader(target_key: str, max_urls: int, timeout: int):
+    """Fill the URL box ``target_key`` from a sitemap or sitemap index"""
+    with st.expander("🗺️ Load URLs from a sitemap"):
+        st.text_input("Sitemap URL", placeholder="https://example.com/sitemap.xml", key=f"{target_key}_sitemap",
+                      help="Sitemaps, sitemap indexes (followed concurrently) and .xml.gz files")
+        st.date_input("Only pages modified since", value=None, key=f"{target_key}_since",
+                      help="Uses each entry's lastmod; entries without one are kept")
+        st.button("Load URLs", key=f"{target_key}_load", on_click=load_sitemap_urls, args=(target_key, max_urls, timeout))
+        report = st.session_state.get(f"{target_key}_sitemap_report")
+        if report:
+            st.caption(report['summary'])
+            for url, error in report['errors']:
+                st.error(f"Sitemap {url} failed: {error}")
+
+def load_sitemap_urls(target_key: str, max_urls: int, timeout: int):
+    """Button callback: runs before the rerun, so it may still set the URL box"""
+    sitemap_url = st.session_state.get(f"{target_key}_sitemap", '').strip()
+    if not sitemap_url:
+        return
+    reader = SitemapReader(HTMLAnalyzer(), timeout=timeout, since=st.session_state.get(f"{target_key}_since"), limit=max_urls)
+    st.session_state[target_key] = '\n'.join(reader.read([sitemap_url]))
+    st.session_state[f"{target_key}_sitemap_report"] = {'summary': format_sitemap_stats(reader.stats), 'errors': reader.errors}
+
+def fetch_settings_key(timeout: int, fetch_settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Plain values of every setting that decides what a batch fetches"""
+    key = {name: value for name, value in fetch_settings.items() if name not in ('cache', 'rate_limiter')}
+    cache = fetch_settings.get('cache')
+    limiter = fetch_settings.get('rate_limiter')
+    key['timeout'] = timeout
+    key['cache_ttl'] = cache.ttl if cache else None
+    key['rate_limit'] = [limiter.rate, limiter.burst, limiter.jitter, limiter.crawl_delay] if limiter else None
+    return key
+
+def analyze_url_list(urls_text: str, max_urls: int, timeout: int, group_name: str, stealth_delay: bool = False,
+                     fetch_settings: Dict[str, Any] = None, profile_analyzers: bool = False,
+                     history_settings: Dict[str, Any] = None, metrics: List[str] = None) -> Dict[str, Any]:
+    """
+    Analyze a list of URLs and return the run: successful records as
+    'results', failures as 'errors', plus fetch metrics.
+
+    A batch with the same URLs and fetch settings as an earlier one reuses its
+    pages; only a different analysis setting re-analyzes them. With incremental
+    analysis on, pages unchanged since their previous run are not re-analyzed.
+    """
+    urls = parse_urls(urls_text, max_urls)
+    if not urls:
+        st.error(f"No valid URLs found for {group_name}")
+        return {}
+    return analyze_url_groups({group_name: urls}, timeout, stealth_delay, fetch_settings, profile_analyzers,
+                              history_settings, metrics)[group_name]
+
+def parse_urls(urls_text: str, max_urls: int) -> List[str]:
+    """Non-empty lines of a URL box, at most ``max_urls`` of them"""
+    urls = [url.strip() for url in urls_text.split('\n') if url.strip()]
+    return urls[:max_urls]
+
+def analyze_url_groups(url_lists: Dict[str, List[str]], timeout: int, stealth_delay: bool = False,
+                       fetch_settings: Dict[str, Any] = None, profile_analyzers: bool = False,
+                       history_settings: Dict[str, Any] = None, metrics: List[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Analyze several URL lists as one batch and return a run per group, like
+    ``analyze_url_list``. All groups share one pipeline, so groups on
+    different sites download and are analyzed at the same time instead of one
+    after the other.
+    """
+    urls = [url for group_urls in url_lists.values() for url in group_urls]
+    label = ', '.join(url_lists)
+    
+    fetch_settings = fetch_settings or {}
+    runs = get_run_cache()
+    fetch_key = run_key(urls, fetch_settings_key(timeout, fetch_settings))
+    analysis_key = ('profiled' if profile_analyzers else 'plain') + (f":{','.join(metrics)}" if metrics else '')
+    
+    batch = runs.get(fetch_key)
+    reused = batch is not None
+    if batch is None:
+        fetcher = AsyncFetcher(
+            HTMLAnalyzer(),
+            timeout=timeout,
+            **fetch_settings
+        )
+        batch = BatchRun(urls, fetcher.metrics)
+    else:
+        # Same pages as an earlier batch: no network at all
+        fetcher = ReplayFetcher(batch)
+    
+    records = batch.analyses.get(analysis_key)
+    snapshots = None
+    if records is None:
+        # Pages are analyzed in worker processes while the next ones download
+        snapshots = open_snapshots(history_settings, profile_analyzers, metrics)
+        pipeline = AnalysisPipeline(fetcher, analysis_cache=get_analysis_cache(), instrument=profile_analyzers, snapshots=snapshots,
+                                    metrics=metrics)
+        completed = 0
+        
+        # Progress bar
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+        if stealth_delay and not reused:
+            status_text.text(f"⏱️ Additional delays enabled - Processing {label} ({len(urls)} URLs)")
+        
+        def on_result(i: int, url: str, fetch_result: Dict, record: Dict):
+            nonlocal completed
+            completed += 1
+            batch.fetches[i] = fetch_result
+            status_text.text(f"Processing {label} {completed}/{len(urls)}: {url}")
+            progress_bar.progress(completed / len(urls))
+        
+        # Records come back in input order
+        try:
+            records = batch.analyses[analysis_key] = pipeline.run(urls, on_result)
+        finally:
+            if snapshots is not None:
+                snapshots.close()
+        runs.put(fetch_key, batch)
+        status_text.text(f"{label} analysis complete!")
+        progress_bar.progress(1.0)
+    
+    # Each group's slice of the batch, in input order
+    group_runs = {}
+    start = 0
+    for group_name, group_urls in url_lists.items():
+        end = start + len(group_urls)
+        group_records = records[start:end]
+        results = [record for record in group_records if record is not None]
+        group_runs[group_name] = {
+            'results': results,
+            # Columnar copy for statistics and tables, built once per run
+            'frame': results_frame(results),
+            'errors': [(url, fetch['error']) for url, fetch, record in zip(group_urls, batch.fetches[start:end], group_records)
+                       if record is None and fetch is not None],
+            # Shared by the groups of one batch
+            'metrics': batch.metrics,
+            'profiled': profile_analyzers,
+            'metric_groups': metrics,
+            'reused': reused,
+            'incremental': snapshots.stats if snapshots is not None else None,
+        }
+        start = end
+    return group_runs
+
+def display_run_details(run: Dict[str, Any], group_name: str, archive_settings: Dict[str, str] = None,
+                        batch_details: bool = True):
+    """
+    Failures and diagnostics of a stored run. Without ``batch_details`` the
+    parts shared by the groups of one batch (reuse, incremental analysis and
+    fetch timings) are left to ``display_batch_details``.
+    """
+    if batch_details and run['reused']:
+        st.caption(f"♻️ {group_name}: reused pages from an earlier run with the same URLs and settings")
+    for url, error in run['errors']:
+        st.error(f"Failed to fetch {url}: {error}")
+    truncated = sum(1 for result in run['results'] if result.get('truncated'))
+    if truncated:
+        st.warning(f"{group_name}: {truncated} pages hit the analysis time budget; "
+                   "their metrics cover only the part analyzed in time")
+    
+    if run.get('metric_groups'):
+        st.caption(f"🧮 {group_name}: only {', '.join(METRIC_GROUP_LABELS[group] for group in run['metric_groups'])} analyzed; "
+                   "other metrics show as 0")
+    if batch_details and run.get('incremental'):
+        st.caption(f"🧩 {group_name}: {format_incremental_stats(run['incremental'])}")
+    if run.get('history_id'):
+        st.caption(f"📈 {group_name}: recorded in history as run {run['history_id']}")
+    
+    if batch_details:
+        display_fetch_metrics(run['metrics'], group_name)
+    if run['profiled'] and run['results']:
+        display_analyzer_profile(run['results'], group_name)
+    if archive_settings is not None and run['results']:
+        display_export(run, group_name, archive_settings)
+
+def display_batch_details(run: Dict[str, Any], batch_name: str):
+    """Reuse, incremental analysis and fetch timings of a batch, from any of its group runs"""
+    if run['reused']:
+        st.caption(f"♻️ {batch_name}: reused pages from an earlier run with the same URLs and settings")
+    if run.get('incremental'):
+        st.caption(f"🧩 {batch_name}: {format_incremental_stats(run['incremental'])}")
+    display_fetch_metrics(run['metrics'], batch_name)
+
+def display_export(run: Dict[str, Any], group_name: str, archive_settings: Dict[str, str]):
+    """Download a run as Parquet/Arrow or add it to the archive folder"""
+    # Files are built once per run, not on every rerun
+    exports = run.setdefault('exports', {})
+    
+    with st.expander(f"💾 Export - {group_name}"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if 'parquet' not in exports:
+                exports['parquet'] = archive_bytes(run['results'], 'parquet')
+            st.download_button("Download Parquet", exports['parquet'], file_name="webintel_results.parquet", mime="application/octet-stream", key=f"export_parquet_{group_name}")
+        with col2:
+            if 'arrow' not in exports:
+                exports['arrow'] = archive_bytes(run['results'], 'arrow')
+            st.download_button("Download Arrow", exports['arrow'], file_name="webintel_results.arrow", mime="application/octet-stream", key=f"export_arrow_{group_name}")
+        with col3:
+            if run.get('archived_as'):
+                st.caption(f"Saved as run {run['archived_as']}")
+            elif st.button("Save to archive", key=f"archive_{group_name}"):
+                run['archived_as'] = write_archive(run['results'], archive_settings['root'], archive_settings['fmt'])
+                st.success(f"Saved as run {run['archived_as']}")
+
+def display_fetch_metrics(metrics: FetchMetrics, group_name: str):
+    """DNS/connect/TLS/TTFB/body percentiles of a batch, per host"""
+    summary = metrics.summary()
+    if not summary['batch']['attempts']:
+        return
+    
+    rows = []
+    scopes = [('All hosts', summary['batch'])] + list(summary['hosts'].items())
+    for host, stats in scopes:
+        for phase in PHASES + ('total',):
+            if phase in stats:
+                rows.append({
+                    'Host': host,
+                    'Phase': phase,
+                    'Samples': stats[phase]['count'],
+                    'p50 (ms)': round(stats[phase]['p50'] * 1000, 1),
+                    'p95 (ms)': round(stats[phase]['p95'] * 1000, 1),
+                    'p99 (ms)': round(stats[phase]['p99'] * 1000, 1),
+                })
+    
+    with st.expander(f"🌐 Fetch timings - {group_name}"):
+        st.caption(f"{summary['batch']['attempts']} attempts, {summary['batch']['failures']} failed. Reused connections have no DNS, connect or TLS phase.")
+        st.dataframe(pd.DataFrame(rows), use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Download JSON", metrics.to_json(), file_name="fetch_metrics.json", mime="application/json", key=f"fetch_json_{group_name}")
+        with col2:
+            st.download_button("Download Prometheus", metrics.to_prometheus(), file_name="fetch_metrics.prom", mime="text/plain", key=f"fetch_prom_{group_name}")
+
+def display_analyzer_profile(results: List[Dict], group_name: str):
+    """Slowest analyzers and pages of a profiled batch"""
+    profile = BatchProfile()
+    for result in results:
+        profile.add(result['url'], result)
+    
+    with st.expander(f"⏱️ Analyzer timings - {group_name}"):
+        st.write("**Slowest analyzers**")
+        st.dataframe(pd.DataFrame(profile.slowest_analyzers()).round(2), use_container_width=True)
+        st.write("**Slowest pages**")
+        st.dataframe(pd.DataFrame(profile.slowest_pages()).round(2), use_container_width=True)
+
+# Head-to-head comparison rows: label, metric, number format, unit, whether
+# higher is better, and for metrics with a sweet spot the value to be near
+COMPARISON_SECTIONS = [
+    ("📝 Content Structure", [
+        ("Paragraphs Count", 'paragraphs_count', '.1f', '', True, None),
+        ("Avg Paragraph Length", 'avg_paragraph_length', '.1f', ' words', False, None),
+        ("Atomic Paragraph Ratio", 'atomic_paragraph_ratio', '.2f', '', True, None),
+        ("H2 Tags", 'h2_count', '.1f', '', True, None),
+        ("H3 Tags", 'h3_count', '.1f', '', True, None),
+        ("Heading Coverage", 'heading_coverage_ratio', '.2f', '', True, None),
+    ]),
+    ("🗓️ 2025 Freshness Signals", [
+        ("URL Year Inclusion", 'url_year_inclusion', '.0%', '', True, None),
+        ("Title Year Inclusion", 'title_year_inclusion', '.0%', '', True, None),
+        ("Meta Year Inclusion", 'meta_year_inclusion', '.0%', '', True, None),
+        ("Early Content Year", 'early_content_year_inclusion', '.0%', '', True, None),
+    ]),
+    ("📊 Tables & Lists", [
+        ("Tables Count", 'tables_count', '.1f', '', True, None),
+        ("Table Data Density", 'table_data_density', '.2f', '', True, None),
+        ("Lists Count", 'lists_count', '.1f', '', True, None),
+        ("List Coverage Ratio", 'list_coverage_ratio', '.2f', '', True, None),
+    ]),
+    ("🔗 URL Structure", [
+        ("URL Depth", 'url_depth', '.1f', '', True, None),
+        ("URL Token Count", 'url_token_count', '.1f', '', True, None),
+        ("Keyword Presence", 'keyword_presence_ratio', '.2f', '', True, None),
+        ("Stopword Ratio", 'stopword_ratio', '.2f', '', False, None),
+    ]),
+    ("⚡ Technical Performance", [
+        ("HTML/JS Ratio", 'html_js_byte_ratio', '.2f', '', True, None),
+        ("Script Tag Density", 'script_tag_density', '.3f', '', False, None),
+        ("External JS Files", 'external_js_count', '.1f', '', False, None),
+    ]),
+    ("📱 Schema & Resources", [
+        ("Schema Blocks", 'schema_blocks_count', '.1f', '', True, None),
+        ("Schema Types", 'schema_type_count', '.1f', '', True, None),
+        ("HTML Size", 'html_size_kb', '.1f', ' KB', False, None),
+        ("Images Count", 'images_count', '.1f', '', False, 20),
+    ]),
+]
+
+# Metrics that decide the overall winner (higher is better)
+KEY_METRICS = [
+    'atomic_paragraph_ratio', 'heading_coverage_ratio', 'schema_blocks_count',
+    'html_js_byte_ratio', 'table_data_density', 'list_coverage_ratio'
+]
+
+FRESHNESS_METRICS = ['url_year_inclusion', 'title_year_inclusion', 'meta_year_inclusion', 'early_content_year_inclusion']
+
+def display_head_to_head_results(groups: Dict[str, Union[List[Dict], pd.DataFrame]]):
+    """Display the comparison of two or more groups; the first one is the baseline"""
+    st.header("⚔️ Head-to-Head Comparison Results")
+    
+    # Every statistic of every group, with bootstrap intervals on the differences, in one pass
+    names = list(groups)
+    markers = dict(zip(names, GROUP_MARKERS))
+    stats = compare_groups(groups)
+    # Empty groups and metrics not computed compare as 0
+    means = {name: stats.xs(name, level='group')['mean'].fillna(0).to_dict() for name in names}
+    
+    # Summary stats
+    columns = st.columns(len(names) + 1)
+    for column, name in zip(columns, names):
+        with column:
+            st.metric(f"{markers[name]} {name} URLs", int(stats.loc[(name, KEY_METRICS[0]), 'count']))
+    with columns[-1]:
+        # A group wins a key metric with the best mean; the overall winner wins the most
+        wins = dict.fromkeys(names, 0)
+        for metric in KEY_METRICS:
+            winner = best_group({name: means[name][metric] for name in names})
+            if winner is not None:
+                wins[winner] += 1
+        winner = best_group(wins)
+        st.metric("🏆 Overall Winner", f"{markers[winner]} {winner}" if winner else "🤝 Tie")
     
     # Detailed comparison table
     st.subheader("📊 Detailed Metrics Comparison")
     
     comparison_data = []
+    for section, rows in COMPARISON_SECTIONS:
+        comparison_data.append([section] + [""] * len(names) + [""])
+        for label, metric, number_format, unit, higher_better, target in rows:
+            values = {name: means[name][metric] for name in names}
+            winner = best_group(values, higher_better, target)
+            comparison_data.append([label] + [f"{values[name]:{number_format}}{unit}" for name in names]
+                                   + [markers[winner] if winner else "🤝"])
     
-    # AEO Metrics
-    comparison_data.extend([
-        ("📝 Content Structure", "", "", ""),
-        ("Paragraphs Count", f"{avg_a.get('paragraphs_count', 0):.1f}", f"{avg_b.get('paragraphs_count', 0):.1f}", get_winner_indicator(avg_a.get('paragraphs_count', 0), avg_b.get('paragraphs_count', 0), higher_better=True)),
-        ("Avg Paragraph Length", f"{avg_a.get('avg_paragraph_length', 0):.1f} words", f"{avg_b.get('avg_paragraph_length', 0):.1f} words", get_winner_indicator(avg_a.get('avg_paragraph_length', 0), avg_b.get('avg_paragraph_length', 0), higher_better=False)),
-        ("Atomic Paragraph Ratio", f"{avg_a.get('atomic_paragraph_ratio', 0):.2f}", f"{avg_b.get('atomic_paragraph_ratio', 0):.2f}", get_winner_indicator(avg_a.get('atomic_paragraph_ratio', 0), avg_b.get('atomic_paragraph_ratio', 0), higher_better=True)),
-        ("H2 Tags", f"{avg_a.get('h2_count', 0):.1f}", f"{avg_b.get('h2_count', 0):.1f}", get_winner_indicator(avg_a.get('h2_count', 0), avg_b.get('h2_count', 0), higher_better=True)),
-        ("H3 Tags", f"{avg_a.get('h3_count', 0):.1f}", f"{avg_b.get('h3_count', 0):.1f}", get_winner_indicator(avg_a.get('h3_count', 0), avg_b.get('h3_count', 0), higher_better=True)),
-        ("Heading Coverage", f"{avg_a.get('heading_coverage_ratio', 0):.2f}", f"{avg_b.get('heading_coverage_ratio', 0):.2f}", get_winner_indicator(avg_a.get('heading_coverage_ratio', 0), avg_b.get('heading_coverage_ratio', 0), higher_better=True)),
-        
-        ("🗓️ 2025 Freshness Signals", "", "", ""),
-        ("URL Year Inclusion", f"{avg_a.get('url_year_inclusion', 0):.0%}", f"{avg_b.get('url_year_inclusion', 0):.0%}", get_winner_indicator(avg_a.get('url_year_inclusion', 0), avg_b.get('url_year_inclusion', 0), higher_better=True)),
-        ("Title Year Inclusion", f"{avg_a.get('title_year_inclusion', 0):.0%}", f"{avg_b.get('title_year_inclusion', 0):.0%}", get_winner_indicator(avg_a.get('title_year_inclusion', 0), avg_b.get('title_year_inclusion', 0), higher_better=True)),
-        ("Meta Year Inclusion", f"{avg_a.get('meta_year_inclusion', 0):.0%}", f"{avg_b.get('meta_year_inclusion', 0):.0%}", get_winner_indicator(avg_a.get('meta_year_inclusion', 0), avg_b.get('meta_year_inclusion', 0), higher_better=True)),
-        ("Early Content Year", f"{avg_a.get('early_content_year_inclusion', 0):.0%}", f"{avg_b.get('early_content_year_inclusion', 0):.0%}", get_winner_indicator(avg_a.get('early_content_year_inclusion', 0), avg_b.get('early_content_year_inclusion', 0), higher_better=True)),
-        
-        ("📊 Tables & Lists", "", "", ""),
-        ("Tables Count", f"{avg_a.get('tables_count', 0):.1f}", f"{avg_b.get('tables_count', 0):.1f}", get_winner_indicator(avg_a.get('tables_count', 0), avg_b.get('tables_count', 0), higher_better=True)),
-        ("Table Data Density", f"{avg_a.get('table_data_density', 0):.2f}", f"{avg_b.get('table_data_density', 0):.2f}", get_winner_indicator(avg_a.get('table_data_density', 0), avg_b.get('table_data_density', 0), higher_better=True)),
-        ("Lists Count", f"{avg_a.get('lists_count', 0):.1f}", f"{avg_b.get('lists_count', 0):.1f}", get_winner_indicator(avg_a.get('lists_count', 0), avg_b.get('lists_count', 0), higher_better=True)),
-        ("List Coverage Ratio", f"{avg_a.get('list_coverage_ratio', 0):.2f}", f"{avg_b.get('list_coverage_ratio', 0):.2f}", get_winner_indicator(avg_a.get('list_coverage_ratio', 0), avg_b.get('list_coverage_ratio', 0), higher_better=True)),
-        
-        ("🔗 URL Structure", "", "", ""),
-        ("URL Depth", f"{avg_a.get('url_depth', 0):.1f}", f"{avg_b.get('url_depth', 0):.1f}", get_winner_indicator(avg_a.get('url_depth', 0), avg_b.get('url_depth', 0), higher_better=True)),
-        ("URL Token Count", f"{avg_a.get('url_token_count', 0):.1f}", f"{avg_b.get('url_token_count', 0):.1f}", get_winner_indicator(avg_a.get('url_token_count', 0), avg_b.get('url_token_count', 0), higher_better=True)),
-        ("Keyword Presence", f"{avg_a.get('keyword_presence_ratio', 0):.2f}", f"{avg_b.get('keyword_presence_ratio', 0):.2f}", get_winner_indicator(avg_a.get('keyword_presence_ratio', 0), avg_b.get('keyword_presence_ratio', 0), higher_better=True)),
-        ("Stopword Ratio", f"{avg_a.get('stopword_ratio', 0):.2f}", f"{avg_b.get('stopword_ratio', 0):.2f}", get_winner_indicator(avg_a.get('stopword_ratio', 0), avg_b.get('stopword_ratio', 0), higher_better=False)),
-        
-        ("⚡ Technical Performance", "", "", ""),
-        ("HTML/JS Ratio", f"{avg_a.get('html_js_byte_ratio', 1):.2f}", f"{avg_b.get('html_js_byte_ratio', 1):.2f}", get_winner_indicator(avg_a.get('html_js_byte_ratio', 1), avg_b.get('html_js_byte_ratio', 1), higher_better=True)),
-        ("Script Tag Density", f"{avg_a.get('script_tag_density', 0):.3f}", f"{avg_b.get('script_tag_density', 0):.3f}", get_winner_indicator(avg_a.get('script_tag_density', 0), avg_b.get('script_tag_density', 0), higher_better=False)),
-        ("External JS Files", f"{avg_a.get('external_js_count', 0):.1f}", f"{avg_b.get('external_js_count', 0):.1f}", get_winner_indicator(avg_a.get('external_js_count', 0), avg_b.get('external_js_count', 0), higher_better=False)),
-        
-        ("📱 Schema & Resources", "", "", ""),
-        ("Schema Blocks", f"{avg_a.get('schema_blocks_count', 0):.1f}", f"{avg_b.get('schema_blocks_count', 0):.1f}", get_winner_indicator(avg_a.get('schema_blocks_count', 0), avg_b.get('schema_blocks_count', 0), higher_better=True)),
-        ("Schema Types", f"{avg_a.get('schema_type_count', 0):.1f}", f"{avg_b.get('schema_type_count', 0):.1f}", get_winner_indicator(avg_a.get('schema_type_count', 0), avg_b.get('schema_type_count', 0), higher_better=True)),
-        ("HTML Size", f"{avg_a.get('html_size_kb', 0):.1f} KB", f"{avg_b.get('html_size_kb', 0):.1f} KB", get_winner_indicator(avg_a.get('html_size_kb', 0), avg_b.get('html_size_kb', 0), higher_better=False)),
-        ("Images Count", f"{avg_a.get('images_count', 0):.1f}", f"{avg_b.get('images_count', 0):.1f}", get_winner_indicator(avg_a.get('images_count', 0), avg_b.get('images_count', 0), higher_better=False, threshold=20)),
-    ])
-    
-    # Create dataframe
-    df_comparison = pd.DataFrame(comparison_data, columns=['Metric', '🔵 Group A', '🔴 Group B', 'Winner'])
-    
-    # Display with styling
+    df_comparison = pd.DataFrame(comparison_data, columns=['Metric'] + [f"{markers[name]} {name}" for name in names] + ['Winner'])
     st.dataframe(
         df_comparison,
         use_container_width=True,
         hide_index=True
     )
     
-    # Key insights
-    st.subheader("🎯 Key Insights")
-    
-    insights = []
-    
-    # AEO insights
-    if avg_a.get('atomic_paragraph_ratio', 0) > avg_b.get('atomic_paragraph_ratio', 0):
-        insights.append("🔵 Group A has better atomic paragraph structure for answer engines")
-    elif avg_b.get('atomic_paragraph_ratio', 0) > avg_a.get('atomic_paragraph_ratio', 0):
-        insights.append("🔴 Group B has better atomic paragraph structure for answer engines")
-    
-    # Freshness insights
-    freshness_a = (avg_a.get('url_year_inclusion', 0) + avg_a.get('title_year_inclusion', 0) + 
-                   avg_a.get('meta_year_inclusion', 0) + avg_a.get('early_content_year_inclusion', 0)) / 4
-    freshness_b = (avg_b.get('url_year_inclusion', 0) + avg_b.get('title_year_inclusion', 0) + 
-                   avg_b.get('meta_year_inclusion', 0) + avg_b.get('early_content_year_inclusion', 0)) / 4
+    baseline, others = names[0], names[1:]
+    st.subheader(f"📏 Differences from {markers[baseline]} {baseline}")
+    st.caption(f"Difference of each group's mean from {baseline}'s, with a {DEFAULT_CONFIDENCE:.0%} bootstrap confidence interval. "
+               "✱ marks differences whose interval excludes zero.")
+    delta_data = []
+    for section, rows in COMPARISON_SECTIONS:
+        delta_data.append([section] + [""] * len(others))
+        for label, metric, number_format, unit, _, _ in rows:
+            cells = []
+            for name in others:
+                row = stats.loc[(name, metric)]
+                sure = row['delta_low'] > 0 or row['delta_high'] < 0
+                cells.append(f"{row['delta']:+{number_format}}{unit} ({row['delta_low']:+{number_format}} to "
+                             f"{row['delta_high']:+{number_format}}){' ✱' if sure else ''}")
+            delta_data.append([label] + cells)
+    st.dataframe(
+        pd.DataFrame(delta_data, columns=['Metric'] + [f"{markers[name]} {name}" for name in others]),
+        use_container_width=True,
+        hide_index=True
+    )
     
-    if freshness_a > freshness_b:
-        insights.append("🔵 Group A shows stronger 2025 freshness signals")
-    elif freshness_b > freshness_a:
-        insights.append("🔴 Group B shows stronger 2025 freshness signals")
+    with st.expander("📈 Distributions (median and percentiles per group)"):
+        distribution = stats.drop(columns=['count', 'delta', 'delta_low', 'delta_high'])
+        distribution = pd.concat({f"{markers[name]} {name}": distribution.xs(name, level='group') for name in names}, axis=1)
+        st.dataframe(distribution.round(3), use_container_width=True)
     
-    # Schema insights
-    if avg_a.get('schema_blocks_count', 0) > avg_b.get('schema_blocks_count', 0):
-        insights.append("🔵 Group A has better structured data implementation")
-    elif avg_b.get('schema_blocks_count', 0) > avg_a.get('schema_blocks_count', 0):
-        insights.append("🔴 Group B has better structured data implementation")
+    # Key insights
+    st.subheader("🎯 Key Insights")
     
-    # Technical insights
-    if avg_a.get('html_js_byte_ratio', 1) > avg_b.get('html_js_byte_ratio', 1):
-        insights.append("🔵 Group A is more AEO-friendly with better HTML/JS balance")
-    elif avg_b.get('html_js_byte_ratio', 1) > avg_a.get('html_js_byte_ratio', 1):
-        insights.append("🔴 Group B is more AEO-friendly with better HTML/JS balance")
+    freshness = {name: sum(means[name][metric] for metric in FRESHNESS_METRICS) / len(FRESHNESS_METRICS) for name in names}
+    leaders = [
+        (best_group({name: means[name]['atomic_paragraph_ratio'] for name in names}), "has better atomic paragraph structure for answer engines"),
+        (best_group(freshness), "shows stronger 2025 freshness signals"),
+        (best_group({name: means[name]['schema_blocks_count'] for name in names}), "has better structured data implementation"),
+        (best_group({name: means[name]['html_js_byte_ratio'] for name in names}), "is more AEO-friendly with better HTML/JS balance"),
+    ]
+    insights = [f"{markers[name]} {name} {insight}" for name, insight in leaders if name is not None]
     
     if insights:
         for insight in insights:
             st.write(f"• {insight}")
     else:
-        st.write("• Both groups show similar AEO performance across key metrics")
+        st.write("• All groups show similar AEO performance across key metrics")
 
-def get_winner_indicator(val_a: float, val_b: float, higher_better: bool = True, threshold: float = None) -> str:
-    """Return winner indicator for comparison"""
-    if val_a == val_b:
-        return "🤝"
-    
-    if threshold is not None:
+def best_group(values: Dict[str, float], higher_better: bool = True, target: float = None) -> Union[str, None]:
+    """The group with the best value, None on a tie for first place"""
+    if target is not None:
         # For metrics where there's an optimal range
-        diff_a = abs(val_a - threshold)
-        diff_b = abs(val_b - threshold)
-        return "🔵" if diff_a < diff_b else "🔴"
-    
-    if higher_better:
-        return "🔵" if val_a > val_b else "🔴"
+        scores = {name: -abs(value - target) for name, value in values.items()}
     else:
-        return "🔵" if val_a < val_b else "🔴"
+        scores = {name: value if higher_better else -value for name, value in values.items()}
+    best = max(scores.values())
+    leaders = [name for name, score in scores.items() if score == best]
+    return leaders[0] if len(leaders) == 1 else None
 
-def display_results(results: List[Dict]):
+def display_results(results: List[Dict], frame: pd.DataFrame = None):
     """Display analysis results in organized tabs"""
+    # Tables and statistics come from one columnar frame
+    df_all = results_frame(results) if frame is None else frame
+    urls_40 = short_text(df_all['url'], 40)
     
     # Summary statistics
     st.subheader("📊 Summary Statistics")
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("URLs Analyzed", len(results))
+        st.metric("URLs Analyzed", len(df_all))
     with col2:
-        avg_size = sum(r['total_length'] for r in results) / len(results) if results else 0
-        st.metric("Avg HTML Size", f"{avg_size/1024:.1f} KB")
+        avg_size = df_all['html_size_kb'].mean() if len(df_all) else 0
+        st.metric("Avg HTML Size", f"{avg_size:.1f} KB")
     with col3:
-        total_tags = sum(r['total_tags'] for r in results)
+        total_tags = int(df_all['total_tags'].sum())
         st.metric("Total HTML Tags", total_tags)
     with col4:
-        frameworks = set()
-        for r in results:
-            frameworks.update(r['frameworks_detected'])
-        st.metric("Frameworks Found", len(frameworks))
+        frameworks = df_all['frameworks_detected'].explode().dropna().nunique()
+        st.metric("Frameworks Found", frameworks)
     
     # AEO Analysis tabs
     tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
@@ -1004,20 +866,16 @@ def display_results(results: List[Dict]):
         st.subheader("HTML Structure Overview")
         
         # Create basic comparison dataframe
-        comparison_data = []
-        for result in results:
-            comparison_data.append({
-                'URL': result['url'][:40] + '...' if len(result['url']) > 40 else result['url'],
-                'HTML Size (KB)': f"{result['total_length']/1024:.1f}",
-                'Total Tags': result['total_tags'],
-                'Paragraphs': result.get('paragraphs_count', 0),
-                'Tables': result.get('tables_count', 0),
-                'Lists': result.get('lists_count', 0),
-                'H2+H3': result.get('h2_count', 0) + result.get('h3_count', 0),
-                'Schema Types': result.get('schema_type_count', 0)
-            })
-        
-        df = pd.DataFrame(comparison_data)
+        df = pd.DataFrame({
+            'URL': urls_40,
+            'HTML Size (KB)': df_all['html_size_kb'].round(1),
+            'Total Tags': df_all['total_tags'],
+            'Paragraphs': df_all['paragraphs_count'],
+            'Tables': df_all['tables_count'],
+            'Lists': df_all['lists_count'],
+            'H2+H3': df_all['h2_count'] + df_all['h3_count'],
+            'Schema Types': df_all['schema_type_count']
+        })
         st.dataframe(df, use_container_width=True)
     
     with tab2:
@@ -1029,20 +887,20 @@ def display_results(results: List[Dict]):
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            avg_atomic_ratio = sum(r.get('atomic_paragraph_ratio', 0) for r in results) / len(results)
+            avg_atomic_ratio = df_all['atomic_paragraph_ratio'].mean()
             st.metric("Avg Atomic Paragraph Ratio", f"{avg_atomic_ratio:.2f}", help="Paragraphs ≤100 words (target: ≥0.8)")
         
         with col2:
-            year_urls = sum(r.get('url_year_inclusion', 0) for r in results)
-            st.metric("URLs with 2025", f"{year_urls}/{len(results)}", help="URLs containing '2025' for freshness")
+            year_urls = int(df_all['url_year_inclusion'].sum())
+            st.metric("URLs with 2025", f"{year_urls}/{len(df_all)}", help="URLs containing '2025' for freshness")
         
         with col3:
-            avg_heading_coverage = sum(r.get('heading_coverage_ratio', 0) for r in results) / len(results)
+            avg_heading_coverage = df_all['heading_coverage_ratio'].mean()
             st.metric("Avg Heading Coverage", f"{avg_heading_coverage:.2f}", help="Content blocks with H2/H3 structure")
         
         with col4:
-            schema_pages = sum(1 for r in results if r.get('schema_blocks_count', 0) > 0)
-            st.metric("Pages with Schema", f"{schema_pages}/{len(results)}", help="Pages with structured data")
+            schema_pages = int((df_all['schema_blocks_count'] > 0).sum())
+            st.metric("Pages with Schema", f"{schema_pages}/{len(df_all)}", help="Pages with structured data")
         
         # Detailed AEO Analysis per URL
         st.write("### 📋 Detailed AEO Analysis")
@@ -1077,51 +935,42 @@ def display_results(results: List[Dict]):
         
         # Tables Analysis
         st.write("### 📋 Tables")
-        table_data = []
-        for result in results:
-            table_data.append({
-                'URL': result['url'][:40] + '...' if len(result['url']) > 40 else result['url'],
-                'Tables': result.get('tables_count', 0),
-                'Avg Rows/Table': f"{result.get('avg_rows_per_table', 0):.1f}",
-                'Data Density': f"{result.get('table_data_density', 0):.2f}",
-                'Assessment': '✅ Good' if result.get('table_data_density', 0) > 0.5 else '⚠️ Low' if result.get('tables_count', 0) > 0 else '📝 None'
-            })
-        
-        df_tables = pd.DataFrame(table_data)
+        df_tables = pd.DataFrame({
+            'URL': urls_40,
+            'Tables': df_all['tables_count'],
+            'Avg Rows/Table': df_all['avg_rows_per_table'].round(1),
+            'Data Density': df_all['table_data_density'].round(2),
+            'Assessment': np.select(
+                [df_all['table_data_density'] > 0.5, df_all['tables_count'] > 0],
+                ['✅ Good', '⚠️ Low'], default='📝 None'
+            )
+        })
         st.dataframe(df_tables, use_container_width=True)
         
         # Lists Analysis
         st.write("### 📝 Lists")
-        list_data = []
-        for result in results:
-            list_data.append({
-                'URL': result['url'][:40] + '...' if len(result['url']) > 40 else result['url'],
-                'Lists': result.get('lists_count', 0),
-                'Avg Items/List': f"{result.get('avg_items_per_list', 0):.1f}",
-                'List Coverage': f"{result.get('list_coverage_ratio', 0):.2f}",
-                'Snippet Ready': '✅ High' if result.get('list_coverage_ratio', 0) > 0.3 else '⚠️ Low'
-            })
-        
-        df_lists = pd.DataFrame(list_data)
+        df_lists = pd.DataFrame({
+            'URL': urls_40,
+            'Lists': df_all['lists_count'],
+            'Avg Items/List': df_all['avg_items_per_list'].round(1),
+            'List Coverage': df_all['list_coverage_ratio'].round(2),
+            'Snippet Ready': np.where(df_all['list_coverage_ratio'] > 0.3, '✅ High', '⚠️ Low')
+        })
         st.dataframe(df_lists, use_container_width=True)
     
     with tab4:
         st.subheader("🔗 URL Structure & Internal Linking")
         
         # URL Analysis
-        url_data = []
-        for result in results:
-            url_data.append({
-                'URL': result['url'][:50] + '...' if len(result['url']) > 50 else result['url'],
-                'URL Depth': result.get('url_depth', 0),
-                'Token Count': result.get('url_token_count', 0),
-                'Keyword Match': f"{result.get('keyword_presence_ratio', 0):.2f}",
-                'Stopword Ratio': f"{result.get('stopword_ratio', 0):.2f}",
-                'Deep Link Density': f"{result.get('deep_link_density', 0):.2f}",
-                'Subfolder': result.get('most_common_subfolder', 'Root')
-            })
-        
-        df_urls = pd.DataFrame(url_data)
+        df_urls = pd.DataFrame({
+            'URL': short_text(df_all['url'], 50),
+            'URL Depth': df_all['url_depth'],
+            'Token Count': df_all['url_token_count'],
+            'Keyword Match': df_all['keyword_presence_ratio'].round(2),
+            'Stopword Ratio': df_all['stopword_ratio'].round(2),
+            'Deep Link Density': df_all['deep_link_density'].round(2),
+            'Subfolder': df_all['most_common_subfolder']
+        })
         st.dataframe(df_urls, use_container_width=True)
         
         # URL Quality Assessment
@@ -1161,25 +1010,20 @@ def display_results(results: List[Dict]):
         
         # HTML vs JS Analysis
         st.write("### 🔧 HTML vs JavaScript Balance")
-        tech_data = []
-        for result in results:
-            html_ratio = result.get('html_js_byte_ratio', 1)
-            tech_data.append({
-                'URL': result['url'][:40] + '...' if len(result['url']) > 40 else result['url'],
-                'HTML/JS Ratio': f"{html_ratio:.2f}",
-                'Script Density': f"{result.get('script_tag_density', 0):.3f}",
-                'External JS': result.get('external_js_count', 0),
-                'Inline JS Size': f"{result.get('inline_js_size', 0)/1024:.1f} KB",
-                'AEO Friendly': '✅ Good' if html_ratio > 0.7 else '⚠️ JS Heavy'
-            })
-        
-        df_tech = pd.DataFrame(tech_data)
+        df_tech = pd.DataFrame({
+            'URL': urls_40,
+            'HTML/JS Ratio': df_all['html_js_byte_ratio'].round(2),
+            'Script Density': df_all['script_tag_density'].round(3),
+            'External JS': df_all['external_js_count'],
+            'Inline JS Size (KB)': df_all['inline_js_size_kb'].round(1),
+            'AEO Friendly': np.where(df_all['html_js_byte_ratio'] > 0.7, '✅ Good', '⚠️ JS Heavy')
+        })
         st.dataframe(df_tech, use_container_width=True)
         
         # Performance Insights
         st.write("### 🚀 Performance Recommendations")
         for result in results:
-            if result['performance_insights']:
+            if result.get('performance_insights'):
                 st.write(f"**{result['url'][:60]}{'...' if len(result['url']) > 60 else ''}:**")
                 for insight in result['performance_insights']:
                     st.write(f"⚠️ {insight}")
@@ -1195,33 +1039,30 @@ def display_results(results: List[Dict]):
         st.write("### 🛠️ Framework Detection")
         all_frameworks = {}
         for result in results:
-            for framework in result['frameworks_detected']:
+            confidence = result.get('framework_confidence') or {}
+            for framework in result.get('frameworks_detected', []):
                 if framework not in all_frameworks:
                     all_frameworks[framework] = []
-                all_frameworks[framework].append(result['url'])
+                all_frameworks[framework].append((result['url'], confidence.get(framework)))
         
         if all_frameworks:
             for framework, urls in all_frameworks.items():
                 st.write(f"**{framework}:**")
-                for url in urls:
-                    st.write(f"- {url[:60]}{'...' if len(url) > 60 else ''}")
+                for url, confidence in urls:
+                    score = f" ({confidence:.0%} confidence)" if confidence is not None else ""
+                    st.write(f"- {url[:60]}{'...' if len(url) > 60 else ''}{score}")
                 st.write("---")
         else:
             st.write("No popular frameworks detected in the analyzed URLs.")
         
         # Schema Markup Analysis
         st.write("### 📊 Schema.org Structured Data")
-        schema_data = []
-        for result in results:
-            schema_types_str = ', '.join(result.get('schema_types', [])) if result.get('schema_types') else 'None'
-            schema_data.append({
-                'URL': result['url'][:40] + '...' if len(result['url']) > 40 else result['url'],
-                'JSON-LD Blocks': result.get('jsonld_blocks_count', 0),
-                'Schema Types': schema_types_str,
-                'AEO Ready': '✅ Yes' if result.get('schema_blocks_count', 0) > 0 else '❌ Missing'
-            })
-        
-        df_schema = pd.DataFrame(schema_data)
+        df_schema = pd.DataFrame({
+            'URL': urls_40,
+            'JSON-LD Blocks': df_all['jsonld_blocks_count'],
+            'Schema Types': df_all['schema_types'].str.join(', ').replace('', 'None'),
+            'AEO Ready': np.where(df_all['schema_blocks_count'] > 0, '✅ Yes', '❌ Missing')
+        })
         st.dataframe(df_schema, use_container_width=True)
         
         # Schema recommendations
@@ -0,0 +1,199 @@
+"""
+Offline benchmark of the analysis engine.
+
+    python -m benchmarks.bench_analyzer                  # full corpus
+    python -m benchmarks.bench_analyzer --quick          # 10KB and 100KB only
+    python -m benchmarks.bench_analyzer --save-baseline  # record this machine's numbers
+    python -m benchmarks.bench_analyzer --fail-on-regression
+
+Each document is timed stage by stage: the shared document scan, every
+analyzer on top of it, and the whole ``analyze_html_structure`` call from a
+cold start. Times are the best of ``--repeat`` runs; peak memory is measured
+in a separate tracemalloc pass so it does not distort the timings. Results
+are compared against ``benchmarks/baseline.json`` when it exists.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+from webintel.analyzer import ANALYZER_VERSION, HTMLAnalyzer
+from webintel.registry import ANALYZERS
+from webintel.scan import DocumentScan
+
+from .corpus import PAGES_DIR, SHAPES, SIZES, corpus
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# A stage regresses when it is this much slower (or bigger) than the baseline...
+DEFAULT_THRESHOLD = 0.20
+# ...and by more than these absolute amounts, so noise on tiny numbers is ignored
+MIN_DELTA_MS = 1.0
+MIN_DELTA_KB = 256.0
+
+# Page URL used by the URL-aware analyzers
+BENCH_URL = 'https://example.com/guides/answer-engine-optimization-2025/'
+
+
+def _stages(analyzer: HTMLAnalyzer, html: str) -> List[Tuple[str, Callable[[], Any]]]:
+    """(name, call) for every registered analyzer; they reuse the warm scan"""
+    # Analyzers that build on other metrics read those of a full analysis
+    inputs = {'document': html, 'html': html, 'url': BENCH_URL,
+              'analysis': analyzer.analyze_html_structure(html, {'url': BENCH_URL})}
+    return [(spec.name, partial(analyzer.run_analyzer, spec, inputs)) for spec in ANALYZERS]
+
+
+def _full(analyzer: HTMLAnalyzer, html: str) -> Callable[[], Any]:
+    def run():
+        # Cold start: no scan to reuse
+        analyzer._last_scan = None
+        return analyzer.analyze_html_structure(html, {'url': BENCH_URL})
+    return run
+
+
+def _best_time(call: Callable[[], Any], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+def _peak_kb(call: Callable[[], Any]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        call()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_document(html: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    """{stage: {'time_ms', 'peak_kb'}} for one document"""
+    analyzer = HTMLAnalyzer()
+    results = {}
+
+    scan = lambda: DocumentScan(html)
+    results['scan'] = {'time_ms': _best_time(scan, repeat), 'peak_kb': _peak_kb(scan)}
+
+    analyzer._last_scan = DocumentScan(html)
+    for name, call in _stages(analyzer, html):
+        results[name] = {'time_ms': _best_time(call, repeat), 'peak_kb': _peak_kb(call)}
+
+    full = _full(analyzer, html)
+    results['total'] = {'time_ms': _best_time(full, repeat), 'peak_kb': _peak_kb(full)}
+    analyzer.close()
+    return results
+
+
+def compare(current: Dict[str, Dict[str, Dict[str, float]]], baseline: Dict[str, Dict[str, Dict[str, float]]],
+            threshold: float) -> List[str]:
+    """Human-readable regressions of ``current`` against ``baseline``"""
+    regressions = []
+    for doc, stages in current.items():
+        for stage, numbers in stages.items():
+            before = baseline.get(doc, {}).get(stage)
+            if not before:
+                continue
+            for field, min_delta, unit in (('time_ms', MIN_DELTA_MS, 'ms'), ('peak_kb', MIN_DELTA_KB, 'KB')):
+                old, new = before.get(field), numbers[field]
+                if old is None:
+                    continue
+                if new > old * (1 + threshold) and new - old > min_delta:
+                    regressions.append(f"{doc} {stage}: {field} {old:.1f}{unit} -> {new:.1f}{unit} "
+                                       f"(+{(new / old - 1) * 100 if old else float('inf'):.0f}%)")
+    return regressions
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, Dict[str, float]]]):
+    payload = {
+        'analyzer_version': ANALYZER_VERSION,
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()}",
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=1, sort_keys=True)
+        f.write('\n')
+
+
+def _print_document(name: str, size: int, stages: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]):
+    print(f"\n{name} ({size / 1024:.0f} KB)")
+    for stage, numbers in stages.items():
+        line = f"  {stage:<20} {numbers['time_ms']:>10.2f} ms {numbers['peak_kb']:>10.0f} KB"
+        before = baseline.get(stage)
+        if before and before.get('time_ms'):
+            line += f"   {(numbers['time_ms'] / before['time_ms'] - 1) * 100:>+6.0f}% vs baseline"
+        print(line)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_analyzer', description='Benchmark the HTML analyzers offline')
+    parser.add_argument('--shapes', nargs='+', choices=sorted(SHAPES), help='Synthetic page shapes (default: all)')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), help='Synthetic page sizes (default: all)')
+    parser.add_argument('--quick', action='store_true', help='Only the 10KB and 100KB pages')
+    parser.add_argument('--pages', default=PAGES_DIR, help='Directory of saved real pages (*.html) to include (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing runs per stage, best is kept (default: %(default)s)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline file (default: %(default)s)')
+    parser.add_argument('--save-baseline', action='store_true', help='Write these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Allowed slowdown as a fraction (default: %(default)s)')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 when a stage regressed')
+    parser.add_argument('--json', help='Also write the raw results to this file')
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    sizes = ['10KB', '100KB'] if args.quick and not args.sizes else args.sizes
+    baseline = load_baseline(args.baseline).get('results', {})
+
+    results = {}
+    for name, html in corpus(args.shapes, sizes, args.pages):
+        results[name] = bench_document(html, max(1, args.repeat))
+        _print_document(name, len(html), results[name], baseline.get(name, {}))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+
+    if args.save_baseline:
+        # Keep entries for documents that were not part of this run
+        merged = dict(baseline)
+        merged.update(results)
+        save_baseline(args.baseline, merged)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("\nNo baseline to compare against (run with --save-baseline)")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold * 100:.0f}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1 if args.fail_on_regression else 0
+
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
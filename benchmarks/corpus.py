@@ -0,0 +1,133 @@
+"""
+Benchmark corpus: deterministic synthetic pages plus saved real pages.
+
+Every synthetic page is generated from a fixed seed, so a given shape and
+size is byte-for-byte identical between runs and machines, and nothing needs
+the network.
+"""
+import os
+import random
+from typing import Callable, Dict, Iterator, List, Tuple
+
+SIZES = {
+    '10KB': 10 * 1024,
+    '100KB': 100 * 1024,
+    '1MB': 1024 * 1024,
+    '2MB': 2 * 1024 * 1024,
+    '10MB': 10 * 1024 * 1024,
+}
+
+# Saved real pages (*.html) picked up by default
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+_WORDS = ('answer engine optimization guide best practices structured data schema markup content '
+          'search results featured snippet paragraph table list heading page site users questions '
+          'product review price compare 2024 2025 how what why when update fresh semantic').split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _head(rng: random.Random, title: str) -> str:
+    links = ''.join(f'<link rel="stylesheet" href="/assets/css/style{i}.css">' for i in range(4))
+    scripts = ''.join(f'<script src="/assets/js/app{i}.js" defer></script>' for i in range(6))
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f'<title>{title}</title>'
+        f'<meta name="description" content="{_sentence(rng, 18)}">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        f'{links}{scripts}<style>.hero{{display:flex}} .card > p{{margin:0}}</style>'
+        '<script type="application/ld+json">{"@context":"https://schema.org","@type":"Article",'
+        '"headline":"Benchmark","datePublished":"2025-01-01"}</script></head>'
+    )
+
+
+def _article_block(rng: random.Random, i: int) -> str:
+    paragraphs = ''.join(f'<p>{_sentence(rng, rng.randint(8, 120))} <a href="/guides/topic-{i}/part-{j}">more</a></p>'
+                         for j in range(rng.randint(2, 5)))
+    items = ''.join(f'<li>{_sentence(rng, rng.randint(3, 12))}</li>' for _ in range(rng.randint(3, 8)))
+    return (
+        f'<section class="card flex text-lg"><h2>{_sentence(rng, 6)}</h2>{paragraphs}'
+        f'<h3>{_sentence(rng, 4)}</h3><ul>{items}</ul>'
+        f'<img src="/img/{i}.webp" alt="{_sentence(rng, 3)}" loading="lazy"></section>'
+    )
+
+
+def _table_block(rng: random.Random, i: int) -> str:
+    columns = rng.randint(3, 8)
+    header = '<tr>' + ''.join(f'<th>Col {c}</th>' for c in range(columns)) + '</tr>'
+    rows = ''.join('<tr>' + ''.join(f'<td>{rng.randint(0, 9999)}</td>' for _ in range(columns)) + '</tr>'
+                   for _ in range(rng.randint(5, 40)))
+    return f'<table class="data"><thead>{header}</thead><tbody>{rows}</tbody></table><p>{_sentence(rng, 20)}</p>'
+
+
+def _script_block(rng: random.Random, i: int) -> str:
+    # Comparisons and markup inside strings are what trips naive tag scanners
+    lines = ''.join(f'if (a{j} < b{j} && c > {j}) {{ el.innerHTML = "<div class=\\"x{j}\\"><p>{_sentence(rng, 5)}</p></div>"; }}\n'
+                    for j in range(rng.randint(50, 200)))
+    state = ','.join(f'"k{j}":"{_sentence(rng, 6)}"' for j in range(rng.randint(20, 100)))
+    return f'<script>window.__STATE_{i}__={{{state}}};\n{lines}</script><div id="root-{i}"></div>'
+
+
+def _paragraph_block(rng: random.Random, i: int) -> str:
+    return ''.join(f'<p>{_sentence(rng, rng.randint(5, 180))}</p>' for _ in range(20))
+
+
+def _nested_list_block(rng: random.Random, i: int) -> str:
+    depth = rng.randint(10, 60)
+    tag = rng.choice(('ul', 'ol'))
+    opening = ''.join(f'<{tag}><li>{_sentence(rng, 4)}' for _ in range(depth))
+    closing = f'</li></{tag}>' * depth
+    return opening + closing
+
+
+def _malformed_block(rng: random.Random, i: int) -> str:
+    # Unclosed elements and stray '<' were quadratic for the old regex analyzers
+    return ''.join(f'<p>{_sentence(rng, 12)} a < b <td>{j}<h2>{_sentence(rng, 3)}<li>x'
+                   for j in range(10))
+
+
+SHAPES: Dict[str, Callable[[random.Random, int], str]] = {
+    'article': _article_block,
+    'tables': _table_block,
+    'inline_scripts': _script_block,
+    'paragraphs': _paragraph_block,
+    'nested_lists': _nested_list_block,
+    'malformed': _malformed_block,
+}
+
+
+def synthetic_page(shape: str, size: int, seed: int = 2025) -> str:
+    """A page of roughly ``size`` characters made of ``shape`` blocks"""
+    rng = random.Random(f"{shape}:{size}:{seed}")
+    block = SHAPES[shape]
+    parts = [_head(rng, f"{shape.replace('_', ' ').title()} benchmark 2025"), '<body><main>']
+    length = sum(len(part) for part in parts)
+    i = 0
+    while length < size:
+        part = block(rng, i)
+        parts.append(part)
+        length += len(part)
+        i += 1
+    parts.append('</main><footer><p>Footer</p></footer></body></html>')
+    return ''.join(parts)
+
+
+def saved_pages(directory: str = PAGES_DIR) -> Iterator[Tuple[str, str]]:
+    """(name, html) for every saved *.html page in ``directory``"""
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8', errors='replace') as f:
+                yield f"saved/{name}", f.read()
+
+
+def corpus(shapes: List[str] = None, sizes: List[str] = None, pages_dir: str = PAGES_DIR) -> Iterator[Tuple[str, str]]:
+    """(name, html) for the selected synthetic pages followed by the saved pages"""
+    for shape in shapes or list(SHAPES):
+        for size in sizes or list(SIZES):
+            yield f"{shape}/{size}", synthetic_page(shape, SIZES[size])
+    if pages_dir:
+        yield from saved_pages(pages_dir)
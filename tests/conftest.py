@@ -0,0 +1,47 @@
+"""Shared fixtures: a local web server, so fetch tests never touch the network."""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+import pytest
+
+
+class Site:
+    """Pages served by the ``site`` fixture, and the paths requested so far"""
+
+    def __init__(self, port: int):
+        self.base = f'http://127.0.0.1:{port}'
+        self.pages: Dict[str, Tuple[int, str, bytes]] = {}
+        self.requests: List[str] = []
+
+    def add(self, path: str, body, content_type: str = 'text/html; charset=utf-8', status: int = 200):
+        self.pages[path] = (status, content_type, body.encode('utf-8') if isinstance(body, str) else body)
+        return self.url(path)
+
+    def url(self, path: str) -> str:
+        return self.base + path
+
+
+@pytest.fixture
+def site():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            server.site.requests.append(self.path)
+            status, content_type, body = server.site.pages.get(self.path, (404, 'text/plain', b'not found'))
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.site = Site(server.server_address[1])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.site
+    server.shutdown()
+    server.server_close()
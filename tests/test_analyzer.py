@@ -0,0 +1,47 @@
+"""HTMLAnalyzer.fetch_html, sequential and hedged, against the local test server."""
+import pytest
+
+from webintel import analyzer as analyzer_module
+from webintel.analyzer import HTMLAnalyzer
+from webintel.ratelimit import HostRateLimiter
+
+PAGE = '<html><head><title>Hello</title></head><body><p>Hello.</p></body></html>'
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = HTMLAnalyzer(rate_limiter=HostRateLimiter(rate=1000, burst=1000, jitter=0))
+    yield analyzer
+    analyzer.close()
+
+
+def test_sequential_fetch_runs_on_the_calling_thread(site, analyzer, monkeypatch):
+    url = site.add('/page', PAGE)
+
+    def no_executor(*args, **kwargs):
+        raise AssertionError("the fallback chain does not need threads")
+
+    monkeypatch.setattr(analyzer_module, 'ThreadPoolExecutor', no_executor)
+    result = analyzer.fetch_html(url, timeout=5)
+    assert result['success'] and result['html'] == PAGE
+    assert result['method'] == 'stealth_requests'
+    assert [attempt['method'] for attempt in result['fetch_timings']] == ['stealth_requests']
+
+
+def test_sequential_fetch_falls_back(site, analyzer):
+    result = analyzer.fetch_html(site.url('/missing'), timeout=5)
+    assert not result['success']
+    assert [attempt['method'] for attempt in result['fetch_timings']] == ['stealth_requests', 'stealth_httpx', 'minimal_headers']
+    assert result['error'].startswith('All methods failed - Primary method:')
+
+
+def test_hedged_attempts_do_not_share_the_session(site, analyzer, monkeypatch):
+    url = site.add('/page', PAGE)
+
+    def shared_session_get(*args, **kwargs):
+        raise AssertionError("hedged attempts must use their own session")
+
+    monkeypatch.setattr(analyzer.session, 'get', shared_session_get)
+    result = analyzer.fetch_html(url, timeout=5, hedge_delay=0.5)
+    assert result['success'] and result['html'] == PAGE
+    assert [attempt['method'] for attempt in result['fetch_timings']] == ['stealth_requests']
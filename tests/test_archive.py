@@ -0,0 +1,34 @@
+"""The results archive, written whole or in batches of one run."""
+import os
+from datetime import datetime, timezone
+
+from webintel.archive import frame_records, list_runs, load_archive, write_archive
+
+
+def record(url: str, ratio: float) -> dict:
+    return {'url': url, 'final_url': url, 'status_code': 200, 'method': 'stealth_httpx',
+            'atomic_paragraph_ratio': ratio, 'schema_types': ['Article'], 'most_common_tags': [('p', 4)]}
+
+
+def test_round_trip(tmp_path):
+    root = str(tmp_path / 'archive')
+    run_id = write_archive([record('https://www.example.com/a', 0.5)], root, 'parquet', 'zstd', 'run1')
+    records = frame_records(load_archive(root))
+    assert run_id == 'run1'
+    assert records[0]['url'] == 'https://www.example.com/a'
+    assert records[0]['domain'] == 'example.com'
+    assert records[0]['schema_types'] == ['Article']
+    assert records[0]['most_common_tags'] == [('p', 4)]
+
+
+def test_run_written_in_parts(tmp_path):
+    root = str(tmp_path / 'archive')
+    started = datetime(2025, 6, 1, 23, 59, tzinfo=timezone.utc)
+    for part in range(3):
+        batch = [record(f'https://example.com/{part}/{i}', i / 10) for i in range(2)]
+        write_archive(batch, root, 'parquet', 'zstd', 'run1', part=part, analyzed_at=started)
+    files = [name for _, _, names in os.walk(root) for name in names]
+    assert len(files) == 3
+    runs = list_runs(root)
+    assert runs[['run_id', 'run_date', 'pages']].values.tolist() == [['run1', '2025-06-01', 6]]
+    assert sorted(load_archive(root)['url']) == sorted(f'https://example.com/{p}/{i}' for p in range(3) for i in range(2))
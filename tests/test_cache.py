@@ -0,0 +1,44 @@
+"""FetchCache returns bodies exactly as they were fetched."""
+from webintel.cache import FetchCache
+
+BODY = '<html>\r\n<head><title>Café — résumé</title></head>\r\n<body>\r<p>mixed\nline\r\nendings</p>\r\n</body></html>\r\n'
+
+
+def fetch_result(html: str, status_code: int = 200) -> dict:
+    return {'success': True, 'html': html, 'status_code': status_code, 'url': 'https://example.com/page',
+            'method': 'httpx', 'headers': {'ETag': '"v1"'}}
+
+
+def test_round_trip_keeps_body(tmp_path):
+    cache = FetchCache(str(tmp_path))
+    cache.store('https://example.com/page', fetch_result(BODY))
+    cached = cache.lookup('https://example.com/page')
+    assert cached['fresh']
+    assert cached['result']['html'] == BODY
+    assert cached['result']['status_code'] == 200
+
+
+def test_revalidated_body_unchanged(tmp_path):
+    cache = FetchCache(str(tmp_path))
+    cache.store('https://example.com/page', fetch_result(BODY))
+    cached = cache.lookup('https://EXAMPLE.com/page#top')
+    assert cache.conditional_headers(cached) == {'If-None-Match': '"v1"'}
+    result = cache.resolve('https://example.com/page', cached, fetch_result('', status_code=304))
+    assert result['cache'] == 'revalidated'
+    assert result['html'] == BODY
+
+
+def test_unsolicited_304_is_not_cached(tmp_path):
+    cache = FetchCache(str(tmp_path))
+    result = cache.resolve('https://example.com/page', None, fetch_result('', status_code=304))
+    assert not result['success']
+    assert cache.lookup('https://example.com/page') is None
+
+
+def test_clear(tmp_path):
+    cache = FetchCache(str(tmp_path))
+    cache.store('https://example.com/page', fetch_result(BODY))
+    cache.clear()
+    assert cache.lookup('https://example.com/page') is None
+    cache.store('https://example.com/page', fetch_result(BODY))
+    assert cache.lookup('https://example.com/page')['result']['html'] == BODY
@@ -0,0 +1,31 @@
+"""The analyze command end to end against the local test server."""
+import json
+import os
+
+from webintel import cli
+from webintel.archive import list_runs
+from webintel.history import HistoryStore
+
+
+def test_archive_and_history_written_in_batches(site, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(cli, 'RECORD_BATCH', 2)
+    urls = [site.add(f'/p{i}', f'<html><h2>Page {i}</h2><p>Text.</p></html>') for i in range(5)]
+    url_file = tmp_path / 'urls.txt'
+    url_file.write_text('\n'.join(urls + [site.url('/missing')]) + '\n')
+    out, archive, history = tmp_path / 'out.jsonl', tmp_path / 'archive', tmp_path / 'history.sqlite3'
+
+    code = cli.main(['analyze', str(url_file), '--out', str(out), '--no-cache', '--workers', '0', '--rate', '1000',
+                     '--jitter', '0', '--archive', str(archive), '--history', str(history), '--label', 'nightly'])
+    assert code == 0
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert len(records) == 6 and sum('error' in record for record in records) == 1
+
+    # Five pages in batches of two
+    assert len([name for _, _, names in os.walk(archive) for name in names]) == 3
+    runs = list_runs(str(archive))
+    assert runs['pages'].tolist() == [5]
+    stored = HistoryStore(str(history)).runs()
+    assert stored[['run_id', 'label', 'pages']].values.tolist() == [[runs['run_id'][0], 'nightly', 5]]
+    err = capsys.readouterr().err
+    assert 'Analyzed 5 of 6 URLs' in err
+    assert f"Recorded 5 pages as run {runs['run_id'][0]}" in err
@@ -0,0 +1,83 @@
+"""SiteCrawler frontier, depth and scope, and the crawl command, against the local test server."""
+import asyncio
+import json
+
+from webintel.analyzer import HTMLAnalyzer
+from webintel.cli import main
+from webintel.crawl import SiteCrawler, extract_links, link_priority
+from webintel.fetcher import AsyncFetcher
+from webintel.ratelimit import HostRateLimiter
+
+
+def links(*hrefs: str) -> str:
+    return '<html><body>' + ''.join(f'<a href="{href}">{href}</a>' for href in hrefs) + '</body></html>'
+
+
+def build_site(site):
+    site.add('/', links('/a', '/b?page=2', '/b', 'https://elsewhere.example/x', '/logo.png', 'mailto:me@example.com'))
+    site.add('/a', links('/a/deep', '/'))
+    site.add('/b', links('/b/deep'))
+    site.add('/b?page=2', links())
+    site.add('/a/deep', links('/a/deep/deeper'))
+    site.add('/b/deep', links())
+    site.add('/a/deep/deeper', links())
+
+
+def crawl(site, **kwargs):
+    fetcher = AsyncFetcher(HTMLAnalyzer(), timeout=5, concurrency=1, per_host=1,
+                           rate_limiter=HostRateLimiter(rate=1000, burst=1000, jitter=0))
+    crawler = SiteCrawler(fetcher, **kwargs)
+    results = []
+
+    def on_result(index, url, result):
+        results.append((index, url[len(site.base):], result['crawl_depth']))
+
+    asyncio.run(crawler.stream([site.url('/')], on_result))
+    return crawler, sorted(results)
+
+
+def test_extract_links():
+    html = '<base href="/docs/"><a href="guide#top">x</a><a rel="nofollow" href="/skip">y</a><area href="map">'
+    assert extract_links(html, 'https://example.com/') == ['https://example.com/docs/guide', 'https://example.com/docs/map']
+
+
+def test_link_priority():
+    assert sorted(['https://e.com/a/b', 'https://e.com/a?x=1', 'https://e.com/c'], key=lambda url: link_priority(url, 1)) == \
+        ['https://e.com/c', 'https://e.com/a/b', 'https://e.com/a?x=1']
+
+
+def test_depth_limit_and_frontier_order(site):
+    build_site(site)
+    crawler, results = crawl(site, max_depth=2)
+    # Shallow pages first; at equal depth no query string, then shorter paths
+    assert results == [(0, '/', 0), (1, '/a', 1), (2, '/b', 1), (3, '/b?page=2', 1), (4, '/a/deep', 2), (5, '/b/deep', 2)]
+    assert '/a/deep/deeper' not in site.requests
+    assert crawler.stats['out_of_scope'] == 2
+    assert crawler.stats['max_depth_reached'] == 2
+
+
+def test_page_budget(site):
+    build_site(site)
+    crawler, results = crawl(site, max_depth=5, max_pages=3)
+    assert [path for _, path, _ in results] == ['/', '/a', '/b']
+    assert crawler.stats['scheduled'] == 3
+
+
+def test_robots_disallow(site):
+    build_site(site)
+    site.add('/robots.txt', 'User-agent: *\nDisallow: /a\n', content_type='text/plain')
+    crawler, results = crawl(site, max_depth=2)
+    assert [path for _, path, _ in results] == ['/', '/b', '/b?page=2', '/b/deep']
+    assert crawler.stats['blocked_by_robots'] == 1
+
+
+def test_crawl_command(site, tmp_path, capsys):
+    build_site(site)
+    out = tmp_path / 'site.jsonl'
+    code = main(['crawl', site.url('/'), '--depth', '1', '--out', str(out), '--no-cache', '--workers', '0',
+                 '--rate', '1000', '--jitter', '0'])
+    assert code == 0
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert sorted((record['url'][len(site.base):], record['crawl_depth']) for record in records) == \
+        [('/', 0), ('/a', 1), ('/b', 1), ('/b?page=2', 1)]
+    assert 'Analyzed 4 of 4 URLs' in capsys.readouterr().err
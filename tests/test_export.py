@@ -0,0 +1,22 @@
+"""Tabular output keeps every column a command adds to its records."""
+import csv
+import io
+
+from webintel.export import CsvWriter, record_fields
+
+
+def test_extra_fields_are_written():
+    stream = io.StringIO()
+    writer = CsvWriter(stream, extra_fields=['crawl_depth'])
+    writer.write({'url': 'https://example.com/', 'total_tags': 3, 'crawl_depth': 2})
+    writer.write({'url': 'https://example.com/gone', 'error': 'HTTP 404', 'crawl_depth': 1})
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert list(rows[0])[-2:] == ['crawl_depth', 'error']
+    assert [row['crawl_depth'] for row in rows] == ['2', '1']
+    assert rows[1]['error'] == 'HTTP 404'
+
+
+def test_default_columns():
+    stream = io.StringIO()
+    CsvWriter(stream)
+    assert next(csv.reader(io.StringIO(stream.getvalue()))) == record_fields()
@@ -0,0 +1,51 @@
+"""AsyncFetcher.stream against the local test server."""
+import asyncio
+
+import pytest
+
+from webintel.analyzer import HTMLAnalyzer
+from webintel.fetcher import AsyncFetcher
+from webintel.ratelimit import HostRateLimiter
+
+
+class ConsumerFailed(Exception):
+    pass
+
+
+def make_fetcher(**kwargs) -> AsyncFetcher:
+    return AsyncFetcher(HTMLAnalyzer(), timeout=5, rate_limiter=HostRateLimiter(rate=1000, burst=1000, jitter=0), **kwargs)
+
+
+def test_results_in_input_order(site):
+    urls = [site.add(f'/p{i}', f'<html><p>page {i}</p></html>') for i in range(6)] + [site.url('/missing')]
+    results = make_fetcher(concurrency=3).run(urls)
+    assert [result['success'] for result in results] == [True] * 6 + [False]
+    assert [result['html'] for result in results[:6]] == [f'<html><p>page {i}</p></html>' for i in range(6)]
+    assert '404' in results[6]['error']
+
+
+def test_consumer_error_stops_scheduling(site):
+    urls = [site.add(f'/p{i}', '<html></html>') for i in range(50)]
+    fetcher = make_fetcher(concurrency=1, per_host=1)
+
+    def on_result(index, url, result):
+        raise ConsumerFailed(url)
+
+    with pytest.raises(ConsumerFailed):
+        asyncio.run(fetcher.stream(urls, on_result))
+    assert len(site.requests) < len(urls)
+
+
+def test_consumer_error_after_last_url_is_raised(site):
+    url = site.add('/only', '<html></html>')
+
+    async def urls():
+        yield url
+        # The result arrives while the source is still producing
+        await asyncio.sleep(0.5)
+
+    def on_result(index, url, result):
+        raise ConsumerFailed(url)
+
+    with pytest.raises(ConsumerFailed):
+        asyncio.run(make_fetcher().stream(urls(), on_result))
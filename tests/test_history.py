@@ -0,0 +1,56 @@
+"""HistoryStore runs, batches and change detection."""
+import pytest
+
+from webintel.history import HistoryStore
+
+
+def record(url: str, ratio: float) -> dict:
+    return {'url': url, 'final_url': url, 'status_code': 200, 'atomic_paragraph_ratio': ratio, 'h2_count': 3}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(str(tmp_path / 'history.sqlite3'))
+
+
+def test_changes_against_previous_observation(store):
+    store.record_run([record('https://a.com/', 0.8), record('https://b.com/', 0.5)], 'run1', analyzed_at='2025-01-01')
+    store.record_run([record('https://a.com/', 0.6), record('https://b.com/', 0.5), record('https://c.com/', 0.1)],
+                     'run2', analyzed_at='2025-02-01')
+    drops = store.changes('atomic_paragraph_ratio')
+    assert drops[['url', 'previous_run']].values.tolist() == [['https://a.com/', 'run1']]
+    assert drops['change'].round(3).tolist() == [-0.2]
+    assert store.changes('atomic_paragraph_ratio', direction='rise').empty
+    assert store.changes('atomic_paragraph_ratio', min_change=0.3).empty
+
+
+def test_changes_against_a_run(store):
+    store.record_run([record('https://a.com/', 0.2)], 'run1', analyzed_at='2025-01-01')
+    store.record_run([record('https://a.com/', 0.9)], 'run2', analyzed_at='2025-02-01')
+    store.record_run([record('https://a.com/', 0.5)], 'run3', analyzed_at='2025-03-01')
+    assert store.changes('atomic_paragraph_ratio', direction='any')['previous_run'].tolist() == ['run2']
+    rise = store.changes('atomic_paragraph_ratio', against='run1', direction='rise')
+    assert rise['change'].round(3).tolist() == [0.3]
+    with pytest.raises(KeyError):
+        store.changes('atomic_paragraph_ratio', against='missing')
+    with pytest.raises(ValueError):
+        store.changes('not_a_metric')
+
+
+def test_run_recorded_in_batches(store):
+    store.record_run([record('https://a.com/', 0.1), record('https://b.com/', 0.2)], 'run1', label='batched',
+                     analyzed_at='2025-01-01', append=True)
+    store.record_run([record('https://c.com/', 0.3), record('https://a.com/', 0.4)], 'run1', label='batched',
+                     analyzed_at='2025-01-01', append=True)
+    runs = store.runs()
+    assert runs[['run_id', 'label', 'pages']].values.tolist() == [['run1', 'batched', 3]]
+    # A URL seen twice in the run keeps its last result
+    history = store.metric_history('https://a.com/', 'atomic_paragraph_ratio')
+    assert history['atomic_paragraph_ratio'].tolist() == [0.4]
+
+
+def test_unselected_metrics_stay_empty(store):
+    store.record_run([{'url': 'https://a.com/', 'h2_count': 2}], 'run1')
+    history = store.metric_history('https://a.com/', ['h2_count', 'atomic_paragraph_ratio'])
+    assert history['h2_count'].tolist() == [2]
+    assert history['atomic_paragraph_ratio'].isna().all()
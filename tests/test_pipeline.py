@@ -0,0 +1,63 @@
+"""AnalysisPipeline stages, with a fetcher that serves pages from memory."""
+import asyncio
+
+import pytest
+
+from webintel.pipeline import AnalysisPipeline
+
+
+class MemoryFetcher:
+    """Serves ``pages`` (URL -> html) the way AsyncFetcher.stream reports results"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = 0
+
+    async def stream(self, urls, on_result):
+        for index, url in enumerate(urls):
+            await asyncio.sleep(0)
+            self.fetched += 1
+            html = self.pages.get(url)
+            if html is None:
+                result = {'success': False, 'error': 'HTTP 404', 'url': url}
+            else:
+                result = {'success': True, 'html': html, 'url': url, 'status_code': 200, 'method': 'memory'}
+            await on_result(index, url, result)
+
+
+def page(i: int) -> str:
+    return f'<html><head><title>Page {i}</title></head><body><h2>Part {i}</h2><p>Text {i}.</p></body></html>'
+
+
+def test_records_in_input_order():
+    pages = {f'https://example.com/{i}': page(i) for i in range(5)}
+    urls = list(pages) + ['https://example.com/missing']
+    seen = []
+    records = AnalysisPipeline(MemoryFetcher(pages), workers=0).run(
+        urls, lambda index, url, fetch_result, record: seen.append((index, record is None)))
+    assert [record['url'] for record in records[:5]] == urls[:5]
+    assert [record['paragraphs_count'] for record in records[:5]] == [1] * 5
+    assert records[5] is None
+    assert sorted(seen) == [(i, i == 5) for i in range(6)]
+
+
+class WriteFailed(Exception):
+    pass
+
+
+def test_failing_consumer_stops_the_run():
+    pages = {f'https://example.com/{i}': page(i) for i in range(50)}
+    fetcher = MemoryFetcher(pages)
+
+    def on_result(index, url, fetch_result, record):
+        raise WriteFailed('disk full')
+
+    pipeline = AnalysisPipeline(fetcher, workers=0, queue_size=2)
+
+    async def run():
+        # Before the fix the fetch stage blocked forever on the full queue
+        await asyncio.wait_for(pipeline.stream(list(pages), on_result), timeout=10)
+
+    with pytest.raises(WriteFailed):
+        asyncio.run(run())
+    assert fetcher.fetched < len(pages)
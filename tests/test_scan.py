@@ -0,0 +1,57 @@
+"""
+The single-pass scan against the regex implementation it replaced.
+
+``scan_expected.json`` holds the metrics the original ``re.findall`` based
+``HTMLAnalyzer`` computed for each page, quirks included (``<p`` also matching
+``<pre>``, unclosed elements). Framework detection is left out: it moved to
+the signature database since. Do not regenerate the file from the current
+code; a mismatch means a metric changed.
+"""
+import json
+import os
+
+import pytest
+
+from benchmarks.corpus import SHAPES, synthetic_page
+from webintel import scan
+from webintel.analyzer import HTMLAnalyzer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAGES_DIR = os.path.join(HERE, 'pages')
+URL = 'https://example.com/blog/2025/best-answer-engine-guide'
+
+with open(os.path.join(HERE, 'scan_expected.json'), encoding='utf-8') as f:
+    EXPECTED = json.load(f)
+
+
+def load_page(name: str) -> str:
+    if name.startswith('synthetic/'):
+        return synthetic_page(name.split('/', 1)[1], 10 * 1024)
+    with open(os.path.join(PAGES_DIR, name), encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def test_covers_every_page():
+    pages = {f'synthetic/{shape}' for shape in SHAPES} | set(os.listdir(PAGES_DIR))
+    assert pages == set(EXPECTED)
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED))
+def test_matches_regex_implementation(name):
+    analysis = HTMLAnalyzer().analyze_html_structure(load_page(name), {'url': URL})
+    # JSON turns tuples into lists, as in the expected file
+    analysis = json.loads(json.dumps(analysis))
+    expected = dict(EXPECTED[name])
+    # The regex implementation listed schema types from a set, in no stable order
+    analysis['schema_types'] = sorted(analysis['schema_types'])
+    expected['schema_types'] = sorted(expected['schema_types'])
+    assert {key: analysis.get(key) for key in expected} == expected
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED))
+def test_segment_size_does_not_change_metrics(name, monkeypatch):
+    # Elements and tokens cut by many segment boundaries, not just a few
+    html = load_page(name)
+    expected = HTMLAnalyzer().analyze_html_structure(html, {'url': URL})
+    monkeypatch.setattr(scan, 'SEGMENT_SIZE', 37)
+    assert HTMLAnalyzer().analyze_html_structure(html, {'url': URL}) == expected
@@ -0,0 +1,61 @@
+"""Sitemap parsing and SitemapReader against the local test server."""
+import gzip
+
+from webintel.sitemap import SitemapParser, SitemapReader, parse_lastmod
+
+NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def urlset(*entries) -> str:
+    items = ''.join(f'<url><loc>{loc}</loc>' + (f'<lastmod>{lastmod}</lastmod>' if lastmod else '') + '</url>'
+                    for loc, lastmod in entries)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{NS}">{items}</urlset>'
+
+
+def index(*entries) -> str:
+    items = ''.join(f'<sitemap><loc>{loc}</loc>' + (f'<lastmod>{lastmod}</lastmod>' if lastmod else '') + '</sitemap>'
+                    for loc, lastmod in entries)
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="{NS}">{items}</sitemapindex>'
+
+
+def test_parser_handles_any_chunking():
+    data = gzip.compress(urlset(*[(f'https://example.com/{i}', '2025-03-0{}'.format(i % 9 + 1)) for i in range(200)]).encode())
+    parser = SitemapParser()
+    entries = []
+    for start in range(0, len(data), 7):
+        entries += parser.feed(data[start:start + 7])
+    entries += parser.close()
+    assert [entry.loc for _, entry in entries] == [f'https://example.com/{i}' for i in range(200)]
+    assert entries[0][1].lastmod == parse_lastmod('2025-03-01')
+
+
+def test_parser_plain_text():
+    parser = SitemapParser()
+    entries = parser.feed(b'https://example.com/a\nhttps://exa') + parser.feed(b'mple.com/b\n\n') + parser.close()
+    assert [entry.loc for _, entry in entries] == ['https://example.com/a', 'https://example.com/b']
+
+
+def test_reader_follows_index_and_gzip(site):
+    site.add('/news.xml.gz', gzip.compress(urlset((site.url('/n1'), '2025-05-01'), (site.url('/n2'), '2024-01-01')).encode()),
+             content_type='application/x-gzip')
+    site.add('/pages.xml', urlset((site.url('/p1'), None), (site.url('/n1'), '2025-05-01')), content_type='application/xml')
+    site.add('/old.xml', urlset((site.url('/old'), '2020-01-01')), content_type='application/xml')
+    site.add('/sitemap.xml', index((site.url('/news.xml.gz'), '2025-05-02'), (site.url('/pages.xml'), None),
+                                   (site.url('/old.xml'), '2020-01-02'), (site.url('/gone.xml'), None)),
+             content_type='application/xml')
+
+    reader = SitemapReader(timeout=5, since='2025-01-01')
+    urls = reader.read([site.url('/sitemap.xml')])
+    assert sorted(path[len(site.base):] for path in urls) == ['/n1', '/p1']
+    assert reader.stats['duplicates'] == 1
+    assert reader.stats['filtered'] == 1
+    # The index says old.xml has not changed since before the date filter
+    assert reader.stats['skipped_sitemaps'] == 1
+    assert '/old.xml' not in site.requests
+    assert [url[len(site.base):] for url, _ in reader.errors] == ['/gone.xml']
+
+
+def test_reader_limit(site):
+    site.add('/sitemap.txt', '\n'.join(site.url(f'/{i}') for i in range(50)), content_type='text/plain')
+    reader = SitemapReader(timeout=5, limit=10)
+    assert len(reader.read([site.url('/sitemap.txt')])) == 10
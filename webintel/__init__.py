@@ -0,0 +1,8 @@
+"""
+WebIntel - AEO HTML analysis engine.
+
+The Streamlit app in ``app.py`` is a thin UI over this package.
+"""
+from .analyzer import HTMLAnalyzer
+
+__all__ = ['HTMLAnalyzer']
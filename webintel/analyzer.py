@@ -0,0 +1,739 @@
+"""
+HTML fetching and AEO structure analysis, independent of the Streamlit UI.
+"""
+import hashlib
+import json
+import random
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from . import registry as _registry_module
+from . import scan as _scan_module
+from . import signatures as _signatures_module
+from . import tokenizer as _tokenizer_module
+from .body import CHUNK_SIZE, DEFAULT_MAX_BODY_BYTES, BodyRejected, check_headers, decode_body, read_body, utf8_size
+from .cache import AnalysisCache, FetchCache
+from .fetchmetrics import record_attempt
+from .pool import ClientPool
+from .profiling import AnalysisTimer
+from .ratelimit import HostRateLimiter
+from .registry import AnalyzerSpec, plan_analysis
+from .scan import DocumentScan, strip_tags
+from .signatures import DEFAULT_SIGNATURES, SignatureDB, default_signatures
+
+
+def _source_version() -> str:
+    """Hash of the analysis code, so memoized results go stale when it changes"""
+    digest = hashlib.sha256()
+    for path in (__file__, _registry_module.__file__, _scan_module.__file__, _signatures_module.__file__,
+                 _tokenizer_module.__file__, DEFAULT_SIGNATURES):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+ANALYZER_VERSION = _source_version()
+
+
+def analysis_version(metrics: Iterable[str] = None, signatures: SignatureDB = None) -> str:
+    """
+    Version of the analyses made for a metric selection: ANALYZER_VERSION when
+    every analyzer runs, else qualified by the analyzers that do, so cached
+    and stored analyses of different selections are never mixed up. A
+    signature database other than the default qualifies it too.
+    """
+    plan = [step.name for step in plan_analysis(metrics)]
+    version = ANALYZER_VERSION
+    if plan != [step.name for step in plan_analysis()]:
+        version += f"+{hashlib.sha256(','.join(plan).encode('utf-8')).hexdigest()[:8]}"
+    if signatures is not None and 'detect_frameworks' in plan and signatures.digest != default_signatures().digest:
+        version += f"+signatures-{signatures.digest[:8]}"
+    return version
+
+# Seconds of analysis per document before the rest of it is skipped
+DEFAULT_TIME_BUDGET = 10.0
+
+
+class HTMLAnalyzer:
+    def __init__(self, http2: bool = False, cache: FetchCache = None, analysis_cache: AnalysisCache = None,
+                 max_bytes: Optional[int] = DEFAULT_MAX_BODY_BYTES, rate_limiter: HostRateLimiter = None,
+                 instrument: bool = False, time_budget: Optional[float] = DEFAULT_TIME_BUDGET,
+                 metrics: Iterable[str] = None, signatures: SignatureDB = None):
+        # Long-lived session and per-origin httpx clients: connections stay
+        # alive between requests, headers are still rotated per request
+        self.session = requests.Session()
+        self.session.max_redirects = 10
+        self.pool = ClientPool(http2=http2)
+        # Optional disk cache of fetch results (see webintel.cache)
+        self.cache = cache
+        # Optional memo of analyze_html_structure results
+        self.analysis_cache = analysis_cache
+        # Pages over this many bytes are dropped while downloading; None for no cap
+        self.max_bytes = max_bytes
+        # Politeness for fetch_html (AsyncFetcher has its own)
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        # Attach per-analyzer timings to every analysis (see webintel.profiling)
+        self.instrument = instrument
+        # Documents still being scanned after this many seconds get partial metrics; None for no limit
+        self.time_budget = time_budget
+        # Metrics (or metric groups, see webintel.registry) to compute; None for all
+        self.metrics = list(metrics) if metrics is not None else None
+        self.plan = plan_analysis(self.metrics)
+        # Technology signatures for detect_frameworks (see webintel.signatures)
+        self.signatures = signatures or default_signatures()
+        self.version = analysis_version(self.metrics, self.signatures)
+        # Rotate between multiple realistic user agents
+        self.user_agents = [
+            # Chrome on Windows
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
+            
+            # Firefox on Windows
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0',
+            
+            # Chrome on Mac
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+            
+            # Safari on Mac
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebLib/605.1.15 (KHTML, like Gecko) Version/16.6 Safari/605.1.15',
+            
+            # Edge on Windows
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.0.0',
+            
+            # Chrome on Linux
+            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        ]
+        
+        # Base headers that will be updated per request
+        self.base_headers = {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Cache-Control': 'max-age=0',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Sec-Fetch-User': '?1',
+            'Upgrade-Insecure-Requests': '1',
+            'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+            'sec-ch-ua-mobile': '?0',
+            'sec-ch-ua-platform': '"Windows"'
+        }
+        
+        # Most recent document walk, shared by the analyze_* methods
+        self._last_scan = None
+    
+    def get_stealth_headers(self):
+        """Generate realistic, randomized headers for each request"""
+        user_agent = random.choice(self.user_agents)
+        headers = self.base_headers.copy()
+        headers['User-Agent'] = user_agent
+        
+        # Add some randomization to headers
+        if random.random() > 0.5:
+            headers['DNT'] = '1'
+        
+        # Randomize Accept-Language slightly
+        languages = ['en-US,en;q=0.9', 'en-US,en;q=0.9,es;q=0.8', 'en-US,en;q=0.9,fr;q=0.8']
+        headers['Accept-Language'] = random.choice(languages)
+        
+        # Sometimes add referer (as if coming from Google)
+        if random.random() > 0.7:
+            headers['Referer'] = 'https://www.google.com/'
+        
+        return headers
+
+    # Fallback chain: (method, label for errors), tried in this order
+    fetch_strategies = [
+        ('stealth_requests', 'Primary method'),
+        ('stealth_httpx', 'Secondary method'),
+        ('minimal_headers', 'Minimal headers'),
+    ]
+
+    def fetch_html(self, url: str, timeout: int = 10, hedge_delay: float = None) -> Dict[str, Any]:
+        """
+        Fetch HTML content from URL with advanced anti-detection methods
+
+        ``timeout`` is one deadline for the whole fallback chain. With a
+        ``hedge_delay`` the next method also starts when the running ones have
+        not answered within that many seconds, and the first success wins.
+        Phase timings of the finished attempts are returned as ``fetch_timings``.
+        """
+        # Ensure URL has protocol
+        if not url.startswith(('http://', 'https://')):
+            url = 'https://' + url
+        
+        # Fresh cache entries skip the network, stale ones are revalidated
+        cached = self.cache.lookup(url) if self.cache else None
+        if cached and cached['fresh']:
+            return dict(cached['result'], cache='hit')
+        
+        attempts = []
+        result = self._fetch_chain(url, timeout, hedge_delay, self.cache.conditional_headers(cached) if cached else {}, attempts)
+        if self.cache:
+            result = self.cache.resolve(url, cached, result)
+        # Losers still running in the background are not included
+        result['fetch_timings'] = list(attempts)
+        return result
+    
+    def _fetch_chain(self, url: str, timeout: float, hedge_delay: float, extra_headers: Dict[str, str],
+                     attempts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Per-host token bucket with jitter instead of a blanket random sleep
+        self.rate_limiter.wait_sync(url, self._load_robots)
+        
+        deadline = time.monotonic() + timeout
+        if hedge_delay is None:
+            return self._fetch_sequential(url, timeout, deadline, extra_headers, attempts)
+        
+        strategies = self.fetch_strategies
+        errors = {}
+        running = {}
+        next_strategy = 0
+        
+        def start(index: int, remaining: float):
+            # Attempts run side by side, so each gets its own requests session:
+            # a Session's cookie jar and redirect handling are not thread-safe
+            future = executor.submit(self._fetch_with, strategies[index][0], url, remaining, extra_headers, attempts, True)
+            running[future] = index
+        
+        executor = ThreadPoolExecutor(max_workers=len(strategies))
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                
+                # Start the next method when nothing is running, or the
+                # running ones are past the hedge delay
+                if not running:
+                    if next_strategy == len(strategies):
+                        break
+                    start(next_strategy, remaining)
+                    next_strategy += 1
+                
+                can_hedge = next_strategy < len(strategies)
+                wait_for = min(remaining, hedge_delay) if can_hedge else remaining
+                done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        return future.result()
+                    except BodyRejected as e:
+                        # Other methods would get the same body
+                        return {'success': False, 'error': str(e), 'url': url}
+                    except Exception as e:
+                        errors[index] = str(e)
+                
+                if not done and can_hedge:
+                    start(next_strategy, deadline - time.monotonic())
+                    next_strategy += 1
+        finally:
+            # Losers finish (bounded by their own timeout) in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        for index in running.values():
+            errors[index] = f"deadline of {timeout}s exceeded"
+        for index in range(next_strategy, len(strategies)):
+            errors[index] = "not started before deadline"
+        return self._chain_failure(url, errors)
+    
+    def _fetch_sequential(self, url: str, timeout: float, deadline: float, extra_headers: Dict[str, str],
+                          attempts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """The fallback chain without hedging: one method at a time on the calling thread"""
+        errors = {}
+        for index, (method, _) in enumerate(self.fetch_strategies):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                errors[index] = "not started before deadline"
+                continue
+            try:
+                return self._fetch_with(method, url, remaining, extra_headers, attempts)
+            except BodyRejected as e:
+                # Other methods would get the same body
+                return {'success': False, 'error': str(e), 'url': url}
+            except Exception as e:
+                errors[index] = str(e)
+        return self._chain_failure(url, errors)
+    
+    def _chain_failure(self, url: str, errors: Dict[int, str]) -> Dict[str, Any]:
+        return {
+            'success': False,
+            'error': "All methods failed - " + ' | '.join(f"{self.fetch_strategies[i][1]}: {errors[i]}" for i in sorted(errors)),
+            'url': url
+        }
+    
+    def _fetch_with(self, method: str, url: str, timeout: float, extra_headers: Dict[str, str] = None,
+                    attempts: List[Dict[str, Any]] = None, own_session: bool = False) -> Dict[str, Any]:
+        """Fetch with one method of the fallback chain; raises on failure"""
+        with record_attempt(attempts if attempts is not None else [], method) as timing:
+            if not own_session or method == 'stealth_httpx':
+                return self._fetch_attempt(method, url, timeout, extra_headers, timing, self.session)
+            with requests.Session() as session:
+                session.max_redirects = self.session.max_redirects
+                return self._fetch_attempt(method, url, timeout, extra_headers, timing, session)
+    
+    def _fetch_attempt(self, method: str, url: str, timeout: float, extra_headers: Dict[str, str], timing,
+                       session: requests.Session) -> Dict[str, Any]:
+        html = ''
+        if method == 'stealth_httpx':
+            # Method 2: httpx with different headers
+            headers = self.get_stealth_headers()
+            headers.update(extra_headers or {})
+            with self.pool.stream(url, headers=headers, timeout=timeout) as response:
+                timing.status_code = response.status_code
+                # 304 answers a cache revalidation, it is not a failure
+                if response.status_code != 304:
+                    response.raise_for_status()
+                    # Decide from the headers before downloading anything
+                    check_headers(response.headers, self.max_bytes)
+                    with timing.phase('body'):
+                        body = read_body(response.headers, response.iter_bytes(CHUNK_SIZE), self.max_bytes)
+                    html = decode_body(body, response.encoding)
+                timing.bytes_received = response.num_bytes_downloaded
+        else:
+            if method == 'stealth_requests':
+                # Method 1: Stealth requests with rotating headers
+                headers = self.get_stealth_headers()
+            else:
+                # Method 3: Minimal headers (sometimes less is more)
+                headers = {
+                    'User-Agent': random.choice(self.user_agents),
+                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
+                }
+            headers.update(extra_headers or {})
+            
+            try:
+                # requests does not expose connection phases: this is time to the response headers
+                with timing.phase('ttfb'):
+                    response = session.get(
+                        url,
+                        headers=headers,
+                        timeout=timeout,
+                        allow_redirects=True,
+                        verify=True,  # Keep SSL verification
+                        stream=True
+                    )
+            finally:
+                # Reuse connections, not cookies, to avoid tracking
+                session.cookies.clear()
+            
+            with response:
+                timing.status_code = response.status_code
+                if response.status_code != 304:
+                    response.raise_for_status()
+                    check_headers(response.headers, self.max_bytes)
+                    with timing.phase('body'):
+                        body = read_body(response.headers, response.iter_content(CHUNK_SIZE), self.max_bytes)
+                    # Same charset rules as response.text
+                    encoding = response.encoding or requests.compat.chardet.detect(body)['encoding']
+                    html = decode_body(body, encoding)
+                # Bytes off the wire, before decompression
+                timing.bytes_received = response.raw.tell()
+        
+        return {
+            'success': True,
+            'html': html,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'url': str(response.url),
+            'method': method
+        }
+    
+    def _load_robots(self, url: str) -> Optional[str]:
+        response = self.session.get(url, headers=self.get_stealth_headers(), timeout=10)
+        return response.text if response.status_code == 200 else None
+    
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+        self.pool.close()
+
+    def scan_document(self, html: str, deadline: float = None) -> DocumentScan:
+        """
+        Walk the document once for all analyzers, reusing the last walk when
+        called again with the same document (or the part a truncated walk read)
+        """
+        if self._last_scan is None or self._last_scan.html is not html:
+            self._last_scan = DocumentScan(html, deadline)
+        return self._last_scan
+
+    def analyze_html_structure(self, html: str, fetch_result: Dict = None) -> Dict[str, Any]:
+        """
+        Analyze HTML structure and provide insights. Only the analyzers behind
+        the analyzer's metric selection run (see ``webintel.registry``).
+        """
+        current_url = fetch_result.get('url', '') if fetch_result else ''
+        # Memoized results would report the timings of an earlier run
+        if self.analysis_cache is None or self.instrument:
+            return self._analyze_structure(html, current_url)
+        
+        # Unchanged pages skip the analysis entirely
+        key = self.analysis_cache.key(html, current_url, self.version)
+        analysis = self.analysis_cache.get(key)
+        if analysis is None:
+            analysis = self._analyze_structure(html, current_url)
+            # A cut-short analysis says more about the machine's load than the page
+            if not analysis['truncated']:
+                self.analysis_cache.put(key, analysis)
+        return analysis
+    
+    def _analyze_structure(self, html: str, current_url: str) -> Dict[str, Any]:
+        timer = AnalysisTimer(enabled=self.instrument)
+        analysis = {}
+        # Named inputs of the registry's analyzers; intermediates are added as they are computed
+        inputs = {
+            'document': html,
+            'html': html,
+            'url': current_url,
+            'analysis': analysis,
+            'deadline': time.perf_counter() + self.time_budget if self.time_budget else None,
+        }
+        for step in self.plan:
+            first = inputs[step.args[0]] if isinstance(step, AnalyzerSpec) else inputs['html']
+            with timer.stage(step.name, len(first)):
+                if isinstance(step, AnalyzerSpec):
+                    analysis.update(self.run_analyzer(step, inputs))
+                else:
+                    inputs[step.name] = getattr(self, step.method)(inputs)
+        analysis['truncated'] = int('scan' in inputs and inputs['scan'].truncated)
+        
+        if self.instrument:
+            analysis['timings'] = timer.report()
+        return analysis
+    
+    def run_analyzer(self, spec: AnalyzerSpec, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one registered analyzer on the named analysis inputs; returns its metrics"""
+        result = getattr(self, spec.method)(*(inputs[name] for name in spec.args))
+        return result if isinstance(result, dict) else {spec.metrics[0]: result}
+    
+    def _compute_scan(self, inputs: Dict[str, Any]) -> DocumentScan:
+        scan = self.scan_document(inputs['html'], inputs['deadline'])
+        # Over budget: every later metric describes the part scanned in time
+        inputs['html'] = scan.html
+        return scan
+    
+    def _compute_early_text(self, inputs: Dict[str, Any]) -> str:
+        return inputs['scan'].early_text()
+    
+    def analyze_page_size(self, html: str) -> Dict[str, Any]:
+        """Size of the whole page, even when the rest of the analysis was cut short"""
+        return {
+            'total_length': len(html),
+            'total_lines': html.count('\n') + 1,
+        }
+    
+    def analyze_basic_metrics(self, html: str) -> Dict[str, Any]:
+        """Tag inventory, external and inline resources, images and forms"""
+        scan = self.scan_document(html)
+        analysis = {}
+        
+        # Tag analysis
+        tag_counts = scan.tag_counts
+        analysis['total_tags'] = sum(tag_counts.values())
+        analysis['unique_tags'] = len(tag_counts)
+        analysis['most_common_tags'] = tag_counts.most_common(10)
+        
+        # HTML5 semantic tags
+        semantic_tags = ['header', 'nav', 'main', 'section', 'article', 'aside', 'footer']
+        analysis['semantic_tags_used'] = [tag for tag in semantic_tags if tag in tag_counts]
+        
+        # Meta tags
+        analysis['meta_tags_count'] = scan.meta.count
+        
+        # External resources
+        analysis['external_css'] = scan.css_links.count
+        analysis['external_js'] = scan.script_src.count
+        analysis['inline_css'] = scan.inline_styles
+        analysis['inline_js'] = scan.inline_scripts
+        
+        # Images
+        analysis['images_count'] = scan.images.count
+        
+        # Forms
+        analysis['forms_count'] = scan.forms.count
+        
+        return analysis
+    
+    def detect_frameworks(self, html: str) -> Dict[str, Any]:
+        """
+        Detect frameworks, CMSs, analytics tags and other technologies from the
+        signature database, in one pass over the document
+        """
+        confidence = self.signatures.match(html)
+        return {
+            'frameworks_detected': list(confidence),
+            'framework_confidence': confidence,
+        }
+    
+    def get_performance_insights(self, analysis: Dict) -> List[str]:
+        """
+        Generate performance insights based on analysis
+        """
+        insights = []
+        
+        if analysis['external_css'] > 5:
+            insights.append(f"High number of external CSS files ({analysis['external_css']}) - consider bundling")
+        
+        if analysis['external_js'] > 10:
+            insights.append(f"High number of external JS files ({analysis['external_js']}) - consider bundling")
+        
+        if analysis['images_count'] > 20:
+            insights.append(f"High number of images ({analysis['images_count']}) - consider lazy loading")
+        
+        if analysis['total_length'] > 1000000:  # 1MB
+            insights.append("Large HTML size - consider minification and optimization")
+        
+        if not analysis['semantic_tags_used']:
+            insights.append("No HTML5 semantic tags found - consider improving accessibility")
+        
+        return insights
+    
+    def analyze_html_tables(self, html: str) -> Dict[str, Any]:
+        """Analyze HTML table structure and data density"""
+        scan = self.scan_document(html)
+        
+        analysis = {
+            'tables_count': scan.tables,
+            'avg_rows_per_table': 0,
+            'table_data_density': 0
+        }
+        
+        if scan.tables:
+            analysis['avg_rows_per_table'] = scan.table_rows / scan.tables
+            analysis['table_data_density'] = scan.table_data_cells / scan.table_cells if scan.table_cells > 0 else 0
+        
+        return analysis
+    
+    def analyze_atomic_paragraphs(self, html: str) -> Dict[str, Any]:
+        """Analyze paragraph structure for AEO optimization"""
+        word_counts = self.scan_document(html).paragraph_word_counts
+        
+        analysis = {
+            'paragraphs_count': len(word_counts),
+            'avg_paragraph_length': 0,
+            'atomic_paragraph_ratio': 0
+        }
+        
+        if word_counts:
+            # Count atomic paragraphs (≤ 100 words)
+            atomic_count = sum(1 for words in word_counts if words <= 100)
+            
+            analysis['avg_paragraph_length'] = sum(word_counts) / len(word_counts)
+            analysis['atomic_paragraph_ratio'] = atomic_count / len(word_counts)
+        
+        return analysis
+    
+    def analyze_year_inclusion(self, html: str, url: str) -> Dict[str, Any]:
+        """Analyze 2025 year inclusion for freshness signals"""
+        scan = self.scan_document(html)
+        analysis = {
+            'url_year_inclusion': 0,
+            'title_year_inclusion': 0,
+            'meta_year_inclusion': 0,
+            'early_content_year_inclusion': 0
+        }
+        
+        # URL year inclusion
+        if url and '2025' in url:
+            analysis['url_year_inclusion'] = 1
+        
+        # Title year inclusion
+        if scan.title is not None and '2025' in scan.title:
+            analysis['title_year_inclusion'] = 1
+        
+        # Meta description year inclusion
+        if scan.meta_description is not None and '2025' in scan.meta_description:
+            analysis['meta_year_inclusion'] = 1
+        
+        # First 200 characters of visible text (scripts, styles and tags removed)
+        visible_text = scan.early_text()
+        if len(visible_text) >= 200 and '2025' in visible_text[:200]:
+            analysis['early_content_year_inclusion'] = 1
+        
+        return analysis
+    
+    def analyze_bulleted_lists(self, html: str) -> Dict[str, Any]:
+        """Analyze list structures for snippet optimization"""
+        scan = self.scan_document(html)
+        
+        # Count paragraphs for coverage ratio
+        paragraphs = scan.p_tags.count
+        
+        analysis = {
+            'lists_count': scan.lists,
+            'avg_items_per_list': 0,
+            'list_coverage_ratio': 0
+        }
+        
+        if scan.lists:
+            total_items = scan.list_items
+            
+            analysis['avg_items_per_list'] = total_items / scan.lists
+            analysis['list_coverage_ratio'] = total_items / (paragraphs + total_items) if (paragraphs + total_items) > 0 else 0
+        
+        return analysis
+    
+    def analyze_semantic_urls(self, url: str, html: str) -> Dict[str, Any]:
+        """Analyze URL semantic structure"""
+        analysis = {
+            'url_token_count': 0,
+            'keyword_presence_ratio': 0,
+            'stopword_ratio': 0
+        }
+        
+        if not url:
+            return analysis
+        
+        # Parse URL path
+        parsed_url = urlparse(url)
+        path = parsed_url.path.strip('/')
+        
+        if path:
+            # Split on common separators
+            tokens = re.split(r'[-_/]+', path)
+            tokens = [t for t in tokens if t]  # Remove empty tokens
+            
+            analysis['url_token_count'] = len(tokens)
+            
+            if tokens:
+                # Get H2/H3 keywords for comparison
+                h2_h3_text = ''.join(strip_tags(match).lower() + ' ' for match in self.scan_document(html).heading_text)
+                
+                # Count keyword matches
+                keyword_matches = 0
+                for token in tokens:
+                    if token.lower() in h2_h3_text:
+                        keyword_matches += 1
+                
+                analysis['keyword_presence_ratio'] = keyword_matches / len(tokens)
+                
+                # Count stopwords
+                stopwords = {'and', 'the', 'of', 'to', 'a', 'in', 'for', 'is', 'on', 'with', 'as', 'by', 'at', 'or', 'an'}
+                stopword_count = sum(1 for token in tokens if token.lower() in stopwords)
+                analysis['stopword_ratio'] = stopword_count / len(tokens)
+        
+        return analysis
+    
+    def analyze_subfolder_structure(self, url: str, html: str) -> Dict[str, Any]:
+        """Analyze subfolder organization and depth"""
+        analysis = {
+            'subfolder_page_ratio': 0,
+            'url_depth': 0,
+            'deep_link_density': 0,
+            'most_common_subfolder': ''
+        }
+        
+        if not url:
+            return analysis
+        
+        parsed_url = urlparse(url)
+        path_segments = [s for s in parsed_url.path.split('/') if s]
+        
+        analysis['url_depth'] = len(path_segments)
+        analysis['subfolder_page_ratio'] = 1 if len(path_segments) >= 2 else 0
+        
+        if path_segments:
+            analysis['most_common_subfolder'] = path_segments[0]
+        
+        # Analyze internal links depth
+        domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        internal_links = re.findall(rf'href=["\']({re.escape(domain)}[^"\']*)["\']', html, re.IGNORECASE)
+        
+        if internal_links:
+            deep_links = 0
+            for link in internal_links:
+                link_path = urlparse(link).path
+                link_segments = [s for s in link_path.split('/') if s]
+                if len(link_segments) >= 2:
+                    deep_links += 1
+            
+            analysis['deep_link_density'] = deep_links / len(internal_links)
+        
+        return analysis
+    
+    def analyze_html_vs_js(self, html: str) -> Dict[str, Any]:
+        """Analyze HTML vs JavaScript content balance"""
+        scan = self.scan_document(html)
+        
+        # Calculate HTML content size (UTF-8 bytes)
+        html_size = utf8_size(html)
+        
+        # Inline JavaScript content size
+        js_size = scan.inline_js_size
+        
+        # Count script tag hooks
+        total_tags = scan.markup_tokens
+        
+        analysis = {
+            'html_js_byte_ratio': html_size / (html_size + js_size) if (html_size + js_size) > 0 else 1,
+            'script_tag_density': scan.script_tags.count / total_tags if total_tags > 0 else 0,
+            'external_js_count': scan.script_src.count,
+            'inline_js_size': js_size
+        }
+        
+        return analysis
+    
+    def analyze_schema_markup(self, html: str) -> Dict[str, Any]:
+        """Analyze Schema.org structured data"""
+        # JSON-LD blocks
+        jsonld_blocks = self.scan_document(html).jsonld_blocks
+        
+        analysis = {
+            'schema_blocks_count': len(jsonld_blocks),
+            'jsonld_blocks_count': len(jsonld_blocks),
+            'schema_types': [],
+            'schema_type_count': 0
+        }
+        
+        schema_types = set()
+        
+        for block in jsonld_blocks:
+            try:
+                data = json.loads(block.strip())
+                
+                # Handle both single objects and arrays
+                if isinstance(data, list):
+                    for item in data:
+                        if isinstance(item, dict) and '@type' in item:
+                            schema_types.add(item['@type'])
+                elif isinstance(data, dict) and '@type' in data:
+                    schema_types.add(data['@type'])
+                    
+            except json.JSONDecodeError:
+                continue
+        
+        analysis['schema_types'] = list(schema_types)
+        analysis['schema_type_count'] = len(schema_types)
+        
+        return analysis
+    
+    def analyze_h_tags(self, html: str) -> Dict[str, Any]:
+        """Analyze heading tag structure for AEO"""
+        scan = self.scan_document(html)
+        h2_count = scan.h2_tags.count
+        h3_count = scan.h3_tags.count
+        
+        # Count content blocks (paragraphs and div elements that could be content)
+        total_content_blocks = scan.p_tags.count + scan.content_divs.count
+        
+        # Count paragraphs that follow H2/H3 tags
+        # This is a simplified approach - we'll count H2/H3 tags as proxies
+        headings_count = h2_count + h3_count
+        
+        analysis = {
+            'h2_count': h2_count,
+            'h3_count': h3_count,
+            'heading_coverage_ratio': headings_count / total_content_blocks if total_content_blocks > 0 else 0
+        }
+        
+        return analysis
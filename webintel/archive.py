@@ -0,0 +1,275 @@
+"""
+Columnar archive of analysis records.
+
+Every per-URL record is written with a fixed Arrow schema (the metric schema
+from ``webintel.frame`` plus fetch details) to Parquet or Arrow IPC files,
+compressed, under a hive-partitioned directory tree::
+
+    archive/run_date=2025-06-01/domain=example.com/part-<run_id>-0.parquet
+
+so months of runs can be queried with DuckDB, pandas or pyarrow without
+reading more than the dates and domains asked for::
+
+    SELECT domain, avg(atomic_paragraph_ratio)
+    FROM read_parquet('archive/**/*.parquet', hive_partitioning = true)
+    GROUP BY domain
+
+``load_archive`` reads it back into the app's record shape without refetching.
+"""
+import io
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Union
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from .frame import METRIC_SCHEMA, results_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    ARCHIVE_AVAILABLE = True
+except ImportError:
+    ARCHIVE_AVAILABLE = False
+
+DEFAULT_ARCHIVE_DIR = os.environ.get(
+    'WEBINTEL_ARCHIVE_DIR', os.path.join(os.path.expanduser('~'), '.local', 'share', 'webintel', 'archive')
+)
+ARCHIVE_FORMATS = ('parquet', 'arrow')
+COMPRESSIONS = ('zstd', 'lz4', 'snappy', 'gzip', 'none')
+DEFAULT_COMPRESSION = 'zstd'
+
+PARTITION_COLUMNS = ['run_date', 'domain']
+_EXTENSIONS = {'parquet': 'parquet', 'arrow': 'arrow'}
+# Arrow IPC only compresses buffers with these codecs
+_IPC_COMPRESSIONS = ('zstd', 'lz4')
+
+_TEXT_FIELDS = ['url', 'final_url', 'method', 'most_common_subfolder']
+_STRING_LIST_FIELDS = ['frameworks_detected', 'schema_types', 'performance_insights', 'semantic_tags_used']
+
+
+def _require_arrow():
+    if not ARCHIVE_AVAILABLE:
+        raise RuntimeError("The results archive needs pyarrow: pip install pyarrow")
+
+
+def archive_schema() -> 'pa.Schema':
+    """Columns of an archive file; unknown record keys go to ``extra`` as JSON"""
+    _require_arrow()
+    fields = [
+        pa.field('run_id', pa.string()),
+        pa.field('analyzed_at', pa.timestamp('ms', tz='UTC')),
+        pa.field('status_code', pa.int64()),
+    ]
+    fields += [pa.field(name, pa.string()) for name in _TEXT_FIELDS]
+    fields += [pa.field(metric.name, pa.from_numpy_dtype(metric.dtype)) for metric in METRIC_SCHEMA]
+    fields += [pa.field(name, pa.list_(pa.string())) for name in _STRING_LIST_FIELDS]
+    fields.append(pa.field('most_common_tags', pa.list_(pa.struct([('tag', pa.string()), ('count', pa.int64())]))))
+    fields.append(pa.field('extra', pa.string()))
+    fields += [pa.field(name, pa.string()) for name in PARTITION_COLUMNS]
+    return pa.schema(fields)
+
+
+def new_run_id() -> str:
+    """Sortable, unique enough id for one batch"""
+    return time.strftime('%Y%m%dT%H%M%SZ', time.gmtime()) + '-' + uuid.uuid4().hex[:6]
+
+
+def record_domain(record: Dict[str, Any]) -> str:
+    """Host a record is partitioned under (final URL first), without www."""
+    host = (urlparse(record.get('final_url') or record.get('url') or '').hostname or 'unknown').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def records_table(records: Sequence[Dict[str, Any]], run_id: str = None,
+                  analyzed_at: datetime = None) -> 'pa.Table':
+    """Arrow table of analysis records, one row each, stamped with the run"""
+    _require_arrow()
+    records = list(records)
+    run_id = run_id or new_run_id()
+    analyzed_at = analyzed_at or datetime.now(timezone.utc)
+    schema = archive_schema()
+    known = set(schema.names)
+
+    frame = results_frame(records)
+    columns: Dict[str, Any] = {
+        'run_id': [run_id] * len(records),
+        'analyzed_at': [analyzed_at] * len(records),
+        'status_code': [record.get('status_code') for record in records],
+    }
+    for name in _TEXT_FIELDS:
+        columns[name] = frame[name]
+    for metric in METRIC_SCHEMA:
+        columns[metric.name] = frame[metric.name]
+    for name in _STRING_LIST_FIELDS:
+        columns[name] = [[str(item) for item in value] for value in frame[name]]
+    columns['most_common_tags'] = [
+        [{'tag': tag, 'count': count} for tag, count in record.get('most_common_tags') or []]
+        for record in records
+    ]
+    columns['extra'] = [_extra_json(record, known) for record in records]
+    columns['run_date'] = [analyzed_at.strftime('%Y-%m-%d')] * len(records)
+    columns['domain'] = [record_domain(record) for record in records]
+
+    arrays = [pa.array(columns[field.name], type=field.type) for field in schema]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _extra_json(record: Dict[str, Any], known: set) -> Optional[str]:
+    extra = {key: value for key, value in record.items() if key not in known}
+    return json.dumps(extra, default=str) if extra else None
+
+
+def _file_format(fmt: str, compression: str):
+    if fmt == 'parquet':
+        file_format = ds.ParquetFileFormat()
+        return file_format, file_format.make_write_options(compression=compression)
+    file_format = ds.IpcFileFormat()
+    codec = compression if compression in _IPC_COMPRESSIONS else None
+    return file_format, file_format.make_write_options(compression=codec)
+
+
+def _check(fmt: str, compression: str) -> str:
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unknown archive format: {fmt}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    return None if compression == 'none' else compression
+
+
+def write_archive(records: Sequence[Dict[str, Any]], root: str = DEFAULT_ARCHIVE_DIR, fmt: str = 'parquet',
+                  compression: str = DEFAULT_COMPRESSION, run_id: str = None, part: int = None,
+                  analyzed_at: datetime = None) -> str:
+    """
+    Add one run to the archive under ``root``, partitioned by run date and
+    domain. Returns the run id; files of earlier runs are never touched.
+
+    A long run can be written in batches as it goes: each call with the same
+    ``run_id`` and ``analyzed_at`` and a new ``part`` number adds its own files.
+    """
+    codec = _check(fmt, compression)
+    run_id = run_id or new_run_id()
+    table = records_table(records, run_id, analyzed_at)
+    if table.num_rows == 0:
+        return run_id
+
+    prefix = f"part-{run_id}" if part is None else f"part-{run_id}-{part:05d}"
+    file_format, options = _file_format(fmt, codec)
+    ds.write_dataset(
+        table, root,
+        format=file_format,
+        file_options=options,
+        partitioning=ds.partitioning(pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]), flavor='hive'),
+        basename_template=f"{prefix}-{{i}}.{_EXTENSIONS[fmt]}",
+        existing_data_behavior='overwrite_or_ignore',
+    )
+    return run_id
+
+
+def archive_bytes(records: Sequence[Dict[str, Any]], fmt: str = 'parquet',
+                  compression: str = DEFAULT_COMPRESSION, run_id: str = None) -> bytes:
+    """One self-contained file (partition columns included) for downloads"""
+    codec = _check(fmt, compression)
+    table = records_table(records, run_id)
+    buffer = io.BytesIO()
+    if fmt == 'parquet':
+        pq.write_table(table, buffer, compression=codec or 'none')
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=codec if codec in _IPC_COMPRESSIONS else None)
+        with pa.ipc.new_file(buffer, table.schema, options=options) as writer:
+            writer.write_table(table)
+    return buffer.getvalue()
+
+
+def _dataset(source: Union[str, bytes, io.IOBase], fmt: str = None) -> 'ds.Dataset':
+    _require_arrow()
+    if isinstance(source, (bytes, bytearray)) or hasattr(source, 'read'):
+        data = source if isinstance(source, (bytes, bytearray)) else source.read()
+        # Parquet files start and end with the magic bytes PAR1
+        if fmt == 'parquet' or (fmt is None and data[:4] == b'PAR1'):
+            return ds.dataset(pq.read_table(pa.BufferReader(data)))
+        return ds.dataset(pa.ipc.open_file(pa.BufferReader(data)).read_all())
+    if os.path.isfile(source):
+        fmt = fmt or ('parquet' if source.endswith('.parquet') else 'arrow')
+    else:
+        fmt = fmt or _detect_format(source)
+    return ds.dataset(source, format='ipc' if fmt == 'arrow' else 'parquet', partitioning='hive')
+
+
+def _detect_format(root: str) -> str:
+    for _, _, files in os.walk(root):
+        for name in files:
+            if name.endswith('.arrow'):
+                return 'arrow'
+            if name.endswith('.parquet'):
+                return 'parquet'
+    return 'parquet'
+
+
+def load_archive(source: Union[str, bytes, io.IOBase] = DEFAULT_ARCHIVE_DIR, fmt: str = None,
+                 since: str = None, until: str = None, domains: Sequence[str] = None,
+                 run_ids: Sequence[str] = None, columns: List[str] = None) -> pd.DataFrame:
+    """
+    Archive rows as a DataFrame. ``source`` is an archive directory, one
+    file, or the bytes of one. Dates are 'YYYY-MM-DD' and inclusive; date
+    and domain filters only open the matching partitions.
+    """
+    dataset = _dataset(source, fmt)
+    condition = None
+    for part in _filters(since, until, domains, run_ids):
+        condition = part if condition is None else condition & part
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+
+def _filters(since, until, domains, run_ids):
+    if since:
+        yield ds.field('run_date') >= since
+    if until:
+        yield ds.field('run_date') <= until
+    if domains:
+        yield ds.field('domain').isin(list(domains))
+    if run_ids:
+        yield ds.field('run_id').isin(list(run_ids))
+
+
+def list_runs(source: Union[str, bytes, io.IOBase] = DEFAULT_ARCHIVE_DIR, fmt: str = None) -> pd.DataFrame:
+    """One row per archived run, newest first: run id, date, pages and domains"""
+    missing = isinstance(source, str) and not os.path.exists(source)
+    frame = pd.DataFrame() if missing else load_archive(source, fmt, columns=['run_id', 'analyzed_at', 'run_date', 'domain'])
+    if frame.empty:
+        return pd.DataFrame(columns=['run_id', 'analyzed_at', 'run_date', 'pages', 'domains'])
+    runs = frame.groupby('run_id').agg(
+        analyzed_at=('analyzed_at', 'min'), run_date=('run_date', 'first'),
+        pages=('domain', 'size'), domains=('domain', 'nunique'),
+    )
+    return runs.sort_values('analyzed_at', ascending=False).reset_index()
+
+
+def frame_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Archive rows back into analysis records as the app displays them"""
+    records = []
+    for row in frame.to_dict('records'):
+        extra = row.pop('extra', None)
+        record = {key: _plain(value) for key, value in row.items()}
+        record['most_common_tags'] = [(item['tag'], item['count']) for item in record.get('most_common_tags') or []]
+        if isinstance(extra, str):
+            record.update(json.loads(extra))
+        records.append(record)
+    return records
+
+
+def _plain(value):
+    """NumPy scalars and arrays from Arrow back to Python values"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, float) and value != value:
+        # Missing, e.g. the status code of an imported record
+        return None
+    return value
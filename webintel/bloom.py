@@ -0,0 +1,80 @@
+"""
+Compact probabilistic set for very large URL collections.
+
+A ``BloomFilter`` sized for a million URLs at a 0.1% false-positive rate
+takes about 1.8 MB, against well over 100 MB for a Python set of the same
+strings. Membership can be wrong only in one direction: an item that was
+never added may occasionally look present, an added one never looks absent.
+"""
+import hashlib
+import math
+from typing import Iterable, Union
+
+DEFAULT_ERROR_RATE = 0.001
+# Below this many expected items an exact set is small enough
+EXACT_SET_LIMIT = 100_000
+
+
+class BloomFilter:
+    """Bit array with ``hashes`` probe positions per item (double hashing)"""
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        for i in range(self.hashes):
+            yield (first + i * second) % size
+
+    def add(self, item: str) -> bool:
+        """Add ``item``; True if it was not (as far as the filter can tell) present before"""
+        new = False
+        bits = self.bits
+        for position in self._positions(item):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        """Items added, not counting ones mistaken for duplicates"""
+        return self.count
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+
+class ExactSet(set):
+    """``set`` with the ``BloomFilter`` interface"""
+
+    def add(self, item: str) -> bool:
+        if item in self:
+            return False
+        super().add(item)
+        return True
+
+
+def seen_set(capacity: int, error_rate: float = DEFAULT_ERROR_RATE) -> Union[ExactSet, BloomFilter]:
+    """Exact set for small collections, Bloom filter beyond EXACT_SET_LIMIT items"""
+    return ExactSet() if capacity <= EXACT_SET_LIMIT else BloomFilter(capacity, error_rate)
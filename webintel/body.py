@@ -0,0 +1,129 @@
+"""
+Bounded, streaming reads of response bodies.
+
+Responses are checked from their headers before the body is read: anything
+that is not HTML, or announces a body over the size cap, is dropped without
+downloading it. The body is then read chunk by chunk into a single buffer and
+abandoned as soon as it passes the cap, so endless or oversized responses never
+get buffered.
+
+The buffer is decoded once, and nothing downstream copies the document again:
+byte sizes and content hashes of the decoded text are computed in bounded
+chunks with ``utf8_size``, ``text_digest`` and ``encoded_chunks`` instead of encoding it whole.
+"""
+import codecs
+from typing import AsyncIterator, Iterator, Optional
+
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Content types worth analyzing; a missing Content-Type is sniffed instead
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# How much of the body to look at when the server did not say what it is
+_SNIFF_BYTES = 1024
+
+# Characters encoded at a time when a document is hashed or measured as UTF-8
+ENCODE_CHUNK = 1024 * 1024
+
+
+class BodyRejected(Exception):
+    """The response is not something to analyze; retrying will not help"""
+
+
+def _header(headers, name: str) -> Optional[str]:
+    value = headers.get(name)
+    return value.strip() if value else None
+
+
+def check_headers(headers, max_bytes: Optional[int]):
+    """Reject non-HTML content types and bodies announced larger than ``max_bytes``"""
+    content_type = _header(headers, 'Content-Type')
+    if content_type:
+        media_type = content_type.split(';', 1)[0].strip().lower()
+        if media_type not in HTML_CONTENT_TYPES:
+            raise BodyRejected(f"Not an HTML page (Content-Type: {media_type})")
+
+    content_length = _header(headers, 'Content-Length')
+    if max_bytes and content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise BodyRejected(f"Page is larger than {max_bytes} bytes (Content-Length: {content_length})")
+
+
+def _sniff(first_chunk: bytes):
+    # Binary data has NUL bytes early; markup has a '<' near the start
+    head = first_chunk[:_SNIFF_BYTES]
+    if b'\x00' in head or (head.strip() and b'<' not in head):
+        raise BodyRejected("Response body does not look like HTML")
+
+
+class _BodyReader:
+    """Collects chunks, enforcing the byte cap as they arrive"""
+
+    def __init__(self, headers, max_bytes: Optional[int]):
+        self.max_bytes = max_bytes
+        self.sniff = not _header(headers, 'Content-Type')
+        # One growing buffer: a list of chunks would need a second full copy to join
+        self.buffer = bytearray()
+        self.size = 0
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        if self.sniff:
+            _sniff(chunk)
+            self.sniff = False
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise BodyRejected(f"Page is larger than {self.max_bytes} bytes")
+        self.buffer += chunk
+
+    def body(self) -> bytearray:
+        return self.buffer
+
+
+def read_body(headers, chunks: Iterator[bytes], max_bytes: Optional[int]) -> bytearray:
+    """Read a streamed body, raising ``BodyRejected`` past ``max_bytes``"""
+    reader = _BodyReader(headers, max_bytes)
+    for chunk in chunks:
+        reader.feed(chunk)
+    return reader.body()
+
+
+async def aread_body(headers, chunks: AsyncIterator[bytes], max_bytes: Optional[int]) -> bytearray:
+    """Async version of ``read_body``"""
+    reader = _BodyReader(headers, max_bytes)
+    async for chunk in chunks:
+        reader.feed(chunk)
+    return reader.body()
+
+
+def decode_body(body: bytes, encoding: Optional[str]) -> str:
+    """Decode like ``response.text``: unknown or missing charsets fall back to UTF-8"""
+    try:
+        codecs.lookup(encoding or 'utf-8')
+    except LookupError:
+        encoding = None
+    return body.decode(encoding or 'utf-8', errors='replace')
+
+
+def encoded_chunks(text: str, errors: str = 'strict', start: int = 0, end: int = None) -> Iterator[bytes]:
+    """``text[start:end].encode('utf-8', errors)`` in pieces of at most ENCODE_CHUNK characters"""
+    end = len(text) if end is None else end
+    for pos in range(start, end, ENCODE_CHUNK):
+        yield text[pos:min(end, pos + ENCODE_CHUNK)].encode('utf-8', errors)
+
+
+def text_digest(digest, text: str, errors: str = 'strict') -> str:
+    """Hex digest of the UTF-8 encoding of ``text``, fed to the hashlib object ``digest`` in pieces"""
+    for chunk in encoded_chunks(text, errors):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def utf8_size(text: str, start: int = 0, end: int = None) -> int:
+    """``len(text[start:end].encode('utf-8'))`` without encoding the text whole"""
+    end = len(text) if end is None else end
+    # str.isascii() reads a flag of the string object; no scan, no copy
+    if text.isascii():
+        return max(0, end - start)
+    return sum(len(chunk) for chunk in encoded_chunks(text, 'strict', start, end))
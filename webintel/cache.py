@@ -0,0 +1,330 @@
+"""
+Caches for fetch and analysis results.
+
+``FetchCache`` is a persistent on-disk cache for fetch results.
+
+Entries are keyed by normalized URL and bodies are stored by content hash, so
+the same page reached through different URLs is only kept once. Entries
+younger than the TTL are served without touching the network; older ones are
+revalidated with ``If-None-Match`` / ``If-Modified-Since`` so an unchanged
+page costs a 304 instead of a full download.
+
+``AnalysisCache`` memoizes analysis results in memory, keyed by document hash,
+final URL and analyzer version.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from .body import encoded_chunks, text_digest, utf8_size
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'WEBINTEL_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'webintel', 'fetch')
+)
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_ANALYSIS_ENTRIES = 2048
+DEFAULT_ANALYSIS_BYTES = 64 * 1024 * 1024
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def cache_key(url: str) -> str:
+    """Normalize a URL so trivially different spellings share an entry"""
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    # Fragments never reach the server
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+def _header(headers: Dict[str, str], name: str) -> Optional[str]:
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+class FetchCache:
+    """
+    Disk cache of successful ``fetch_html`` results.
+
+    ``lookup`` returns the stored result and whether it is still fresh, and
+    ``conditional_headers`` the validators to revalidate a stale one. Total
+    size is kept under ``max_bytes`` by evicting least recently used entries.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries_dir = os.path.join(directory, 'entries')
+        self._bodies_dir = os.path.join(directory, 'bodies')
+        os.makedirs(self._entries_dir, exist_ok=True)
+        os.makedirs(self._bodies_dir, exist_ok=True)
+        # Bytes on disk, counted on first store
+        self._size = None
+        # AsyncFetcher stores from worker threads
+        self._lock = threading.Lock()
+
+    def _entry_path(self, url: str) -> str:
+        digest = hashlib.sha256(cache_key(url).encode('utf-8')).hexdigest()
+        return os.path.join(self._entries_dir, digest + '.json')
+
+    def _body_path(self, digest: str) -> str:
+        return os.path.join(self._bodies_dir, digest[:2], digest + '.html')
+
+    def _write(self, path: str, data: Union[bytes, Iterable[bytes]]):
+        # Write then rename so concurrent readers never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(data, bytes):
+                    f.write(data)
+                else:
+                    f.writelines(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Return ``{'result': ..., 'fresh': bool}`` for a cached URL, or None.
+
+        The result is a complete fetch result dict, html included.
+        """
+        path = self._entry_path(url)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.load(f)
+            # Read back exactly what was written: text mode would turn CRLF into LF
+            with open(self._body_path(entry['body']), 'rb') as f:
+                html = f.read().decode('utf-8')
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # Entry files' mtime doubles as the LRU clock
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        result = dict(entry['result'], html=html)
+        return {
+            'result': result,
+            'fresh': time.time() - entry['stored_at'] < self.ttl,
+            'stored_at': entry['stored_at'],
+        }
+
+    def conditional_headers(self, cached: Dict[str, Any]) -> Dict[str, str]:
+        """Validators for revalidating a cached result"""
+        headers = cached['result'].get('headers', {})
+        conditional = {}
+        etag = _header(headers, 'ETag')
+        if etag:
+            conditional['If-None-Match'] = etag
+        last_modified = _header(headers, 'Last-Modified')
+        if last_modified:
+            conditional['If-Modified-Since'] = last_modified
+        return conditional
+
+    def store(self, url: str, result: Dict[str, Any]):
+        """Store a successful fetch result"""
+        # A 304 has no body to store
+        if not result.get('success') or result.get('status_code') == 304:
+            return
+
+        # The body is hashed and written in pieces rather than encoded whole
+        html = result['html']
+        digest = text_digest(hashlib.sha256(), html)
+        body_path = self._body_path(digest)
+        added = 0
+        if not os.path.exists(body_path):
+            self._write(body_path, encoded_chunks(html))
+            added += utf8_size(html)
+
+        meta = {key: value for key, value in result.items() if key not in ('html', 'cache', 'fetch_timings')}
+        entry = json.dumps({
+            'url': cache_key(url),
+            'stored_at': time.time(),
+            'body': digest,
+            'result': meta,
+        }).encode('utf-8')
+        self._write(self._entry_path(url), entry)
+        added += len(entry)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += added
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def resolve(self, url: str, cached: Optional[Dict[str, Any]], result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fold a network result into the cache and return what the caller
+        should see: the cached result on 304, the new result otherwise. The
+        ``cache`` key records 'revalidated' or 'miss'. A 304 without a cached
+        copy to stand for is a failure, never an empty page.
+        """
+        if result.get('success') and result['status_code'] == 304:
+            if not cached:
+                return {'success': False, 'error': "HTTP 304 Not Modified without a cached copy", 'url': result['url']}
+            self.refresh(url)
+            return dict(cached['result'], cache='revalidated')
+        if result.get('success'):
+            self.store(url, result)
+            result['cache'] = 'miss'
+        return result
+
+    def refresh(self, url: str):
+        """Restart the TTL of an entry after a 304 Not Modified"""
+        path = self._entry_path(url)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return
+        entry['stored_at'] = time.time()
+        self._write(path, json.dumps(entry).encode('utf-8'))
+
+    def _disk_usage(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self._entries_dir):
+            path = os.path.join(self._entries_dir, name)
+            try:
+                with open(path, 'rb') as f:
+                    body = json.load(f)['body']
+                entries.append((os.path.getmtime(path), path, body))
+            except (OSError, ValueError, KeyError):
+                continue
+        entries.sort()
+
+        # Bodies are shared between entries; drop one when nothing refers to it
+        references: Dict[str, int] = {}
+        for _, _, body in entries:
+            references[body] = references.get(body, 0) + 1
+
+        # Bodies left behind when an entry was overwritten with new content
+        for root, _, files in os.walk(self._bodies_dir):
+            for name in files:
+                if name.endswith('.html') and name[:-5] not in references:
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+
+        size = self._disk_usage()
+        target = self.max_bytes * 0.9
+        for _, path, body in entries:
+            if size <= target:
+                break
+            try:
+                size -= os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            references[body] -= 1
+            if references[body] == 0:
+                body_path = self._body_path(body)
+                try:
+                    size -= os.path.getsize(body_path)
+                    os.remove(body_path)
+                except OSError:
+                    pass
+        self._size = size
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+            self._size = 0
+
+
+class AnalysisCache:
+    """
+    LRU of analysis results bounded by entry count and total bytes.
+
+    Results are kept pickled, which gives their size and hands every caller
+    its own copy to modify. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_ANALYSIS_ENTRIES, max_bytes: int = DEFAULT_ANALYSIS_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(html: str, url: str, version: str) -> str:
+        """Key for a document: the analysis depends on its bytes, its final URL and the analyzer code"""
+        digest = text_digest(hashlib.sha256(), html, 'surrogatepass')
+        return f"{version}:{digest}:{url}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return pickle.loads(data)
+
+    def put(self, key: str, analysis: Dict[str, Any]):
+        data = pickle.dumps(analysis, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = data
+            self._size += len(data)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
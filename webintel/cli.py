@@ -0,0 +1,388 @@
+"""
+Headless command line entry point.
+
+    python -m webintel analyze urls.txt --out results.jsonl
+    python -m webintel analyze --sitemap https://example.com/sitemap.xml --since 2025-01-01
+    python -m webintel crawl https://example.com --depth 3 --max-pages 500 --out site.jsonl
+    python -m webintel history changes --metric atomic_paragraph_ratio
+
+Runs the same fetch and analysis pipeline as the Streamlit app without
+importing Streamlit, streaming one record per URL to JSONL or CSV as pages
+finish. Progress goes to stderr.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterable, List, Union
+
+import pandas as pd
+
+from .analyzer import DEFAULT_TIME_BUDGET, HTMLAnalyzer, analysis_version
+from .archive import ARCHIVE_FORMATS, COMPRESSIONS, DEFAULT_ARCHIVE_DIR, DEFAULT_COMPRESSION, new_run_id, write_archive
+from .body import DEFAULT_MAX_BODY_BYTES
+from .cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, AnalysisCache, FetchCache
+from .crawl import DEFAULT_MAX_DEPTH, DEFAULT_MAX_PAGES, SiteCrawler, format_crawl_stats
+from .export import FORMATS, open_writer
+from .fetcher import DEFAULT_CONCURRENCY, DEFAULT_PER_HOST, AsyncFetcher
+from .fetchmetrics import FetchMetrics
+from .history import CHANGE_DIRECTIONS, DEFAULT_HISTORY_PATH, METRIC_NAMES, HistoryStore, format_changes
+from .incremental import PageSnapshots, format_incremental_stats
+from .pipeline import AnalysisPipeline
+from .registry import METRIC_GROUPS, expand_metrics
+from .profiling import BatchProfile
+from .ratelimit import DEFAULT_JITTER, DEFAULT_RATE, HostRateLimiter
+from .signatures import DEFAULT_SIGNATURES, SignatureDB, load_signatures
+from .sitemap import SitemapReader, format_sitemap_stats, parse_lastmod
+
+# Successful records held for the archive and history database before a batch is written
+RECORD_BATCH = 1000
+
+
+def read_urls(path: str) -> List[str]:
+    """URLs from a file ('-' for stdin), one per line; blank lines and # comments are skipped"""
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        return [line.strip() for line in stream if line.strip() and not line.lstrip().startswith('#')]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m webintel', description='WebIntel AEO HTML analysis')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    analyze = commands.add_parser('analyze', help='Fetch and analyze a list of URLs')
+    analyze.add_argument('urls', nargs='?', help="File with one URL per line ('-' for stdin)")
+    analyze.add_argument('--limit', type=int, help='Only process the first N URLs')
+    sitemaps = analyze.add_argument_group('sitemaps')
+    sitemaps.add_argument('--sitemap', action='append', default=[], metavar='URL',
+                          help='Also analyze the pages listed in this sitemap or sitemap index (.xml, .xml.gz or .txt; repeatable)')
+    sitemaps.add_argument('--since', type=date_argument, help='Only sitemap entries with lastmod on or after this date (YYYY-MM-DD)')
+    sitemaps.add_argument('--until', type=date_argument, help='Only sitemap entries with lastmod on or before this date')
+    sitemaps.add_argument('--skip-undated', action='store_true', help='With --since/--until, also drop entries without a lastmod')
+    add_batch_arguments(analyze)
+
+    crawl = commands.add_parser('crawl', help='Crawl a site from seed URLs and analyze every page')
+    crawl.add_argument('seeds', nargs='+', help='Start URLs; links are followed on the same sites')
+    crawling = crawl.add_argument_group('crawling')
+    crawling.add_argument('--depth', type=int, default=DEFAULT_MAX_DEPTH, help='Follow links at most this many clicks from a seed (default: %(default)s)')
+    crawling.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES, help='Stop after fetching this many pages (default: %(default)s)')
+    crawling.add_argument('--same-path', action='store_true', help="Only follow links under a seed's directory")
+    crawling.add_argument('--subdomains', action='store_true', help="Also follow links to subdomains of a seed's host")
+    crawling.add_argument('--ignore-robots', action='store_true', help='Crawl pages robots.txt disallows')
+    add_batch_arguments(crawl)
+
+    history = commands.add_parser('history', help='Query metrics recorded with --history')
+    history.add_argument('--db', default=DEFAULT_HISTORY_PATH, help='History database (default: %(default)s)')
+    queries = history.add_subparsers(dest='query', required=True)
+    queries.add_parser('runs', help='List recorded runs, newest first')
+    trend = queries.add_parser('trend', help='A metric over time for one URL or one domain')
+    target = trend.add_mutually_exclusive_group(required=True)
+    target.add_argument('url', nargs='?', help='Page URL as it was analyzed')
+    target.add_argument('--domain', help='Mean, min and max per run over the pages of this domain')
+    trend.add_argument('--metric', action='append', choices=METRIC_NAMES, required=True, metavar='NAME',
+                       help='Metric to show (repeatable for a URL)')
+    trend.add_argument('--since', type=date_argument, help='Only runs on or after this date')
+    changes = queries.add_parser('changes', help='Pages whose metric changed in a run')
+    changes.add_argument('--metric', choices=METRIC_NAMES, required=True, metavar='NAME', help='Metric to compare')
+    changes.add_argument('--run', help='Run to check (default: the latest)')
+    changes.add_argument('--against', metavar='RUN', help="Compare with this run instead of each page's previous observation")
+    changes.add_argument('--direction', choices=CHANGE_DIRECTIONS, default='drop', help='Which changes to list (default: %(default)s)')
+    changes.add_argument('--min-change', type=float, default=0, help='Ignore changes up to this size (default: %(default)s)')
+    changes.add_argument('--limit', type=int, help='Show at most N pages')
+    return parser
+
+
+def add_batch_arguments(command: argparse.ArgumentParser):
+    """Output, fetching, caching, analysis, archive and profiling options shared by analyze and crawl"""
+    command.add_argument('--out', default='-', help="Output file, .jsonl or .csv ('-' for stdout, the default)")
+    command.add_argument('--format', choices=FORMATS, help='Output format (default: from the --out extension, else jsonl)')
+
+    fetching = command.add_argument_group('fetching')
+    fetching.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Maximum requests in flight (default: %(default)s)')
+    fetching.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST, help='Maximum requests in flight per host (default: %(default)s)')
+    fetching.add_argument('--timeout', type=float, default=15, help='Per-URL deadline in seconds (default: %(default)s)')
+    fetching.add_argument('--hedge-delay', type=float, help='Start the next fallback method after this many seconds without an answer')
+    fetching.add_argument('--http2', action='store_true', help='Use HTTP/2 where servers support it')
+    fetching.add_argument('--rate', type=float, default=DEFAULT_RATE, help='Requests per second per host (default: %(default)s)')
+    fetching.add_argument('--jitter', type=float, default=DEFAULT_JITTER, help='Random extra delay per request, up to this many seconds (default: %(default)s)')
+    fetching.add_argument('--crawl-delay', action='store_true', help="Honor robots.txt Crawl-delay when it is slower than --rate")
+    fetching.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BODY_BYTES, help='Drop pages larger than this (default: %(default)s)')
+    fetching.add_argument('--fetch-metrics', metavar='FILE', help='Write DNS/connect/TLS/TTFB/body percentiles per host: Prometheus text for .prom/.txt, else JSON')
+
+    caching = command.add_argument_group('caching')
+    caching.add_argument('--no-cache', action='store_true', help='Do not read or write the fetch cache')
+    caching.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Fetch cache directory (default: %(default)s)')
+    caching.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL, help='Seconds a cached page is used without revalidation (default: %(default)s)')
+
+    analysis = command.add_argument_group('analysis')
+    analysis.add_argument('--workers', type=int, help='Analysis processes (default: one per core, 0 to analyze in-process)')
+    analysis.add_argument('--incremental', nargs='?', const=DEFAULT_HISTORY_PATH, metavar='DB',
+                          help='Reuse the stored metrics of pages unchanged since the previous run, keeping page fingerprints in DB (default: %(const)s)')
+    analysis.add_argument('--time-budget', type=float, default=DEFAULT_TIME_BUDGET, metavar='SECONDS',
+                          help='Stop analyzing a page after this long and keep the metrics of the part read, marked truncated; 0 for no limit (default: %(default)s)')
+    analysis.add_argument('--metrics', type=metrics_argument, action='extend', metavar='NAME[,NAME...]',
+                          help=f"Only run the analyzers behind these metrics or metric groups ({', '.join(METRIC_GROUPS)}); default: all")
+    analysis.add_argument('--signatures', type=signatures_argument, metavar='FILE',
+                          help=f'Technology signature database (JSON) for framework detection (default: {DEFAULT_SIGNATURES})')
+
+    archive = command.add_argument_group('archive')
+    archive.add_argument('--archive', nargs='?', const=DEFAULT_ARCHIVE_DIR, metavar='DIR',
+                         help='Also add the results to a columnar archive partitioned by run date and domain (default DIR: %(const)s)')
+    archive.add_argument('--archive-format', choices=ARCHIVE_FORMATS, default='parquet', help='Archive file format (default: %(default)s)')
+    archive.add_argument('--compression', choices=COMPRESSIONS, default=DEFAULT_COMPRESSION, help='Archive compression (default: %(default)s)')
+    archive.add_argument('--history', nargs='?', const=DEFAULT_HISTORY_PATH, metavar='DB',
+                         help='Also record the metrics in a SQLite history database for trend queries (default DB: %(const)s)')
+    archive.add_argument('--label', help='Name of the run in the history database')
+
+    profiling = command.add_argument_group('profiling')
+    profiling.add_argument('--profile', action='store_true', help='Time every analyzer and report the slowest analyzers and pages')
+    profiling.add_argument('--profile-top', type=int, default=0, metavar='N', help='Re-run the N slowest pages under cProfile and tracemalloc (implies --profile)')
+    profiling.add_argument('--profile-out', help='Write the profiling report as JSON to this file (implies --profile)')
+
+    command.add_argument('-q', '--quiet', action='store_true', help='No progress output')
+
+
+def date_argument(value: str) -> str:
+    if parse_lastmod(value) is None:
+        raise argparse.ArgumentTypeError(f"not a date: {value}")
+    return value
+
+
+def metrics_argument(value: str) -> List[str]:
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    try:
+        expand_metrics(names)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return names
+
+
+def signatures_argument(path: str) -> SignatureDB:
+    try:
+        return load_signatures(path)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise argparse.ArgumentTypeError(f"Cannot load signatures from {path}: {e}")
+
+
+def run_analyze(args) -> int:
+    if not args.urls and not args.sitemap:
+        print("Give a URL file, --sitemap, or both", file=sys.stderr)
+        return 2
+    urls = read_urls(args.urls) if args.urls else []
+    if args.limit is not None:
+        urls = urls[:args.limit]
+    if not args.sitemap:
+        if not urls:
+            print("No valid URLs found", file=sys.stderr)
+            return 1
+        return run_batch(args, urls)
+
+    # Sitemap URLs stream into the fetcher while later sitemaps still download
+    reader = SitemapReader(
+        HTMLAnalyzer(),
+        timeout=args.timeout,
+        since=args.since,
+        until=args.until,
+        keep_undated=not args.skip_undated,
+        limit=None if args.limit is None else args.limit - len(urls),
+        http2=args.http2
+    )
+
+    async def all_urls():
+        for url in urls:
+            yield url
+        if reader.limit is None or reader.limit > 0:
+            async for url in reader.urls(args.sitemap):
+                yield url
+
+    status = run_batch(args, all_urls())
+    if not args.quiet:
+        print(format_sitemap_stats(reader.stats), file=sys.stderr)
+    for url, error in reader.errors:
+        print(f"Sitemap {url} failed: {error}", file=sys.stderr)
+    return status
+
+
+def run_crawl(args) -> int:
+    return run_batch(args, args.seeds, crawl=True)
+
+
+def run_batch(args, urls: Union[List[str], AsyncIterable[str]], crawl: bool = False) -> int:
+    """Fetch and analyze ``urls`` (a list or a stream), or crawl from them, writing records as pages finish"""
+    if args.rate <= 0:
+        print("--rate must be positive", file=sys.stderr)
+        return 2
+
+    metrics = FetchMetrics()
+    fetcher = AsyncFetcher(
+        HTMLAnalyzer(),
+        timeout=args.timeout,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        rate_limiter=HostRateLimiter(rate=args.rate, jitter=args.jitter, crawl_delay=args.crawl_delay),
+        http2=args.http2,
+        hedge_delay=args.hedge_delay,
+        cache=None if args.no_cache else FetchCache(args.cache_dir, ttl=args.cache_ttl),
+        max_bytes=args.max_bytes or None,
+        metrics=metrics
+    )
+    instrument = args.profile or args.profile_top > 0 or bool(args.profile_out)
+    profile = BatchProfile(keep_slowest=args.profile_top) if instrument else None
+    crawler = SiteCrawler(
+        fetcher,
+        max_depth=args.depth,
+        max_pages=args.max_pages,
+        same_path=args.same_path,
+        allow_subdomains=args.subdomains,
+        respect_robots=not args.ignore_robots
+    ) if crawl else None
+    total = args.max_pages if crawl else len(urls) if isinstance(urls, list) else '?'
+    # Snapshots of a metric selection or signature database only serve the same one
+    version = analysis_version(args.metrics, args.signatures)
+    snapshots = PageSnapshots(args.incremental, version=version) if args.incremental else None
+    pipeline = AnalysisPipeline(crawler or fetcher, workers=args.workers, analysis_cache=AnalysisCache(), instrument=instrument,
+                                snapshots=snapshots, time_budget=args.time_budget or None, metrics=args.metrics,
+                                signatures=args.signatures)
+    writer = open_writer(args.out, args.format, extra_fields=['crawl_depth'] if crawl else None)
+
+    started = time.monotonic()
+    counts = {'done': 0, 'failed': 0, 'truncated': 0, 'recorded': 0, 'batches': 0}
+    # The archive and the history database share the run id
+    run_id = new_run_id()
+    run_started = datetime.now(timezone.utc)
+    history = HistoryStore(args.history) if args.history else None
+    # Successful records not yet archived or recorded
+    kept = []
+
+    def flush():
+        """Write the kept records as one batch of the run, so memory does not grow with it"""
+        if args.archive and kept:
+            write_archive(kept, args.archive, args.archive_format, args.compression, run_id,
+                          part=counts['batches'], analyzed_at=run_started)
+        # A run without pages is still recorded
+        if history is not None and (kept or not counts['batches']):
+            history.record_run(kept, run_id, label=args.label, analyzed_at=run_started.timestamp(), append=True)
+        counts['recorded'] += len(kept)
+        counts['batches'] += 1
+        kept.clear()
+
+    def on_result(index: int, url: str, fetch_result, record):
+        counts['done'] += 1
+        analyzed = record is not None
+        if record is None:
+            counts['failed'] += 1
+            record = {'url': url, 'error': fetch_result['error']}
+        else:
+            if profile is not None:
+                profile.add(url, record, fetch_result['html'])
+            counts['truncated'] += bool(record.get('truncated'))
+        if crawl:
+            record['crawl_depth'] = fetch_result.get('crawl_depth')
+        writer.write(record)
+        if analyzed and (args.archive or history is not None):
+            kept.append(record)
+            if len(kept) >= RECORD_BATCH:
+                flush()
+
+        if not args.quiet:
+            elapsed = time.monotonic() - started
+            print(f"\r[{counts['done']}/{total}] failed: {counts['failed']} - {elapsed:.1f}s",
+                  end='', file=sys.stderr, flush=True)
+
+    try:
+        pipeline.run_stream(urls, on_result)
+    except KeyboardInterrupt:
+        print("\nInterrupted", file=sys.stderr)
+        return 130
+    except BrokenPipeError:
+        # The reader went away (``| head``); keep the exit-time flush from failing again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 141
+    finally:
+        writer.close()
+        if snapshots is not None:
+            snapshots.close()
+
+    if not args.quiet:
+        # A crawl's URL list is only its seeds
+        listed = len(urls) if isinstance(urls, list) and crawler is None else counts['done']
+        print(f"\nAnalyzed {counts['done'] - counts['failed']} of {listed} URLs in "
+              f"{time.monotonic() - started:.1f}s", file=sys.stderr)
+        if counts['truncated']:
+            print(f"{counts['truncated']} pages hit the {args.time_budget:g}s time budget and were analyzed in part",
+                  file=sys.stderr)
+        if crawler is not None:
+            print(format_crawl_stats(crawler.stats), file=sys.stderr)
+        if snapshots is not None:
+            print(format_incremental_stats(snapshots.stats), file=sys.stderr)
+        print(metrics.format_report(), file=sys.stderr)
+    if args.fetch_metrics:
+        metrics.write(args.fetch_metrics)
+    if args.archive or history is not None:
+        flush()
+    if args.archive and not args.quiet:
+        print(f"Archived {counts['recorded']} records as run {run_id} in {args.archive}", file=sys.stderr)
+    if history is not None and not args.quiet:
+        print(f"Recorded {counts['recorded']} pages as run {run_id} in {args.history}", file=sys.stderr)
+    if profile is not None:
+        report_profile(profile, args)
+    return 0
+
+
+def run_history(args) -> int:
+    if not os.path.exists(args.db):
+        print(f"No history database at {args.db}; record runs with --history", file=sys.stderr)
+        return 1
+    store = HistoryStore(args.db)
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        if args.query == 'runs':
+            print(store.runs().to_string(index=False))
+        elif args.query == 'trend' and args.domain:
+            print(store.domain_trend(args.domain, args.metric[0], since=args.since).to_string(index=False))
+        elif args.query == 'trend':
+            print(store.metric_history(args.url, args.metric, since=args.since).to_string(index=False))
+        else:
+            try:
+                changes = store.changes(args.metric, args.run, args.against, args.direction, args.min_change, args.limit)
+            except KeyError as e:
+                print(e.args[0], file=sys.stderr)
+                return 1
+            print(format_changes(changes, args.metric))
+    return 0
+
+
+def report_profile(profile: BatchProfile, args):
+    """Slowest analyzers and pages to stderr, optionally everything to --profile-out"""
+    print(profile.format_report(), file=sys.stderr)
+
+    analyzer = HTMLAnalyzer(metrics=args.metrics, signatures=args.signatures)
+    documents = profile.profile_slowest(analyzer) if args.profile_top > 0 else []
+    if documents and not args.profile_out:
+        for document in documents:
+            print(f"\nProfile of {document['url']} (peak {document['peak_memory_kb']:.0f} KB):", file=sys.stderr)
+            print(document['cpu_profile'], file=sys.stderr)
+
+    if args.profile_out:
+        with open(args.profile_out, 'w', encoding='utf-8') as f:
+            json.dump({
+                'slowest_analyzers': profile.slowest_analyzers(),
+                'slowest_pages': profile.slowest_pages(len(profile.pages)),
+                'documents': documents,
+            }, f, indent=1)
+        print(f"Profiling report written to {args.profile_out}", file=sys.stderr)
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == 'analyze':
+        return run_analyze(args)
+    if args.command == 'crawl':
+        return run_crawl(args)
+    if args.command == 'history':
+        return run_history(args)
+    return 2
@@ -0,0 +1,228 @@
+"""
+Site crawling.
+
+``SiteCrawler`` starts from seed URLs and follows links on the same site up to
+``max_depth`` clicks away, fetching at most ``max_pages`` pages. It stands in
+for ``AsyncFetcher`` in an ``AnalysisPipeline``: pages go through the same
+concurrent fetcher (per-host limits, rate limiting, cache) and straight into
+the analyzers, while the links of each page feed the frontier.
+
+The frontier is a priority queue: shallower pages first, then pages without a
+query string, then shorter paths, so a limited budget covers a site's main
+sections before its long tails. Discovered URLs are remembered in an exact
+set, or in a Bloom filter once the crawl could see more than
+``bloom.EXACT_SET_LIMIT`` URLs.
+"""
+import asyncio
+import heapq
+import html as html_lib
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from .bloom import DEFAULT_ERROR_RATE, seen_set
+from .cache import cache_key
+from .fetcher import AsyncFetcher, _maybe_await, normalize_url
+from .pool import AsyncClientPool
+from .ratelimit import robots_url
+from .tokenizer import tag_attributes
+
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MAX_PAGES = 100
+# Links remembered per page of budget when sizing the seen-set
+SEEN_PER_PAGE = 50
+
+# Start tags that carry followable links, and <base href> which changes how they resolve
+_LINK_TAG_RE = re.compile(r'<(a|area|base)\s[^>]*>', re.IGNORECASE)
+_SKIP_SCHEMES = ('#', 'mailto:', 'javascript:', 'tel:', 'data:', 'ftp:')
+# Files that are never HTML pages
+_SKIP_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.bmp', '.avif',
+    '.pdf', '.zip', '.gz', '.tar', '.rar', '.7z', '.exe', '.dmg',
+    '.mp3', '.mp4', '.avi', '.mov', '.webm', '.wav',
+    '.css', '.js', '.json', '.xml', '.rss', '.woff', '.woff2', '.ttf', '.eot',
+    '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.csv',
+)
+
+
+def extract_links(html: str, base_url: str) -> List[str]:
+    """Absolute http(s) URLs of every <a>/<area> href in document order, without fragments"""
+    base = base_url
+    links = []
+    for match in _LINK_TAG_RE.finditer(html):
+        attrs = tag_attributes(html, match.start(), match.end())
+        href = attrs.get('href', '').strip()
+        if not href:
+            continue
+        if match.group(1).lower() == 'base':
+            base = urljoin(base_url, html_lib.unescape(href))
+            continue
+        if href.lower().startswith(_SKIP_SCHEMES) or 'nofollow' in attrs.get('rel', '').lower().split():
+            continue
+        url = urljoin(base, html_lib.unescape(href))
+        if url.startswith(('http://', 'https://')):
+            links.append(cache_key(url))
+    return links
+
+
+def site_host(url: str) -> str:
+    """Host without port and leading www., which counts as the same site"""
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def link_priority(url: str, depth: int) -> Tuple[int, int, int]:
+    """Frontier order: depth, then no query string, then fewer path segments"""
+    parts = urlsplit(url)
+    return depth, 1 if parts.query else 0, sum(1 for segment in parts.path.split('/') if segment)
+
+
+class SiteCrawler:
+    """
+    Crawl from seed URLs through an ``AsyncFetcher``.
+
+    ``stream(seeds, on_result)`` has the same contract as
+    ``AsyncFetcher.stream``, with indexes in crawl order, so it can be handed
+    to ``AnalysisPipeline`` as its fetcher. Each result carries its
+    ``crawl_depth``. Links are followed when they stay on a seed's site
+    (``www.`` ignored; subdomains too with ``allow_subdomains``) and, with
+    ``same_path``, under a seed's directory. ``robots.txt`` rules are honored
+    unless ``respect_robots`` is off.
+    """
+
+    def __init__(self, fetcher: AsyncFetcher, max_depth: int = DEFAULT_MAX_DEPTH, max_pages: int = DEFAULT_MAX_PAGES,
+                 same_path: bool = False, allow_subdomains: bool = False, respect_robots: bool = True,
+                 seen_capacity: int = None, error_rate: float = DEFAULT_ERROR_RATE, max_frontier: int = None,
+                 priority: Callable[[str, int], Tuple] = link_priority):
+        self.fetcher = fetcher
+        self.metrics = fetcher.metrics
+        self.max_depth = max(0, max_depth)
+        self.max_pages = max(1, max_pages)
+        self.same_path = same_path
+        self.allow_subdomains = allow_subdomains
+        self.respect_robots = respect_robots
+        self.priority = priority
+        # URLs beyond the budget are never fetched; keep a margin for better ones found later
+        self.max_frontier = max_frontier or max(10 * self.max_pages, 10_000)
+        self.seen = seen_set(seen_capacity or self.max_pages * SEEN_PER_PAGE, error_rate)
+        self.stats = {
+            'scheduled': 0, 'fetched': 0, 'failed': 0, 'links_found': 0, 'duplicates': 0,
+            'out_of_scope': 0, 'blocked_by_robots': 0, 'frontier_full': 0,
+            'frontier_peak': 0, 'max_depth_reached': 0,
+        }
+        self._frontier: List[Tuple[Tuple, int, str, int]] = []
+        self._sequence = 0
+        self._depths: Dict[str, int] = {}
+        self._in_flight = 0
+        self._changed: Optional[asyncio.Event] = None
+        self._hosts: List[str] = []
+        self._prefixes: List[str] = []
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+
+    def in_scope(self, url: str) -> bool:
+        host = site_host(url)
+        if not any(host == seed or (self.allow_subdomains and host.endswith('.' + seed)) for seed in self._hosts):
+            return False
+        path = urlsplit(url).path or '/'
+        if path.lower().endswith(_SKIP_EXTENSIONS):
+            return False
+        return not self.same_path or any(path.startswith(prefix) for prefix in self._prefixes)
+
+    def _push(self, url: str, depth: int):
+        if not self.seen.add(url):
+            self.stats['duplicates'] += 1
+            return
+        if len(self._frontier) >= self.max_frontier:
+            self.stats['frontier_full'] += 1
+            return
+        self._sequence += 1
+        heapq.heappush(self._frontier, (self.priority(url, depth), self._sequence, url, depth))
+        self.stats['frontier_peak'] = max(self.stats['frontier_peak'], len(self._frontier))
+
+    def _follow(self, result: Dict[str, Any], depth: int):
+        """Queue the in-scope links of a fetched page"""
+        final_url = cache_key(result['url'])
+        self.seen.add(final_url)
+        if depth >= self.max_depth or not self.in_scope(final_url):
+            return
+        for link in extract_links(result['html'], result['url']):
+            self.stats['links_found'] += 1
+            if self.in_scope(link):
+                self._push(link, depth + 1)
+            else:
+                self.stats['out_of_scope'] += 1
+
+    @property
+    def budget_left(self) -> int:
+        return self.max_pages - self.stats['scheduled']
+
+    async def _allowed(self, pool: AsyncClientPool, url: str) -> bool:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._robots:
+            self._robots[host] = None
+            try:
+                robots_txt = await self.fetcher._load_robots(pool, robots_url(url))
+            except Exception:
+                robots_txt = None
+            if robots_txt:
+                rules = RobotFileParser()
+                rules.parse(robots_txt.splitlines())
+                self._robots[host] = rules
+        rules = self._robots[host]
+        return rules is None or rules.can_fetch('*', url)
+
+    async def _schedule(self, pool: AsyncClientPool):
+        """Hand out frontier URLs until the budget is spent or the site is exhausted"""
+        while self.budget_left > 0:
+            # An empty frontier only means the end once no page in flight can add links
+            while not self._frontier and self._in_flight:
+                self._changed.clear()
+                await self._changed.wait()
+            if not self._frontier:
+                return
+
+            _, _, url, depth = heapq.heappop(self._frontier)
+            if self.respect_robots and not await self._allowed(pool, url):
+                self.stats['blocked_by_robots'] += 1
+                continue
+            self._depths[url] = depth
+            self._in_flight += 1
+            self.stats['scheduled'] += 1
+            self.stats['max_depth_reached'] = max(self.stats['max_depth_reached'], depth)
+            yield url
+
+    async def stream(self, seeds: Iterable[str], on_result: Callable[[int, str, Dict[str, Any]], Any]):
+        """Crawl from ``seeds``, handing every fetched page to ``on_result(index, url, result)``"""
+        self._changed = asyncio.Event()
+        for seed in seeds:
+            url = cache_key(normalize_url(seed))
+            self._hosts.append(site_host(url))
+            path = urlsplit(url).path
+            self._prefixes.append(path[:path.rfind('/') + 1] or '/')
+            self._push(url, 0)
+
+        async def fetched(index: int, url: str, result: Dict[str, Any]):
+            depth = self._depths.pop(url, 0)
+            result['crawl_depth'] = depth
+            try:
+                if result.get('success'):
+                    self.stats['fetched'] += 1
+                    if self.budget_left > 0:
+                        self._follow(result, depth)
+                else:
+                    self.stats['failed'] += 1
+            finally:
+                self._in_flight -= 1
+                self._changed.set()
+            await _maybe_await(on_result(index, url, result))
+
+        async with AsyncClientPool(timeout=min(self.fetcher.timeout, 10)) as pool:
+            await self.fetcher.stream(self._schedule(pool), fetched)
+
+
+def format_crawl_stats(stats: Dict[str, int]) -> str:
+    """One-line crawl summary for progress output"""
+    return (f"Crawl: {stats['fetched']} pages fetched, {stats['failed']} failed, depth {stats['max_depth_reached']} reached; "
+            f"{stats['links_found']} links seen, {stats['duplicates']} duplicates, {stats['out_of_scope']} off-site or non-HTML, "
+            f"{stats['blocked_by_robots']} blocked by robots.txt, frontier peak {stats['frontier_peak']}")
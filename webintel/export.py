@@ -0,0 +1,89 @@
+"""
+Writers for analysis records.
+
+Records are written one at a time as pages finish, so long batches can be
+followed (and survive interruption) without holding every result in memory.
+"""
+import csv
+import json
+import sys
+from typing import Any, Dict, List, Optional, TextIO
+
+FORMATS = ('jsonl', 'csv')
+
+# Fetch details attached by pipeline.analysis_record, plus failures' error
+_LEADING_FIELDS = ['url', 'final_url', 'status_code', 'method']
+_TRAILING_FIELDS = ['error']
+
+_record_fields: Optional[List[str]] = None
+
+
+def record_fields() -> List[str]:
+    """Column order for tabular output: fetch details, then every metric"""
+    global _record_fields
+    if _record_fields is None:
+        from .analyzer import HTMLAnalyzer
+        # Every analysis has the same keys; an empty document lists them cheaply
+        metrics = HTMLAnalyzer().analyze_html_structure('', {'url': ''})
+        _record_fields = _LEADING_FIELDS + [key for key in metrics if key not in _LEADING_FIELDS] + _TRAILING_FIELDS
+    return _record_fields
+
+
+def detect_format(path: str) -> str:
+    """Output format from a file name, JSONL unless it ends in .csv"""
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+class JsonlWriter:
+    """One JSON object per line"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, record: Dict[str, Any]):
+        self.stream.write(json.dumps(record, default=str) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+class CsvWriter:
+    """
+    One row per record; list and dict metrics are stored as JSON.
+
+    ``extra_fields`` are columns some records carry besides the analysis, such
+    as a crawl's ``crawl_depth``; they go before ``error``.
+    """
+
+    def __init__(self, stream: TextIO, extra_fields: List[str] = None):
+        self.stream = stream
+        fields = record_fields()
+        trailing = len(_TRAILING_FIELDS)
+        fieldnames = fields[:-trailing] + list(extra_fields or []) + fields[-trailing:]
+        # Keys outside the columns (instrumented runs' timings) are left to JSONL
+        self.writer = csv.DictWriter(stream, fieldnames=fieldnames, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record: Dict[str, Any]):
+        row = {
+            key: json.dumps(value, default=str) if isinstance(value, (list, tuple, dict)) else value
+            for key, value in record.items()
+        }
+        self.writer.writerow(row)
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+def open_writer(path: str, fmt: str = None, extra_fields: List[str] = None):
+    """Open a record writer on ``path`` ('-' for stdout); see ``CsvWriter`` for ``extra_fields``"""
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}")
+
+    stream = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+    return CsvWriter(stream, extra_fields) if fmt == 'csv' else JsonlWriter(stream)
@@ -0,0 +1,300 @@
+"""
+Concurrent page fetching for URL batches.
+
+``HTMLAnalyzer.fetch_html`` fetches one page at a time. ``AsyncFetcher`` runs a
+whole batch on one event loop so a group of URLs takes about as long as its
+slowest few requests instead of the sum of all of them.
+"""
+import asyncio
+import inspect
+import random
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, List, Optional, Union
+from urllib.parse import urlparse
+
+from .body import CHUNK_SIZE, DEFAULT_MAX_BODY_BYTES, BodyRejected, aread_body, check_headers, decode_body
+from .cache import FetchCache
+from .fetchmetrics import FetchMetrics, record_attempt
+from .pool import AsyncClientPool
+from .ratelimit import HostRateLimiter
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PER_HOST = 2
+DEFAULT_HEDGE_DELAY = 2.0
+# URLs scheduled ahead of the running requests in ``stream``
+PENDING_WINDOW = 256
+
+
+def normalize_url(url: str) -> str:
+    """Ensure URL has protocol"""
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def host_key(url: str) -> str:
+    """Host used for per-host limits"""
+    return urlparse(url).netloc.lower()
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        await value
+
+
+async def _aiter(items: Union[Iterable, AsyncIterable]):
+    if hasattr(items, '__aiter__'):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class AsyncFetcher:
+    """
+    Fetch many URLs concurrently with ``httpx.AsyncClient``.
+
+    Each request gets fresh headers from the analyzer's header rotation and
+    results are the same dicts ``fetch_html`` returns. At most ``concurrency``
+    requests are in flight overall and at most ``per_host`` against one host.
+    Connections are pooled per origin for the batch and kept alive between
+    requests, optionally over HTTP/2. Phase timings of every attempt are
+    attached as ``fetch_timings`` and aggregated in ``metrics``.
+    """
+
+    def __init__(self, analyzer, timeout: int = 10, concurrency: int = DEFAULT_CONCURRENCY,
+                 per_host: int = DEFAULT_PER_HOST, rate_limiter: HostRateLimiter = None,
+                 http2: bool = False, hedge_delay: Optional[float] = None, cache: FetchCache = None,
+                 max_bytes: Optional[int] = DEFAULT_MAX_BODY_BYTES, metrics: FetchMetrics = None):
+        self.analyzer = analyzer
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        # Per-host politeness; requests to different hosts never wait for each other
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.http2 = http2
+        # Seconds to wait on a strategy before also starting the next one; None tries them strictly in turn
+        self.hedge_delay = hedge_delay
+        # Optional disk cache: fresh entries skip the network, stale ones are revalidated
+        self.cache = cache
+        # Pages over this many bytes are dropped while downloading; None for no cap
+        self.max_bytes = max_bytes
+        # DNS/connect/TLS/TTFB/body percentiles per host and for everything fetched
+        self.metrics = metrics if metrics is not None else FetchMetrics()
+
+    def run(self, urls: List[str], on_result: Callable[[int, str, Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
+        """Blocking wrapper around ``fetch_all`` for callers without an event loop"""
+        return asyncio.run(self.fetch_all(urls, on_result))
+
+    async def fetch_all(self, urls: List[str], on_result: Callable[[int, str, Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch every URL and return the results in input order.
+
+        ``on_result(index, url, result)`` is called as each fetch finishes, on
+        the event loop's thread, so it can drive progress reporting.
+        """
+        results: List[Dict[str, Any]] = [None] * len(urls)
+
+        async def collect(index: int, url: str, result: Dict[str, Any]):
+            results[index] = result
+            if on_result:
+                await _maybe_await(on_result(index, url, result))
+
+        await self.stream(urls, collect)
+        return results
+
+    async def stream(self, urls: Union[Iterable[str], AsyncIterable[str]], on_result: Callable[[int, str, Dict[str, Any]], Any]):
+        """
+        Fetch every URL and hand each result to ``on_result(index, url, result)``
+        without keeping it. ``on_result`` may be a coroutine function; the
+        fetch that produced the result waits for it, which lets a slow consumer
+        hold back the fetchers.
+
+        ``urls`` may be any iterable, or an async iterable that produces URLs
+        while earlier ones are fetched (see ``webintel.crawl``). It is
+        consumed lazily: only a window of URLs ahead of the running requests
+        is scheduled at a time, so huge lists do not turn into huge numbers of
+        waiting tasks.
+        """
+        window = asyncio.Semaphore(max(PENDING_WINDOW, 4 * self.concurrency))
+        global_slots = asyncio.Semaphore(self.concurrency)
+        host_slots: Dict[str, asyncio.Semaphore] = {}
+
+        # Hedged requests need their own connections next to the ones they hedge
+        connections = self.per_host * (len(self.fetch_strategies) if self.hedge_delay is not None else 1)
+        async with AsyncClientPool(timeout=self.timeout, http2=self.http2, connections_per_host=connections) as pool:
+
+            async def run_one(index: int, url: str):
+                target = normalize_url(url)
+                # Cache reads and writes touch the disk, so they run off the event loop
+                cached = await asyncio.to_thread(self.cache.lookup, target) if self.cache else None
+
+                if cached and cached['fresh']:
+                    result = dict(cached['result'], cache='hit')
+                else:
+                    # Take the host slot first so a queued host never holds a global slot
+                    host_slot = host_slots.setdefault(host_key(target), asyncio.Semaphore(self.per_host))
+                    async with host_slot:
+                        await self.rate_limiter.wait(target, lambda robots: self._load_robots(pool, robots))
+                        async with global_slots:
+                            result = await self.fetch(pool, target, cached)
+                    self.metrics.record(target, result)
+
+                await _maybe_await(on_result(index, url, result))
+
+            tasks = set()
+            failures = []
+
+            def task_done(task: asyncio.Task):
+                tasks.discard(task)
+                window.release()
+                if not task.cancelled() and task.exception() is not None:
+                    failures.append(task.exception())
+
+            try:
+                index = 0
+                pending = _aiter(urls).__aiter__()
+                while True:
+                    # Surface a failed consumer instead of fetching the rest of the list
+                    if failures:
+                        raise failures[0]
+                    try:
+                        url = await pending.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    await window.acquire()
+                    if failures:
+                        raise failures[0]
+                    task = asyncio.ensure_future(run_one(index, url))
+                    tasks.add(task)
+                    task.add_done_callback(task_done)
+                    index += 1
+                await asyncio.gather(*tasks)
+                # Tasks that failed after the last URL was scheduled are no longer in ``tasks``
+                if failures:
+                    raise failures[0]
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def _load_robots(self, pool: AsyncClientPool, url: str) -> Optional[str]:
+        response = await pool.get(url, headers=self.analyzer.get_stealth_headers(), timeout=min(self.timeout, 10))
+        return response.text if response.status_code == 200 else None
+
+    # Fallback chain: (method, label for errors), tried in this order
+    fetch_strategies = [
+        ('stealth_httpx', 'Primary method'),
+        ('minimal_headers', 'Minimal headers'),
+    ]
+
+    def _headers_for(self, method: str) -> Dict[str, str]:
+        if method == 'minimal_headers':
+            return {
+                'User-Agent': random.choice(self.analyzer.user_agents),
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'
+            }
+        return self.analyzer.get_stealth_headers()
+
+    async def _attempt(self, pool: AsyncClientPool, url: str, method: str, timeout: float,
+                       extra_headers: Dict[str, str], attempts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        headers = self._headers_for(method)
+        headers.update(extra_headers)
+        with record_attempt(attempts, method) as timing:
+            async with pool.stream(url, headers=headers, timeout=timeout) as response:
+                timing.status_code = response.status_code
+                # 304 answers a cache revalidation, it is not a failure
+                html = ''
+                if response.status_code != 304:
+                    response.raise_for_status()
+                    # Decide from the headers before downloading anything
+                    check_headers(response.headers, self.max_bytes)
+                    with timing.phase('body'):
+                        body = await aread_body(response.headers, response.aiter_bytes(CHUNK_SIZE), self.max_bytes)
+                    html = decode_body(body, response.encoding)
+                timing.bytes_received = response.num_bytes_downloaded
+
+        return {
+            'success': True,
+            'html': html,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'url': str(response.url),
+            'method': method
+        }
+
+    async def fetch(self, pool: AsyncClientPool, url: str, cached: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Fetch one URL, falling back to minimal headers when the stealth
+        request fails.
+
+        The whole chain shares one deadline of ``timeout`` seconds. With a
+        ``hedge_delay`` the next strategy also starts when the running ones
+        have not answered within that delay, and the first success wins.
+        A stale ``cached`` entry is revalidated with conditional headers.
+        """
+        attempts: List[Dict[str, Any]] = []
+        result = await self._fetch_chain(pool, url, self.cache.conditional_headers(cached) if cached else {}, attempts)
+        if self.cache:
+            result = await asyncio.to_thread(self.cache.resolve, url, cached, result)
+        # Every attempt of the chain, including failed and cancelled ones
+        result['fetch_timings'] = attempts
+        return result
+
+    async def _fetch_chain(self, pool: AsyncClientPool, url: str, extra_headers: Dict[str, str],
+                           attempts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        strategies = self.fetch_strategies
+        errors: Dict[int, str] = {}
+        running: Dict[asyncio.Task, int] = {}
+        next_strategy = 0
+
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+
+                # Start the next strategy when nothing is running (sequential
+                # fallback) or the running ones are past the hedge delay
+                if not running:
+                    if next_strategy == len(strategies):
+                        break
+                    task = asyncio.ensure_future(self._attempt(pool, url, strategies[next_strategy][0], remaining, extra_headers, attempts))
+                    running[task] = next_strategy
+                    next_strategy += 1
+
+                can_hedge = self.hedge_delay is not None and next_strategy < len(strategies)
+                wait_for = min(remaining, self.hedge_delay) if can_hedge else remaining
+                done, _ = await asyncio.wait(running, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    index = running.pop(task)
+                    try:
+                        return task.result()
+                    except BodyRejected as e:
+                        # Other methods would get the same body
+                        return {'success': False, 'error': str(e), 'url': url}
+                    except Exception as e:
+                        errors[index] = str(e)
+
+                if not done and can_hedge:
+                    task = asyncio.ensure_future(self._attempt(pool, url, strategies[next_strategy][0], deadline - loop.time(), extra_headers, attempts))
+                    running[task] = next_strategy
+                    next_strategy += 1
+        finally:
+            for task in running:
+                task.cancel()
+            # Collect the losers so their errors are not reported as unhandled
+            await asyncio.gather(*running, return_exceptions=True)
+
+        for index in running.values():
+            errors[index] = f"deadline of {self.timeout}s exceeded"
+        for index in range(next_strategy, len(strategies)):
+            errors[index] = "not started before deadline"
+
+        return {
+            'success': False,
+            'error': "All methods failed - " + ' | '.join(f"{strategies[i][1]}: {errors[i]}" for i in sorted(errors)),
+            'url': url
+        }
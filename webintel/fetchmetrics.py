@@ -0,0 +1,346 @@
+"""
+Fetch-phase timings.
+
+Every fetch attempt (each method of the fallback chain, hedged or not) records
+how long it spent in DNS resolution, TCP connect, TLS handshake, waiting for
+the first response byte and transferring the body, plus the bytes received.
+The attempts are attached to the fetch result as ``fetch_timings``;
+``FetchMetrics`` aggregates them into p50/p95/p99 per host and per batch and
+exports JSON or Prometheus text.
+
+httpx attempts are timed through httpcore's ``trace`` extension and a network
+backend that resolves names itself, so DNS and connect are told apart. A
+reused keep-alive connection has no DNS, connect or TLS phase. requests
+attempts only expose time to the response headers (connection setup
+included) and body transfer.
+"""
+import contextlib
+import contextvars
+import json
+import socket
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import anyio
+import httpcore
+
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'body')
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Timing of the attempt running in the current task or thread
+_current: contextvars.ContextVar = contextvars.ContextVar('webintel_fetch_attempt', default=None)
+
+
+class AttemptTiming:
+    """Phase durations (seconds) of one fetch attempt"""
+
+    def __init__(self, method: str):
+        self.method = method
+        self.phases: Dict[str, Optional[float]] = dict.fromkeys(PHASES)
+        self.total: Optional[float] = None
+        self.bytes_received: Optional[int] = None
+        self.status_code: Optional[int] = None
+        self.error: Optional[str] = None
+        self._marks: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float):
+        # Redirect hops add up
+        self.phases[phase] = (self.phases[phase] or 0.0) + seconds
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def on_trace(self, event: str, info: Dict[str, Any]):
+        """Turn httpcore trace events into phases"""
+        # e.g. 'connection.start_tls.started', 'http11.receive_response_headers.complete'
+        name, _, stage = event.rpartition('.')
+        now = time.perf_counter()
+        if stage == 'started':
+            self._marks[name] = now
+            return
+        if stage not in ('complete', 'failed'):
+            return
+        if name == 'connection.start_tls':
+            self.add('tls', now - self._marks.pop(name, now))
+        elif name == 'connection.connect_tcp' and self.phases['dns'] is None:
+            # Without the timed backend, name resolution is part of connect
+            self.add('connect', now - self._marks.pop(name, now))
+        elif name.endswith('.receive_response_headers'):
+            sent = self._marks.pop(name.replace('receive_response_headers', 'send_request_headers'), None)
+            if sent is not None:
+                self.add('ttfb', now - sent)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'method': self.method,
+            **self.phases,
+            'total': self.total,
+            'bytes_received': self.bytes_received,
+            'status_code': self.status_code,
+            'error': self.error,
+        }
+
+
+@contextlib.contextmanager
+def record_attempt(attempts: List[Dict[str, Any]], method: str) -> Iterator[AttemptTiming]:
+    """Time one attempt; its summary is appended to ``attempts`` however it ends"""
+    timing = AttemptTiming(method)
+    token = _current.set(timing)
+    started = time.perf_counter()
+    try:
+        yield timing
+    except BaseException as e:
+        # Includes cancellation of hedged losers
+        timing.error = str(e) or type(e).__name__
+        raise
+    finally:
+        timing.total = time.perf_counter() - started
+        _current.reset(token)
+        attempts.append(timing.as_dict())
+
+
+def trace(event: str, info: Dict[str, Any]):
+    """httpcore ``trace`` extension for sync clients"""
+    timing = _current.get()
+    if timing is not None:
+        timing.on_trace(event, info)
+
+
+async def atrace(event: str, info: Dict[str, Any]):
+    """httpcore ``trace`` extension for async clients"""
+    trace(event, info)
+
+
+def _addresses(infos) -> List[str]:
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+class TimedAsyncBackend(httpcore.AsyncNetworkBackend):
+    """Resolves the host itself so DNS and TCP connect are timed separately"""
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend):
+        self.backend = backend
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        timing = _current.get()
+        started = time.perf_counter()
+        try:
+            with anyio.fail_after(timeout):
+                addresses = _addresses(await anyio.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+        except TimeoutError as e:
+            raise httpcore.ConnectTimeout(f"DNS lookup for {host} timed out") from e
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+        resolved = time.perf_counter()
+        if timing is not None:
+            timing.add('dns', resolved - started)
+
+        error = None
+        for address in addresses:
+            try:
+                stream = await self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+                continue
+            if timing is not None:
+                timing.add('connect', time.perf_counter() - resolved)
+            return stream
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self.backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float):
+        await self.backend.sleep(seconds)
+
+
+class TimedSyncBackend(httpcore.NetworkBackend):
+    """Sync version of ``TimedAsyncBackend``"""
+
+    def __init__(self, backend: httpcore.NetworkBackend):
+        self.backend = backend
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        timing = _current.get()
+        started = time.perf_counter()
+        try:
+            addresses = _addresses(socket.getaddrinfo(host, port, type=socket.SOCK_STREAM))
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+        resolved = time.perf_counter()
+        if timing is not None:
+            timing.add('dns', resolved - started)
+
+        error = None
+        for address in addresses:
+            try:
+                stream = self.backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+                continue
+            if timing is not None:
+                timing.add('connect', time.perf_counter() - resolved)
+            return stream
+        raise error or httpcore.ConnectError(f"No addresses for {host}")
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return self.backend.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds: float):
+        self.backend.sleep(seconds)
+
+
+def install_timed_backend(client):
+    """
+    Swap the timed backend into an httpx client's default transport.
+
+    These are private httpx/httpcore attributes; if they move, DNS is simply
+    reported as part of connect.
+    """
+    pool = getattr(getattr(client, '_transport', None), '_pool', None)
+    backend = getattr(pool, '_network_backend', None)
+    if isinstance(backend, httpcore.AsyncNetworkBackend):
+        pool._network_backend = TimedAsyncBackend(backend)
+    elif isinstance(backend, httpcore.NetworkBackend):
+        pool._network_backend = TimedSyncBackend(backend)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile of sorted ``values``"""
+    if len(values) == 1:
+        return values[0]
+    position = (len(values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+_METRICS = PHASES + ('total', 'bytes_received')
+
+
+class _Series:
+    """Samples of every metric for one host (or the whole batch)"""
+
+    def __init__(self):
+        self.attempts = 0
+        self.failures = 0
+        self.samples: Dict[str, List[float]] = {metric: [] for metric in _METRICS}
+
+    def add(self, attempt: Dict[str, Any]):
+        self.attempts += 1
+        if attempt.get('error'):
+            self.failures += 1
+        for metric in _METRICS:
+            value = attempt.get(metric)
+            if value is not None:
+                self.samples[metric].append(value)
+
+    def summary(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {'attempts': self.attempts, 'failures': self.failures}
+        for metric, values in self.samples.items():
+            if not values:
+                continue
+            values = sorted(values)
+            summary[metric] = {
+                'count': len(values),
+                'sum': sum(values),
+                'max': values[-1],
+                **{f"p{int(q * 100)}": percentile(values, q) for q in QUANTILES},
+            }
+        return summary
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels: str) -> str:
+    return '{' + ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + '}'
+
+
+class FetchMetrics:
+    """Aggregates ``fetch_timings`` of fetch results per host and per batch"""
+
+    def __init__(self):
+        self.batch = _Series()
+        self.hosts: Dict[str, _Series] = {}
+
+    def record(self, url: str, result: Dict[str, Any]):
+        attempts = result.get('fetch_timings') or []
+        if not attempts:
+            return
+        host = urlparse(url).netloc.lower()
+        series = self.hosts.get(host)
+        if series is None:
+            series = self.hosts[host] = _Series()
+        for attempt in attempts:
+            series.add(attempt)
+            self.batch.add(attempt)
+
+    def summary(self) -> Dict[str, Any]:
+        """{'batch': {...}, 'hosts': {host: {...}}}; durations in seconds"""
+        return {
+            'batch': self.batch.summary(),
+            'hosts': {host: series.summary() for host, series in sorted(self.hosts.items())},
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=1)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition: batch-wide summaries, then per-host ones"""
+        summary = self.summary()
+        lines: List[str] = []
+        scopes = (
+            ('webintel_batch_', [({}, summary['batch'])]),
+            ('webintel_', [({'host': host}, stats) for host, stats in summary['hosts'].items()]),
+        )
+        for prefix, series in scopes:
+            for family, help_text, metrics in (
+                ('fetch_phase_seconds', 'Fetch phase durations per attempt', PHASES + ('total',)),
+                ('fetch_bytes_received', 'Bytes received per attempt', ('bytes_received',)),
+            ):
+                name = prefix + family
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} summary")
+                for scope_labels, stats in series:
+                    for metric in metrics:
+                        values = stats.get(metric)
+                        if not values:
+                            continue
+                        labels = dict(scope_labels, phase=metric) if len(metrics) > 1 else dict(scope_labels)
+                        for q in QUANTILES:
+                            lines.append(f"{name}{_labels(**labels, quantile=str(q))} {values[f'p{int(q * 100)}']:.6g}")
+                        lines.append(f"{name}_sum{_labels(**labels)} {values['sum']:.6g}")
+                        lines.append(f"{name}_count{_labels(**labels)} {values['count']}")
+
+            name = prefix + 'fetch_attempts_total'
+            lines.append(f"# HELP {name} Fetch attempts by outcome")
+            lines.append(f"# TYPE {name} counter")
+            for scope_labels, stats in series:
+                lines.append(f"{name}{_labels(**scope_labels, outcome='success')} {stats['attempts'] - stats['failures']}")
+                lines.append(f"{name}{_labels(**scope_labels, outcome='failure')} {stats['failures']}")
+        return '\n'.join(lines) + '\n'
+
+    def format_report(self) -> str:
+        """Batch percentiles per phase, in milliseconds"""
+        summary = self.summary()['batch']
+        lines = [f"Fetch phases ({summary['attempts']} attempts, {summary['failures']} failed):"]
+        for phase in PHASES + ('total',):
+            stats = summary.get(phase)
+            if stats:
+                lines.append(f"  {phase:<8} p50 {stats['p50'] * 1000:>9.1f} ms  p95 {stats['p95'] * 1000:>9.1f} ms  "
+                             f"p99 {stats['p99'] * 1000:>9.1f} ms  ({stats['count']})")
+        return '\n'.join(lines)
+
+    def write(self, path: str):
+        """Prometheus text for a .prom or .txt path, JSON otherwise"""
+        text = self.to_prometheus() if path.lower().endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
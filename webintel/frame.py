@@ -0,0 +1,226 @@
+"""
+Columnar view of analysis records.
+
+``results_frame`` turns a list of records into one pandas DataFrame following
+a declared metric schema: every metric gets a column of a fixed dtype, with a
+default for records that lack it. Group statistics and the result tables are
+then column operations instead of Python loops over dicts, so groups of
+thousands of pages aggregate in milliseconds.
+
+``compare_groups`` does the same for any number of groups at once, with
+bootstrap confidence intervals on each group's difference from a baseline.
+"""
+from typing import Dict, List, Mapping, NamedTuple, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+class Metric(NamedTuple):
+    name: str
+    dtype: str
+    default: float = 0
+
+
+# Numeric metrics produced by HTMLAnalyzer.analyze_html_structure
+METRIC_SCHEMA: List[Metric] = [
+    # Structure
+    Metric('total_length', 'int64'),
+    Metric('total_lines', 'int64'),
+    Metric('total_tags', 'int64'),
+    Metric('unique_tags', 'int64'),
+    Metric('meta_tags_count', 'int64'),
+    Metric('external_css', 'int64'),
+    Metric('external_js', 'int64'),
+    Metric('inline_css', 'int64'),
+    Metric('inline_js', 'int64'),
+    Metric('images_count', 'int64'),
+    Metric('forms_count', 'int64'),
+    # Tables and lists
+    Metric('tables_count', 'int64'),
+    Metric('avg_rows_per_table', 'float64'),
+    Metric('table_data_density', 'float64'),
+    Metric('lists_count', 'int64'),
+    Metric('avg_items_per_list', 'float64'),
+    Metric('list_coverage_ratio', 'float64'),
+    # Content
+    Metric('paragraphs_count', 'int64'),
+    Metric('avg_paragraph_length', 'float64'),
+    Metric('atomic_paragraph_ratio', 'float64'),
+    Metric('h2_count', 'int64'),
+    Metric('h3_count', 'int64'),
+    Metric('heading_coverage_ratio', 'float64'),
+    # Freshness (0/1 flags)
+    Metric('url_year_inclusion', 'int64'),
+    Metric('title_year_inclusion', 'int64'),
+    Metric('meta_year_inclusion', 'int64'),
+    Metric('early_content_year_inclusion', 'int64'),
+    # URL structure
+    Metric('url_token_count', 'int64'),
+    Metric('keyword_presence_ratio', 'float64'),
+    Metric('stopword_ratio', 'float64'),
+    Metric('subfolder_page_ratio', 'int64'),
+    Metric('url_depth', 'int64'),
+    Metric('deep_link_density', 'float64'),
+    # HTML vs JavaScript (a page without scripts is all HTML)
+    Metric('html_js_byte_ratio', 'float64', 1),
+    Metric('script_tag_density', 'float64'),
+    Metric('external_js_count', 'int64'),
+    Metric('inline_js_size', 'int64'),
+    # Schema
+    Metric('schema_blocks_count', 'int64'),
+    Metric('jsonld_blocks_count', 'int64'),
+    Metric('schema_type_count', 'int64'),
+    # 1 when the analysis time budget ran out and the metrics cover part of the page
+    Metric('truncated', 'int64'),
+]
+
+# Fetch details and free-form metrics, kept as they are
+TEXT_COLUMNS = ['url', 'final_url', 'method', 'most_common_subfolder']
+LIST_COLUMNS = ['frameworks_detected', 'schema_types', 'performance_insights', 'semantic_tags_used', 'most_common_tags']
+
+# Unit conversions shown in the UI
+DERIVED_COLUMNS = {
+    'html_size_kb': ('total_length', 1 / 1024),
+    'inline_js_size_kb': ('inline_js_size', 1 / 1024),
+}
+
+# Columns averaged for group comparisons
+AVERAGE_METRICS = [
+    'html_size_kb', 'total_tags', 'unique_tags',
+    'paragraphs_count', 'avg_paragraph_length', 'atomic_paragraph_ratio', 'h2_count', 'h3_count', 'heading_coverage_ratio',
+    'url_year_inclusion', 'title_year_inclusion', 'meta_year_inclusion', 'early_content_year_inclusion',
+    'tables_count', 'avg_rows_per_table', 'table_data_density', 'lists_count', 'avg_items_per_list', 'list_coverage_ratio',
+    'url_depth', 'url_token_count', 'keyword_presence_ratio', 'stopword_ratio', 'deep_link_density',
+    'html_js_byte_ratio', 'script_tag_density', 'external_js_count', 'inline_js_size_kb',
+    'schema_blocks_count', 'schema_type_count',
+    'external_css', 'external_js', 'images_count', 'forms_count',
+]
+
+DEFAULT_PERCENTILES = (0.25, 0.75, 0.9)
+
+# Bootstrap settings for compare_groups
+DEFAULT_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+# Resampling weights held at once (resamples x pages), to bound memory on large groups
+_BOOTSTRAP_BLOCK = 1_000_000
+
+_METRIC_NAMES = [metric.name for metric in METRIC_SCHEMA]
+
+
+def results_frame(results: Sequence[Dict]) -> pd.DataFrame:
+    """One row per record, one typed column per schema metric plus the derived ones"""
+    # Column by column: much faster than DataFrame.from_records on wide dicts
+    results = list(results)
+    columns = {}
+    for name in TEXT_COLUMNS:
+        columns[name] = pd.Series([str(record.get(name) or '') for record in results], dtype=object)
+    for metric in METRIC_SCHEMA:
+        values = pd.Series([record.get(metric.name, metric.default) for record in results])
+        if values.dtype == object:
+            # Stray None or text in a numeric metric
+            values = pd.to_numeric(values, errors='coerce')
+        columns[metric.name] = values.fillna(metric.default).astype(metric.dtype)
+    for name in LIST_COLUMNS:
+        columns[name] = pd.Series([_as_list(record.get(name)) for record in results], dtype=object)
+    for name, (source, scale) in DERIVED_COLUMNS.items():
+        columns[name] = columns[source] * scale
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(results)))
+
+
+def _as_list(value) -> list:
+    return value if isinstance(value, list) else []
+
+
+def as_frame(results: Union[Sequence[Dict], pd.DataFrame]) -> pd.DataFrame:
+    return results if isinstance(results, pd.DataFrame) else results_frame(results)
+
+
+def group_averages(results: Union[Sequence[Dict], pd.DataFrame], metrics: List[str] = None) -> Dict[str, float]:
+    """Mean of every comparison metric; empty for an empty group"""
+    frame = as_frame(results)
+    if frame.empty:
+        return {}
+    return frame[metrics or AVERAGE_METRICS].mean().to_dict()
+
+
+def group_stats(results: Union[Sequence[Dict], pd.DataFrame], metrics: List[str] = None,
+                percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> pd.DataFrame:
+    """Mean, median, min, max and percentiles per metric (one row per metric)"""
+    frame = as_frame(results)[metrics or AVERAGE_METRICS]
+    stats = frame.agg(['mean', 'median', 'min', 'max']).T
+    if percentiles:
+        quantiles = frame.quantile(list(percentiles)).T
+        quantiles.columns = [f"p{round(q * 100)}" for q in percentiles]
+        stats = stats.join(quantiles)
+    return stats
+
+
+def short_text(column: pd.Series, width: int) -> pd.Series:
+    """Truncate to ``width`` characters with an ellipsis"""
+    return column.where(column.str.len() <= width, column.str.slice(0, width) + '...')
+
+
+def _bootstrap_means(values: np.ndarray, resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Column means of ``resamples`` bootstrap resamples of the rows of
+    ``values`` (resamples x metrics). Each resample is a row of counts of how
+    often every page was drawn, so the means of all of them are one matrix
+    product.
+    """
+    pages = len(values)
+    block = max(1, _BOOTSTRAP_BLOCK // pages)
+    means = []
+    for start in range(0, resamples, block):
+        size = min(block, resamples - start)
+        draws = rng.integers(0, pages, size=(size, pages)) + np.arange(size)[:, None] * pages
+        counts = np.bincount(draws.ravel(), minlength=size * pages).reshape(size, pages)
+        means.append(counts @ values / pages)
+    return np.concatenate(means)
+
+
+def compare_groups(groups: Mapping[str, Union[Sequence[Dict], pd.DataFrame]], metrics: List[str] = None,
+                   baseline: str = None, percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                   resamples: int = DEFAULT_RESAMPLES, confidence: float = DEFAULT_CONFIDENCE,
+                   seed: int = 0) -> pd.DataFrame:
+    """
+    Statistics of every metric for every group, indexed by (group, metric):
+    count, mean, median, min, max and percentiles, then ``delta``, the
+    difference of the group's mean from the ``baseline`` group's (default: the
+    first), with a ``confidence`` bootstrap interval ``delta_low`` to
+    ``delta_high``. The baseline's own deltas, and those of groups without
+    pages, are NaN.
+    """
+    metrics = metrics or AVERAGE_METRICS
+    frames = {name: as_frame(results)[metrics] for name, results in groups.items()}
+    names = list(frames)
+    baseline = baseline if baseline is not None else (names[0] if names else None)
+
+    empty = pd.DataFrame(columns=metrics, dtype=float, index=pd.MultiIndex.from_arrays([[], []], names=['group', None]))
+    combined = pd.concat(frames, names=['group', None]) if names else empty
+    grouped = combined.groupby(level='group', sort=False)
+    columns = {stat: getattr(grouped, stat)() for stat in ('count', 'mean', 'median', 'min', 'max')}
+    columns['count'] = columns['count'].reindex(names, fill_value=0)
+    for q in percentiles:
+        columns[f"p{round(q * 100)}"] = grouped.quantile(q)
+
+    # Every group's resampled means, then their differences from the baseline's
+    rng = np.random.default_rng(seed)
+    boot = {name: _bootstrap_means(frame.to_numpy(dtype=float), resamples, rng)
+            for name, frame in frames.items() if len(frame)}
+    delta = pd.DataFrame(np.nan, index=pd.Index(names, name='group'), columns=metrics)
+    delta_low, delta_high = delta.copy(), delta.copy()
+    if baseline in boot:
+        tail = (1 - confidence) / 2
+        for name in boot:
+            if name == baseline:
+                continue
+            low, high = np.quantile(boot[name] - boot[baseline], [tail, 1 - tail], axis=0)
+            delta.loc[name] = columns['mean'].loc[name] - columns['mean'].loc[baseline]
+            delta_low.loc[name], delta_high.loc[name] = low, high
+    columns.update(delta=delta, delta_low=delta_low, delta_high=delta_high)
+
+    # One row per (group, metric), groups in the order given
+    index = pd.MultiIndex.from_product([names, metrics], names=['group', 'metric'])
+    return pd.DataFrame({stat: table.reindex(index=names, columns=metrics).to_numpy(dtype=float).ravel()
+                         for stat, table in columns.items()}, index=index)
@@ -0,0 +1,255 @@
+"""
+Historical metrics store.
+
+``HistoryStore`` keeps every analyzed page of every run in a local SQLite
+database, one row per page and run with a column per metric, so reruns of the
+same URL sets can be compared over weeks::
+
+    store = HistoryStore()
+    store.record_run(records)
+    store.metric_history('https://example.com/', 'atomic_paragraph_ratio')
+    store.changes('atomic_paragraph_ratio', direction='drop')
+
+The database runs in WAL mode, so the app can read it while a CLI batch
+writes. Pages are indexed by URL and time, domain and time, time alone, and
+run and URL, so the history of one URL, the trend of one domain and the
+comparison of a run with each page's previous observation are index lookups
+that stay fast at millions of rows.
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from .archive import new_run_id, record_domain
+from .frame import METRIC_SCHEMA, results_frame
+
+DEFAULT_HISTORY_PATH = os.environ.get(
+    'WEBINTEL_HISTORY_DB', os.path.join(os.path.expanduser('~'), '.local', 'share', 'webintel', 'history.sqlite3')
+)
+CHANGE_DIRECTIONS = ('drop', 'rise', 'any')
+
+METRIC_NAMES = [metric.name for metric in METRIC_SCHEMA]
+_SQL_TYPES = {'int64': 'INTEGER', 'float64': 'REAL'}
+_PAGE_FIELDS = ['url', 'domain', 'final_url', 'status_code']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL UNIQUE,
+    started_at REAL NOT NULL,
+    label TEXT,
+    pages INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at);
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    analyzed_at REAL NOT NULL,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    final_url TEXT,
+    status_code INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS pages_run_url ON pages (run, url);
+CREATE INDEX IF NOT EXISTS pages_url_time ON pages (url, analyzed_at);
+CREATE INDEX IF NOT EXISTS pages_domain_time ON pages (domain, analyzed_at);
+CREATE INDEX IF NOT EXISTS pages_time ON pages (analyzed_at);
+"""
+
+
+def _check_metric(metric: str) -> str:
+    # Metric names become column names in SQL, so only known ones get through
+    if metric not in METRIC_NAMES:
+        raise ValueError(f"Unknown metric: {metric}")
+    return metric
+
+
+def _timestamp(value: Union[None, float, str, Any]) -> Optional[float]:
+    """Unix seconds from seconds, an ISO date/time or a date/datetime"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    stamp = pd.Timestamp(value)
+    return (stamp if stamp.tzinfo else stamp.tz_localize('UTC')).timestamp()
+
+
+def _with_times(frame: pd.DataFrame, *columns: str) -> pd.DataFrame:
+    for column in columns:
+        frame[column] = pd.to_datetime(frame[column], unit='s', utc=True).dt.floor('s')
+    return frame
+
+
+class HistoryStore:
+    """
+    SQLite database of analysis runs at ``path``.
+
+    ``record_run`` adds the records of one batch under a run id;
+    ``metric_history``, ``domain_trend`` and ``changes`` answer the trend and
+    diff questions as DataFrames. Metrics added to ``METRIC_SCHEMA`` later
+    become new columns, empty for older runs.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            # WAL is a property of the database file, set once
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(_SCHEMA)
+            existing = {row[1] for row in db.execute('PRAGMA table_info(pages)')}
+            for metric in METRIC_SCHEMA:
+                if metric.name not in existing:
+                    db.execute(f'ALTER TABLE pages ADD COLUMN {metric.name} {_SQL_TYPES[metric.dtype]}')
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call, so any thread may use the store
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.execute('PRAGMA foreign_keys=ON')
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+        with self._connect() as db:
+            return pd.read_sql_query(sql, db, params=list(params))
+
+    def record_run(self, records: Sequence[Dict[str, Any]], run_id: str = None, label: str = None,
+                   analyzed_at: Union[float, str] = None, append: bool = False) -> str:
+        """
+        Add the analysis records of one run in a single transaction; returns
+        the run id. With ``append`` the records join ``run_id`` if it is
+        already recorded, so a long run can be stored in batches as it goes.
+        """
+        records = [record for record in records if record.get('url')]
+        run_id = run_id or new_run_id()
+        started_at = _timestamp(analyzed_at) or time.time()
+
+        frame = results_frame(records)
+        columns = [
+            [started_at] * len(records),
+            frame['url'].tolist(),
+            [record_domain(record) for record in records],
+            [record.get('final_url') for record in records],
+            [record.get('status_code') for record in records],
+        ]
+        # Metrics a run did not select stay NULL rather than taking the frame's default
+        columns += [[value if name in record else None for value, record in zip(frame[name].tolist(), records)]
+                    for name in METRIC_NAMES]
+        names = ['analyzed_at'] + _PAGE_FIELDS + METRIC_NAMES
+
+        with self._connect() as db:
+            existing = db.execute('SELECT id FROM runs WHERE run_id = ?', (run_id,)).fetchone() if append else None
+            if existing:
+                run = existing[0]
+            else:
+                run = db.execute('INSERT INTO runs (run_id, started_at, label, pages) VALUES (?, ?, ?, ?)',
+                                 (run_id, started_at, label, 0)).lastrowid
+            # A URL listed twice in one run keeps its last result
+            db.executemany(
+                f"INSERT OR REPLACE INTO pages (run, {', '.join(names)}) VALUES (?{', ?' * len(names)})",
+                ((run,) + row for row in zip(*columns))
+            )
+            db.execute('UPDATE runs SET pages = (SELECT count(*) FROM pages WHERE run = ?) WHERE id = ?', (run, run))
+        return run_id
+
+    def runs(self, limit: int = None) -> pd.DataFrame:
+        """Recorded runs, newest first: run id, start time, label and pages"""
+        sql = 'SELECT run_id, started_at, label, pages FROM runs ORDER BY started_at DESC'
+        frame = self._query(sql + (' LIMIT ?' if limit else ''), [limit] if limit else [])
+        return _with_times(frame, 'started_at')
+
+    def delete_run(self, run_id: str):
+        with self._connect() as db:
+            db.execute('DELETE FROM runs WHERE run_id = ?', (run_id,))
+
+    def domains(self) -> List[str]:
+        with self._connect() as db:
+            return [row[0] for row in db.execute('SELECT DISTINCT domain FROM pages ORDER BY domain')]
+
+    def urls(self, domain: str = None, limit: int = None) -> List[str]:
+        """URLs with any history, optionally of one domain"""
+        sql, params = 'SELECT DISTINCT url FROM pages', []
+        if domain:
+            sql, params = sql + ' WHERE domain = ?', [domain]
+        if limit:
+            sql, params = sql + ' LIMIT ?', params + [limit]
+        with self._connect() as db:
+            return sorted(row[0] for row in db.execute(sql, params))
+
+    def metric_history(self, url: str, metrics: Union[str, Sequence[str]], since=None, until=None) -> pd.DataFrame:
+        """One row per run that saw ``url``, oldest first, with the chosen metrics"""
+        metrics = [metrics] if isinstance(metrics, str) else list(metrics)
+        selected = ', '.join(f'p.{_check_metric(metric)}' for metric in metrics)
+        sql = (f'SELECT r.run_id, p.analyzed_at, p.status_code, {selected} '
+               'FROM pages p JOIN runs r ON r.id = p.run WHERE p.url = ?')
+        sql, params = self._time_range(sql, [url], since, until)
+        return _with_times(self._query(sql + ' ORDER BY p.analyzed_at', params), 'analyzed_at')
+
+    def domain_trend(self, domain: str, metric: str, since=None, until=None) -> pd.DataFrame:
+        """Per run: pages seen on ``domain`` and the mean, min and max of ``metric``"""
+        metric = _check_metric(metric)
+        sql = (f'SELECT r.run_id, p.analyzed_at, count(*) AS pages, avg(p.{metric}) AS mean, '
+               f'min(p.{metric}) AS min, max(p.{metric}) AS max '
+               'FROM pages p JOIN runs r ON r.id = p.run WHERE p.domain = ?')
+        sql, params = self._time_range(sql, [domain], since, until)
+        return _with_times(self._query(sql + ' GROUP BY p.run ORDER BY p.analyzed_at', params), 'analyzed_at')
+
+    @staticmethod
+    def _time_range(sql: str, params: List[Any], since, until):
+        if since is not None:
+            sql, params = sql + ' AND p.analyzed_at >= ?', params + [_timestamp(since)]
+        if until is not None:
+            sql, params = sql + ' AND p.analyzed_at <= ?', params + [_timestamp(until)]
+        return sql, params
+
+    def changes(self, metric: str, run_id: str = None, against: str = None, direction: str = 'drop',
+                min_change: float = 0, limit: int = None) -> pd.DataFrame:
+        """
+        Pages of ``run_id`` (default: the latest run) whose ``metric`` moved by
+        more than ``min_change`` in ``direction`` ('drop', 'rise' or 'any').
+        Each page is compared with its own previous observation, or with run
+        ``against`` when given. Biggest changes first.
+        """
+        metric = _check_metric(metric)
+        if direction not in CHANGE_DIRECTIONS:
+            raise ValueError(f"Unknown direction: {direction}")
+        with self._connect() as db:
+            row = db.execute('SELECT id FROM runs WHERE run_id = ?' if run_id else
+                             'SELECT id FROM runs ORDER BY started_at DESC LIMIT 1', [run_id] if run_id else []).fetchone()
+            previous = db.execute('SELECT id FROM runs WHERE run_id = ?', [against]).fetchone() if against else None
+        if row is None or (against and previous is None):
+            raise KeyError(f"No recorded run {run_id if row is None else against}")
+
+        if previous:
+            join, params = 'prev.run = ? AND prev.url = cur.url', [previous[0]]
+        else:
+            # Latest earlier row of the same URL, found through the (url, analyzed_at) index
+            join, params = ('prev.id = (SELECT id FROM pages WHERE url = cur.url AND analyzed_at < cur.analyzed_at '
+                            'ORDER BY analyzed_at DESC LIMIT 1)'), []
+        condition, order = {
+            'drop': ('change < ?', 'change'),
+            'rise': ('change > ?', 'change DESC'),
+            'any': ('abs(change) > ?', 'abs(change) DESC'),
+        }[direction]
+        sql = (f'SELECT cur.url, prev_run.run_id AS previous_run, prev.{metric} AS previous, cur.{metric} AS current, '
+               f'cur.{metric} - prev.{metric} AS change '
+               f'FROM pages cur JOIN pages prev ON {join} JOIN runs prev_run ON prev_run.id = prev.run '
+               f'WHERE cur.run = ? AND {condition} ORDER BY {order}')
+        params += [row[0], -min_change if direction == 'drop' else min_change]
+        if limit:
+            sql, params = sql + ' LIMIT ?', params + [limit]
+        return self._query(sql, params)
+
+
+def format_changes(changes: pd.DataFrame, metric: str) -> str:
+    """Plain-text table of ``HistoryStore.changes`` for the command line"""
+    if changes.empty:
+        return f"No pages changed in {metric}"
+    return changes.to_string(index=False, float_format=lambda value: f'{value:.3f}')
@@ -0,0 +1,117 @@
+"""
+Incremental re-analysis.
+
+``PageSnapshots`` remembers, for every URL, the fingerprint of the page it
+last analyzed and the analysis itself. Handed to an ``AnalysisPipeline``, it
+lets a rerun of the same URL list skip every page whose bytes, final URL and
+analyzer version are unchanged since the previous run: the stored metrics are
+reused and only changed or new pages are analyzed. Snapshots live in a table
+of the history database by default, next to the run history.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+from .analyzer import ANALYZER_VERSION
+from .body import text_digest
+from .history import DEFAULT_HISTORY_PATH
+
+# Snapshot writes are committed in batches of this many pages
+FLUSH_EVERY = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    url TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    final_url TEXT NOT NULL,
+    version TEXT NOT NULL,
+    analyzed_at REAL NOT NULL,
+    seconds REAL NOT NULL,
+    analysis BLOB NOT NULL
+)
+"""
+
+
+def page_fingerprint(html: str) -> str:
+    """Content hash of a fetched document"""
+    return text_digest(hashlib.blake2b(digest_size=16), html, 'surrogatepass')
+
+
+class PageSnapshots:
+    """
+    Last analysis of every URL, keyed by URL, in the SQLite database at ``path``.
+
+    ``lookup`` returns the stored analysis when the page is unchanged and
+    counts the page as unchanged, changed or new; ``store`` records a fresh
+    analysis with the time it took, which is what a later skip saves. Writes
+    are batched, so call ``flush`` (the pipeline does) when a run ends.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, version: str = ANALYZER_VERSION):
+        self.path = path
+        self.version = version
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # The pipeline uses it from its event loop thread, which need not be the creating one
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        self._pending = []
+        self.stats = {'unchanged': 0, 'changed': 0, 'new': 0, 'seconds_saved': 0.0, 'seconds_spent': 0.0}
+
+    def lookup(self, url: str, fingerprint: str, final_url: str) -> Optional[Dict[str, Any]]:
+        """The previous analysis of ``url`` if the page is the same, else None"""
+        row = self._db.execute(
+            'SELECT fingerprint, final_url, version, seconds, analysis FROM snapshots WHERE url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            self.stats['new'] += 1
+            return None
+        if row[:3] != (fingerprint, final_url, self.version):
+            self.stats['changed'] += 1
+            return None
+        self.stats['unchanged'] += 1
+        self.stats['seconds_saved'] += row[3]
+        return pickle.loads(row[4])
+
+    def store(self, url: str, fingerprint: str, final_url: str, analysis: Dict[str, Any], seconds: float):
+        self.stats['seconds_spent'] += seconds
+        self._pending.append((url, fingerprint, final_url, self.version, time.time(), seconds,
+                              pickle.dumps(analysis, protocol=pickle.HIGHEST_PROTOCOL)))
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            with self._db:
+                self._db.executemany('INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)', self._pending)
+            self._pending = []
+
+    def prune(self, older_than: float):
+        """Forget URLs not analyzed in the last ``older_than`` seconds"""
+        with self._db:
+            self._db.execute('DELETE FROM snapshots WHERE analyzed_at < ?', (time.time() - older_than,))
+
+    def clear(self):
+        self._pending = []
+        with self._db:
+            self._db.execute('DELETE FROM snapshots')
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute('SELECT count(*) FROM snapshots').fetchone()[0]
+
+
+def format_incremental_stats(stats: Dict[str, float]) -> str:
+    """One-line run summary: pages skipped and analysis time saved"""
+    total = stats['unchanged'] + stats['changed'] + stats['new']
+    return (f"Incremental: {stats['unchanged']} of {total} pages unchanged and skipped, "
+            f"{stats['changed']} changed, {stats['new']} new; "
+            f"{stats['seconds_saved']:.1f}s of analysis saved, {stats['seconds_spent']:.1f}s spent")
@@ -0,0 +1,204 @@
+"""
+Fetch and analysis stages for URL batches.
+
+Fetching is I/O-bound and runs on the ``AsyncFetcher`` event loop; analysis is
+CPU-bound and runs in a ``ProcessPoolExecutor``. The stages are joined by a
+bounded queue, so the next pages download while earlier ones are parsed and a
+slow analysis stage holds the fetchers back instead of piling up documents.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .analyzer import DEFAULT_TIME_BUDGET, HTMLAnalyzer, analysis_version
+from .cache import AnalysisCache
+from .fetcher import AsyncFetcher
+from .incremental import PageSnapshots, page_fingerprint
+from .signatures import SignatureDB
+
+# Analyzer of the current worker process, created by _init_worker
+_worker_analyzer = None
+
+
+def _init_worker(instrument: bool = False, time_budget: float = DEFAULT_TIME_BUDGET, metrics: List[str] = None,
+                 signatures: SignatureDB = None):
+    global _worker_analyzer
+    _worker_analyzer = HTMLAnalyzer(instrument=instrument, time_budget=time_budget, metrics=metrics,
+                                    signatures=signatures)
+
+
+def _analyze_document(html: str, final_url: str) -> Dict[str, Any]:
+    """Worker entry point; only the document and final URL cross the process boundary"""
+    return _worker_analyzer.analyze_html_structure(html, {'url': final_url})
+
+
+def analysis_record(url: str, fetch_result: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Attach fetch details to an analysis, as shown in the results tables"""
+    analysis['url'] = url
+    analysis['status_code'] = fetch_result['status_code']
+    analysis['method'] = fetch_result['method']
+    analysis['final_url'] = fetch_result['url']
+    return analysis
+
+
+class AnalysisPipeline:
+    """
+    Fetch URLs and analyze each page as it arrives.
+
+    ``workers`` analysis processes (default: one per core) take documents
+    from a queue of at most ``queue_size`` fetched pages. With ``workers=0``
+    pages are analyzed on the event loop thread instead, which suits
+    debugging and single-core boxes. With ``instrument`` every record carries
+    per-analyzer ``timings`` (see ``webintel.profiling``). With ``snapshots``
+    pages unchanged since the previous run reuse their stored analysis. A page
+    still being analyzed after ``time_budget`` seconds gets the metrics of
+    the part read so far, flagged ``truncated``. With ``metrics`` only the
+    analyzers behind those metrics (or metric groups) run; snapshots for such
+    a run should be opened with ``version=analysis_version(metrics)``.
+    ``signatures`` replaces the default technology signature database.
+    """
+
+    def __init__(self, fetcher: AsyncFetcher, workers: int = None, queue_size: int = None,
+                 analysis_cache: AnalysisCache = None, instrument: bool = False,
+                 snapshots: PageSnapshots = None, time_budget: Optional[float] = DEFAULT_TIME_BUDGET,
+                 metrics: Iterable[str] = None, signatures: SignatureDB = None):
+        self.fetcher = fetcher
+        self.workers = (os.cpu_count() or 1) if workers is None else max(0, workers)
+        self.queue_size = queue_size or max(2, 2 * self.workers)
+        self.analysis_cache = analysis_cache
+        self.instrument = instrument
+        self.snapshots = snapshots
+        self.time_budget = time_budget
+        self.metrics = list(metrics) if metrics is not None else None
+        self.signatures = signatures
+        self.version = analysis_version(self.metrics, signatures)
+        self._inline_analyzer = None
+
+    def run(self, urls: List[str], on_result: Callable[[int, str, Dict[str, Any], Optional[Dict[str, Any]]], None] = None) -> List[Optional[Dict[str, Any]]]:
+        """Blocking wrapper around ``process`` for callers without an event loop"""
+        return asyncio.run(self.process(urls, on_result))
+
+    def run_stream(self, urls: Iterable[str], on_result: Callable[[int, str, Dict[str, Any], Optional[Dict[str, Any]]], None]):
+        """Blocking wrapper around ``stream`` for callers without an event loop"""
+        asyncio.run(self.stream(urls, on_result))
+
+    async def process(self, urls: List[str], on_result: Callable[[int, str, Dict[str, Any], Optional[Dict[str, Any]]], None] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Run the batch and return the analysis records in input order, None for
+        pages that could not be fetched or analyzed.
+
+        ``on_result(index, url, fetch_result, record)`` is called on the event
+        loop thread as each page finishes; ``record`` is None on failure and
+        ``fetch_result['error']`` says why.
+        """
+        records: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+
+        def collect(index: int, url: str, fetch_result: Dict[str, Any], record: Optional[Dict[str, Any]]):
+            records[index] = record
+            if on_result:
+                on_result(index, url, fetch_result, record)
+
+        await self.stream(urls, collect)
+        return records
+
+    async def stream(self, urls: Iterable[str], on_result: Callable[[int, str, Dict[str, Any], Optional[Dict[str, Any]]], None]):
+        """
+        Like ``process`` but without keeping the records: each one is only
+        handed to ``on_result``, so memory does not grow with the list
+        """
+        executor = None
+        if self.workers:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                           initargs=(self.instrument, self.time_budget, self.metrics, self.signatures))
+        try:
+            await self._run_stages(urls, executor, on_result)
+        finally:
+            if self.snapshots is not None:
+                self.snapshots.flush()
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _run_stages(self, urls: Iterable[str], executor: Optional[ProcessPoolExecutor], finish: Callable):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def fetched(index: int, url: str, fetch_result: Dict[str, Any]):
+            if not fetch_result['success']:
+                finish(index, url, fetch_result, None)
+                return
+            # Blocks this fetch while the queue is full
+            await queue.put((index, url, fetch_result))
+
+        async def analyze_stage():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, url, fetch_result = item
+                try:
+                    analysis = await self._analyze(executor, url, fetch_result)
+                except Exception as e:
+                    fetch_result = {'success': False, 'error': f"Analysis failed: {str(e)}", 'url': fetch_result['url']}
+                    finish(index, url, fetch_result, None)
+                    continue
+                finish(index, url, fetch_result, analysis_record(url, fetch_result, analysis))
+
+        consumers = [asyncio.ensure_future(analyze_stage()) for _ in range(max(1, self.workers))]
+
+        async def fetch_stage():
+            await self.fetcher.stream(urls, fetched)
+            for _ in consumers:
+                await queue.put(None)
+
+        # A failed consumer (``finish`` raising) would leave the fetchers
+        # blocked on a full queue; whichever stage fails first ends the run
+        stages = [asyncio.ensure_future(fetch_stage())] + consumers
+        try:
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for stage in done:
+                if stage.exception() is not None:
+                    raise stage.exception()
+        finally:
+            for stage in stages:
+                stage.cancel()
+            # Let cancelled fetches release their connections before the pool closes
+            await asyncio.gather(*stages, return_exceptions=True)
+
+    async def _analyze(self, executor: Optional[ProcessPoolExecutor], url: str, fetch_result: Dict[str, Any]) -> Dict[str, Any]:
+        html, final_url = fetch_result['html'], fetch_result['url']
+
+        fingerprint = None
+        if self.snapshots is not None and not self.instrument:
+            fingerprint = page_fingerprint(html)
+            analysis = self.snapshots.lookup(url, fingerprint, final_url)
+            if analysis is not None:
+                return analysis
+
+        key = None
+        # Memoized results would report the timings of an earlier run; snapshots
+        # need the real analysis time of every page they store
+        if self.analysis_cache is not None and not self.instrument and fingerprint is None:
+            key = self.analysis_cache.key(html, final_url, self.version)
+            analysis = self.analysis_cache.get(key)
+            if analysis is not None:
+                return analysis
+
+        started = time.perf_counter()
+        if executor is None:
+            if self._inline_analyzer is None:
+                self._inline_analyzer = HTMLAnalyzer(instrument=self.instrument, time_budget=self.time_budget,
+                                                     metrics=self.metrics, signatures=self.signatures)
+            analysis = self._inline_analyzer.analyze_html_structure(html, {'url': final_url})
+        else:
+            loop = asyncio.get_running_loop()
+            analysis = await loop.run_in_executor(executor, _analyze_document, html, final_url)
+
+        # Partial metrics are not worth reusing
+        if analysis.get('truncated'):
+            return analysis
+        if key is not None:
+            self.analysis_cache.put(key, analysis)
+        if fingerprint is not None:
+            self.snapshots.store(url, fingerprint, final_url, analysis, time.perf_counter() - started)
+        return analysis
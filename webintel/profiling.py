@@ -0,0 +1,166 @@
+"""
+Opt-in instrumentation of the analysis engine.
+
+With ``HTMLAnalyzer(instrument=True)`` every analysis carries a ``timings``
+entry: wall time, CPU time and input size per analyzer stage. ``BatchProfile``
+aggregates those across a batch into the slowest analyzers and pages, and
+keeps the slowest documents so they can be re-run under cProfile and
+tracemalloc afterwards.
+"""
+import contextlib
+import cProfile
+import heapq
+import io
+import pstats
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+_NO_STAGE = contextlib.nullcontext()
+
+
+class AnalysisTimer:
+    """Collects per-stage timings of one analysis; does nothing when disabled"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+
+    def stage(self, name: str, input_size: int):
+        """Context manager timing one analyzer call"""
+        if not self.enabled:
+            return _NO_STAGE
+        return self._timed(name, input_size)
+
+    @contextlib.contextmanager
+    def _timed(self, name: str, input_size: int):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.stages.append({
+                'analyzer': name,
+                'wall_ms': (time.perf_counter() - wall) * 1000,
+                'cpu_ms': (time.process_time() - cpu) * 1000,
+                'input_size': input_size,
+            })
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'wall_ms': (time.perf_counter() - self._started) * 1000,
+            'cpu_ms': (time.process_time() - self._cpu_started) * 1000,
+            'stages': self.stages,
+        }
+
+
+class BatchProfile:
+    """
+    Aggregates ``timings`` of analysis records across a batch.
+
+    With ``keep_slowest`` the documents of that many slowest pages are kept
+    (and only those) for ``profile_slowest``.
+    """
+
+    def __init__(self, keep_slowest: int = 0):
+        self.keep_slowest = keep_slowest
+        self.pages: List[Dict[str, Any]] = []
+        self.analyzers: Dict[str, Dict[str, float]] = {}
+        # Min-heap of (wall_ms, sequence, url, html) holding the slowest documents
+        self._slowest: List[Tuple[float, int, str, str]] = []
+
+    def add(self, url: str, record: Dict[str, Any], html: str = None):
+        timings = record.get('timings') if record else None
+        if not timings:
+            return
+        self.pages.append({
+            'url': url,
+            'wall_ms': timings['wall_ms'],
+            'cpu_ms': timings['cpu_ms'],
+            'input_size': record.get('total_length', 0),
+        })
+        for stage in timings['stages']:
+            totals = self.analyzers.setdefault(stage['analyzer'], {'calls': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0, 'max_wall_ms': 0.0})
+            totals['calls'] += 1
+            totals['wall_ms'] += stage['wall_ms']
+            totals['cpu_ms'] += stage['cpu_ms']
+            totals['max_wall_ms'] = max(totals['max_wall_ms'], stage['wall_ms'])
+
+        if self.keep_slowest and html is not None:
+            entry = (timings['wall_ms'], len(self.pages), url, html)
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif entry[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest_analyzers(self, limit: int = None) -> List[Dict[str, Any]]:
+        """Analyzers by total wall time across the batch"""
+        rows = [
+            {
+                'analyzer': name,
+                'calls': totals['calls'],
+                'total_wall_ms': totals['wall_ms'],
+                'total_cpu_ms': totals['cpu_ms'],
+                'mean_wall_ms': totals['wall_ms'] / totals['calls'],
+                'max_wall_ms': totals['max_wall_ms'],
+            }
+            for name, totals in self.analyzers.items()
+        ]
+        rows.sort(key=lambda row: row['total_wall_ms'], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def slowest_pages(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Pages by analysis wall time"""
+        return sorted(self.pages, key=lambda page: page['wall_ms'], reverse=True)[:limit]
+
+    def profile_slowest(self, analyzer, top: int = 25) -> List[Dict[str, Any]]:
+        """``profile_document`` for each kept document, slowest first"""
+        return [profile_document(analyzer, html, url, top)
+                for _, _, url, html in sorted(self._slowest, reverse=True)]
+
+    def format_report(self, limit: int = 10) -> str:
+        lines = [f"Slowest analyzers ({len(self.pages)} pages):"]
+        for row in self.slowest_analyzers(limit):
+            lines.append(f"  {row['analyzer']:<22} total {row['total_wall_ms']:>10.1f} ms  "
+                         f"mean {row['mean_wall_ms']:>8.2f} ms  max {row['max_wall_ms']:>8.1f} ms")
+        lines.append("Slowest pages:")
+        for page in self.slowest_pages(limit):
+            lines.append(f"  {page['wall_ms']:>10.1f} ms  {page['input_size'] / 1024:>8.0f} KB  {page['url']}")
+        return '\n'.join(lines)
+
+
+def profile_document(analyzer, html: str, url: str, top: int = 25) -> Dict[str, Any]:
+    """
+    Analyze one document under cProfile, then again under tracemalloc.
+
+    Returns the ``top`` functions by cumulative time as pstats text, the peak
+    traced memory and the ``top`` allocation sites.
+    """
+    # Start cold so the shared scan is part of the profile
+    analyzer._last_scan = None
+    profiler = cProfile.Profile()
+    profiler.runcall(analyzer._analyze_structure, html, url)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+
+    analyzer._last_scan = None
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        analyzer._analyze_structure(html, url)
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+    analyzer._last_scan = None
+
+    allocations = [
+        {'location': str(stat.traceback), 'size_kb': stat.size / 1024, 'count': stat.count}
+        for stat in snapshot.statistics('lineno')[:top]
+    ]
+    return {'url': url, 'input_size': len(html), 'cpu_profile': out.getvalue(),
+            'peak_memory_kb': peak / 1024, 'top_allocations': allocations}
@@ -0,0 +1,168 @@
+"""
+Per-host politeness.
+
+Each host gets a token bucket refilled at ``rate`` requests per second, plus a
+little random jitter per request so the timing does not look mechanical.
+Requests to different hosts never wait for each other. Optionally a host's
+``robots.txt`` Crawl-delay slows its bucket down further.
+"""
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 2
+DEFAULT_JITTER = 0.5
+
+# Never let a robots.txt stall a batch for longer than this per request
+MAX_CRAWL_DELAY = 30.0
+
+
+class TokenBucket:
+    """
+    ``rate`` tokens per second, holding at most ``capacity``.
+
+    ``reserve`` takes a token right away and returns how long the caller must
+    wait before using it, so concurrent callers queue up fairly without
+    holding a lock while they sleep.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            # A negative balance is the queue of callers ahead of the next refill
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+def robots_url(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+
+
+def parse_crawl_delay(robots_txt: str, user_agent: str = '*') -> Optional[float]:
+    """
+    Crawl-delay for ``user_agent`` (falling back to '*'), or None.
+
+    Parsed by hand because ``urllib.robotparser`` only accepts whole seconds.
+    """
+    delays: Dict[str, float] = {}
+    agents = []
+    in_rules = False
+    for line in robots_txt.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        field, value = (part.strip() for part in line.split(':', 1))
+        field = field.lower()
+        if field == 'user-agent':
+            # A user-agent line after rules starts a new group
+            if in_rules:
+                agents, in_rules = [], False
+            agents.append(value.lower())
+            continue
+        in_rules = True
+        if field == 'crawl-delay':
+            try:
+                delay = float(value)
+            except ValueError:
+                continue
+            for agent in agents:
+                delays.setdefault(agent, delay)
+
+    delay = delays.get(user_agent.lower())
+    return delay if delay is not None else delays.get('*')
+
+
+class HostRateLimiter:
+    """
+    Token bucket per host with jitter and optional robots.txt Crawl-delay.
+
+    ``wait`` (async) and ``wait_sync`` block until a request to the URL's host
+    may go out. With ``crawl_delay`` enabled, the first request to a host
+    loads its robots.txt through the given loader and the host's rate drops
+    to one request per Crawl-delay seconds if that is slower.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: float = DEFAULT_BURST,
+                 jitter: float = DEFAULT_JITTER, crawl_delay: bool = False):
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self.crawl_delay = crawl_delay
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Hosts whose robots.txt has been looked at, and lookups in flight
+        self._robots_checked = set()
+        self._robots_pending: Dict[str, asyncio.Future] = {}
+        self._robots_lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets.setdefault(host, TokenBucket(self.rate, self.burst))
+        return bucket
+
+    def apply_crawl_delay(self, host: str, delay: Optional[float]):
+        """Slow a host down to one request per ``delay`` seconds"""
+        if not delay or delay <= 0:
+            return
+        rate = 1.0 / min(delay, MAX_CRAWL_DELAY)
+        bucket = self.bucket(host)
+        if rate < bucket.rate:
+            bucket.rate = rate
+            bucket.capacity = 1.0
+            bucket.tokens = min(bucket.tokens, 1.0)
+
+    def _delay_for(self, host: str) -> float:
+        delay = self.bucket(host).reserve()
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        return delay
+
+    async def wait(self, url: str, load_robots: Callable[[str], Awaitable[Optional[str]]] = None):
+        """Wait for the URL's host; ``load_robots(robots_url)`` returns robots.txt text or None"""
+        host = urlparse(url).netloc.lower()
+        if self.crawl_delay and load_robots is not None and host not in self._robots_checked:
+            pending = self._robots_pending.get(host)
+            if pending is None:
+                # One robots.txt request per host; concurrent callers wait for it
+                pending = self._robots_pending[host] = asyncio.ensure_future(self._load_crawl_delay(host, url, load_robots))
+            await asyncio.shield(pending)
+        await asyncio.sleep(self._delay_for(host))
+
+    async def _load_crawl_delay(self, host: str, url: str, load_robots):
+        try:
+            robots_txt = await load_robots(robots_url(url))
+        except Exception:
+            robots_txt = None
+        if robots_txt:
+            self.apply_crawl_delay(host, parse_crawl_delay(robots_txt))
+        self._robots_checked.add(host)
+        self._robots_pending.pop(host, None)
+
+    def wait_sync(self, url: str, load_robots: Callable[[str], Optional[str]] = None):
+        """Blocking version of ``wait``"""
+        host = urlparse(url).netloc.lower()
+        if self.crawl_delay and load_robots is not None:
+            with self._robots_lock:
+                if host not in self._robots_checked:
+                    self._robots_checked.add(host)
+                    try:
+                        robots_txt = load_robots(robots_url(url))
+                    except Exception:
+                        robots_txt = None
+                    if robots_txt:
+                        self.apply_crawl_delay(host, parse_crawl_delay(robots_txt))
+        time.sleep(self._delay_for(host))
@@ -0,0 +1,148 @@
+"""
+Analyzer registry.
+
+Every analyzer behind ``HTMLAnalyzer.analyze_html_structure`` is declared
+here once: the method that runs it, the analysis inputs it takes, the metrics
+it produces and what it builds on. A dependency is either an intermediate
+shared by several analyzers, computed once per document, or another analyzer
+whose metrics it reads:
+
+- ``scan``: the single ``DocumentScan`` walk that counts tags and collects
+  paragraphs, headings, script bodies, tables and lists for everyone;
+- ``early_text``: the start of the visible text, read after the walk.
+
+``plan_analysis`` turns a metric selection into the intermediates and
+analyzers to run, in order, so a caller that only wants some metrics (the
+CLI's ``--metrics``, the app's metric groups) only pays for those.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+
+class Intermediate(NamedTuple):
+    name: str
+    # HTMLAnalyzer method computing it from the analysis inputs
+    method: str
+    needs: Tuple[str, ...] = ()
+
+
+class AnalyzerSpec(NamedTuple):
+    # Stage name in timings
+    name: str
+    # HTMLAnalyzer method and the analysis inputs passed to it: 'document'
+    # (the whole page), 'html' (the part scanned in time), 'url' and
+    # 'analysis' (the metrics so far)
+    method: str
+    args: Tuple[str, ...]
+    # Keys it adds to the analysis; a method returning a single value fills the only one
+    metrics: Tuple[str, ...]
+    # Intermediates and analyzers it reads
+    needs: Tuple[str, ...] = ()
+
+
+INTERMEDIATES: List[Intermediate] = [
+    Intermediate('scan', '_compute_scan'),
+    Intermediate('early_text', '_compute_early_text', ('scan',)),
+]
+
+# In run order: an analyzer comes after the analyzers it needs
+ANALYZERS: List[AnalyzerSpec] = [
+    AnalyzerSpec('page_size', 'analyze_page_size', ('document',), ('total_length', 'total_lines')),
+    AnalyzerSpec('basic_metrics', 'analyze_basic_metrics', ('html',), (
+        'total_tags', 'unique_tags', 'most_common_tags', 'semantic_tags_used', 'meta_tags_count',
+        'external_css', 'external_js', 'inline_css', 'inline_js', 'images_count', 'forms_count',
+    ), ('scan',)),
+    AnalyzerSpec('detect_frameworks', 'detect_frameworks', ('html',), ('frameworks_detected', 'framework_confidence')),
+    AnalyzerSpec('performance_insights', 'get_performance_insights', ('analysis',), ('performance_insights',),
+                 ('page_size', 'basic_metrics')),
+    AnalyzerSpec('html_tables', 'analyze_html_tables', ('html',),
+                 ('tables_count', 'avg_rows_per_table', 'table_data_density'), ('scan',)),
+    AnalyzerSpec('atomic_paragraphs', 'analyze_atomic_paragraphs', ('html',),
+                 ('paragraphs_count', 'avg_paragraph_length', 'atomic_paragraph_ratio'), ('scan',)),
+    AnalyzerSpec('year_inclusion', 'analyze_year_inclusion', ('html', 'url'),
+                 ('url_year_inclusion', 'title_year_inclusion', 'meta_year_inclusion', 'early_content_year_inclusion'),
+                 ('scan', 'early_text')),
+    AnalyzerSpec('bulleted_lists', 'analyze_bulleted_lists', ('html',),
+                 ('lists_count', 'avg_items_per_list', 'list_coverage_ratio'), ('scan',)),
+    AnalyzerSpec('semantic_urls', 'analyze_semantic_urls', ('url', 'html'),
+                 ('url_token_count', 'keyword_presence_ratio', 'stopword_ratio'), ('scan',)),
+    AnalyzerSpec('subfolder_structure', 'analyze_subfolder_structure', ('url', 'html'),
+                 ('subfolder_page_ratio', 'url_depth', 'deep_link_density', 'most_common_subfolder')),
+    AnalyzerSpec('html_vs_js', 'analyze_html_vs_js', ('html',),
+                 ('html_js_byte_ratio', 'script_tag_density', 'external_js_count', 'inline_js_size'), ('scan',)),
+    AnalyzerSpec('schema_markup', 'analyze_schema_markup', ('html',),
+                 ('schema_blocks_count', 'jsonld_blocks_count', 'schema_types', 'schema_type_count'), ('scan',)),
+    AnalyzerSpec('h_tags', 'analyze_h_tags', ('html',), ('h2_count', 'h3_count', 'heading_coverage_ratio'), ('scan',)),
+]
+
+# Set by the engine on every analysis, whatever was selected
+ALWAYS_METRICS = ('truncated',)
+
+# Named metric selections, one per theme of the results view
+METRIC_GROUPS: Dict[str, Tuple[str, ...]] = {
+    'structure': ANALYZERS[0].metrics + ANALYZERS[1].metrics + ('performance_insights',),
+    'content': ('paragraphs_count', 'avg_paragraph_length', 'atomic_paragraph_ratio',
+                'h2_count', 'h3_count', 'heading_coverage_ratio'),
+    'freshness': ('url_year_inclusion', 'title_year_inclusion', 'meta_year_inclusion', 'early_content_year_inclusion'),
+    'tables_lists': ('tables_count', 'avg_rows_per_table', 'table_data_density',
+                     'lists_count', 'avg_items_per_list', 'list_coverage_ratio'),
+    'urls': ('url_token_count', 'keyword_presence_ratio', 'stopword_ratio',
+             'subfolder_page_ratio', 'url_depth', 'deep_link_density', 'most_common_subfolder'),
+    'javascript': ('html_js_byte_ratio', 'script_tag_density', 'external_js_count', 'inline_js_size'),
+    'frameworks_schema': ('frameworks_detected', 'framework_confidence', 'schema_blocks_count', 'jsonld_blocks_count',
+                          'schema_types', 'schema_type_count'),
+}
+
+_STEPS: Dict[str, Union[Intermediate, AnalyzerSpec]] = {step.name: step for step in INTERMEDIATES + ANALYZERS}
+_PRODUCERS: Dict[str, AnalyzerSpec] = {metric: spec for spec in ANALYZERS for metric in spec.metrics}
+
+ALL_METRICS: Tuple[str, ...] = tuple(_PRODUCERS) + ALWAYS_METRICS
+
+
+def expand_metrics(selection: Iterable[str]) -> List[str]:
+    """Metric names for a mix of metric and group names, in first-seen order"""
+    metrics = []
+    for name in selection:
+        if name in METRIC_GROUPS:
+            metrics.extend(METRIC_GROUPS[name])
+        elif name in ALL_METRICS:
+            metrics.append(name)
+        else:
+            raise ValueError(f"Unknown metric or metric group: {name}")
+    return list(dict.fromkeys(metrics))
+
+
+def plan_analysis(metrics: Optional[Iterable[str]] = None) -> List[Union[Intermediate, AnalyzerSpec]]:
+    """
+    Intermediates and analyzers that produce ``metrics`` (None for all of
+    them), with everything they need, in run order. Each intermediate comes
+    right before the first analyzer that reads it.
+    """
+    if metrics is None:
+        wanted = [spec.name for spec in ANALYZERS]
+    else:
+        wanted = [_PRODUCERS[metric].name for metric in expand_metrics(metrics) if metric not in ALWAYS_METRICS]
+
+    # Close over dependencies
+    selected = set()
+    pending = list(wanted)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(_STEPS[name].needs)
+
+    plan = []
+    planned = set()
+
+    def add(name: str):
+        if name in planned:
+            return
+        for need in _STEPS[name].needs:
+            add(need)
+        planned.add(name)
+        plan.append(_STEPS[name])
+
+    for spec in ANALYZERS:
+        if spec.name in selected:
+            add(spec.name)
+    return plan
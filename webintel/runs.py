@@ -0,0 +1,106 @@
+"""
+Finished batches kept in memory for reuse.
+
+A ``BatchRun`` holds everything a batch fetched (results with their page
+bodies, fetch metrics) plus the analysis records computed from it. The
+``RunCache`` keys runs by URL list and fetch settings, so asking for the same
+batch again costs no network, and a different analysis setting re-analyzes
+the stored pages through ``ReplayFetcher`` instead of downloading them again.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from .fetcher import _maybe_await
+from .fetchmetrics import FetchMetrics
+
+DEFAULT_RUN_ENTRIES = 32
+DEFAULT_RUN_BYTES = 256 * 1024 * 1024
+DEFAULT_RUN_TTL = 3600.0
+
+
+def run_key(urls: List[str], settings: Dict[str, Any]) -> str:
+    """Stable key for a URL list (order matters) and JSON-able settings"""
+    payload = json.dumps({'urls': urls, 'settings': settings}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class BatchRun:
+    """Fetch results of one batch and the analyses made from them"""
+
+    def __init__(self, urls: List[str], metrics: FetchMetrics = None):
+        self.urls = urls
+        self.fetches: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+        self.metrics = metrics if metrics is not None else FetchMetrics()
+        # Analysis setting key -> records in input order, None for failures
+        self.analyses: Dict[str, List[Optional[Dict[str, Any]]]] = {}
+        self.created = time.time()
+
+    @property
+    def complete(self) -> bool:
+        return all(fetch is not None for fetch in self.fetches)
+
+    def size(self) -> int:
+        """Approximate memory held, dominated by the page bodies"""
+        return sum(len(fetch.get('html') or '') for fetch in self.fetches if fetch) + 1024 * len(self.urls)
+
+
+class ReplayFetcher:
+    """Stands in for ``AsyncFetcher`` in a pipeline, handing out stored fetch results"""
+
+    def __init__(self, run: BatchRun):
+        self.run = run
+        self.metrics = run.metrics
+
+    async def stream(self, urls, on_result: Callable[[int, str, Dict[str, Any]], Any]):
+        for index, url in enumerate(urls):
+            await _maybe_await(on_result(index, url, self.run.fetches[index]))
+
+
+class RunCache:
+    """
+    LRU of ``BatchRun`` objects bounded by count, approximate bytes and age.
+
+    Safe to share between threads, e.g. between Streamlit sessions.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_RUN_ENTRIES, max_bytes: int = DEFAULT_RUN_BYTES,
+                 ttl: float = DEFAULT_RUN_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._runs: 'OrderedDict[str, BatchRun]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[BatchRun]:
+        with self._lock:
+            run = self._runs.get(key)
+            if run is None:
+                return None
+            if self.ttl and time.time() - run.created > self.ttl:
+                del self._runs[key]
+                return None
+            self._runs.move_to_end(key)
+            return run
+
+    def put(self, key: str, run: BatchRun):
+        """Keep a finished run; interrupted ones are not worth replaying"""
+        if not run.complete:
+            return
+        with self._lock:
+            self._runs[key] = run
+            self._runs.move_to_end(key)
+            total = sum(entry.size() for entry in self._runs.values())
+            while self._runs and (len(self._runs) > self.max_entries or total > self.max_bytes):
+                _, evicted = self._runs.popitem(last=False)
+                total -= evicted.size()
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def clear(self):
+        with self._lock:
+            self._runs.clear()
@@ -0,0 +1,676 @@
+"""
+Document scan shared by every HTMLAnalyzer metric.
+
+``DocumentScan`` walks the document once, in segments from
+``webintel.tokenizer``, and reproduces the non-overlapping, left-to-right
+semantics of the ``re.findall`` calls the analyzers were originally written
+with, so every metric keeps its exact value. Plain tag patterns are counted by
+the regex engine on a case-folded copy of each segment, elements such as
+tables and lists are found by jumping between their opening and closing tags,
+and only the few tags that need more (meta, link, script, style, title) are
+fed to handlers one by one.
+
+Every step is linear in the document: patterns that would backtrack on
+malformed markup (unclosed quotes, stray '<' by the thousand, attributes
+repeated inside one huge tag) are matched with bounded searches that give the
+same result. ``DocumentScan`` also takes a deadline; a walk that runs past it
+stops where it is and the scan describes only the part of the document read.
+"""
+import re
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .body import utf8_size
+from .tokenizer import fold_case, iter_selected_tags, segments, tag_selector
+
+# Start-tag patterns that look at attributes, matched anchored at the tag's
+# '<' and bounded by its '>'. Plain ``<name[^>]*>`` patterns only need the
+# tag name prefix check done by the dispatch table.
+_CSS_LINK_RE = re.compile(r'<link[^>]*rel=["\']stylesheet["\'][^>]*>', re.IGNORECASE)
+_SCRIPT_SRC_RE = re.compile(r'<script[^>]*src=[^>]*>', re.IGNORECASE)
+_JSONLD_RE = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>', re.IGNORECASE)
+
+# Pieces of <meta[^>]*name=["']description["'][^>]*content=["']([^"']*)["'],
+# which backtracks quadratically (or worse) inside long tags when used whole
+_DESCRIPTION_NAME_RE = re.compile(r'name=["\']description["\']', re.IGNORECASE)
+_CONTENT_ATTR_RE = re.compile(r'content=["\']', re.IGNORECASE)
+_QUOTE_RE = re.compile(r'["\']')
+
+_STRIP_TAGS_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
+_DIGIT_RE = re.compile(r'\d+')
+
+# Counted by the regex engine segment by segment rather than tag by tag.
+# Lowercase patterns without re.IGNORECASE run on the case-folded segment.
+_START_TAG_RE = re.compile(r'<(\w+)[^>]*>')
+_TOKEN_RE = re.compile(r'<(?!>)[^>]*>')
+_TOKEN_START_RE = re.compile(r'<(?!>)')
+_PLAIN_TAGS = [(attr, prefix, re.compile('<' + prefix + '[^>]*>')) for attr, prefix in
+               [('images', 'img'), ('forms', 'form'), ('p_tags', 'p'), ('h2_tags', 'h2'), ('h3_tags', 'h3')]]
+# Every tag name prefix a segment pattern or ``_Block`` starts with
+_NAME_PREFIXES = ('img', 'form', 'p', 'h2', 'h3', 'div', 'table', 'ul', 'ol')
+# <div[^>]*class=[^>]*(?:content|text|article)[^>]*>, which backtracks
+# quadratically inside long tags: only the first class= and the first word
+# after it are tried, and a <div that fails takes the rest of its token with
+# it (every later <div there sees a suffix of the same attributes and fails
+# too). Group 1 is empty for those.
+_CONTENT_DIV_RE = re.compile(r'<div(?:(?:(?!class=)[^>])*class=(?:(?!content|text|article)[^>])*'
+                             r'(content|text|article)[^>]*>|[^>]*>)')
+
+# Elements are found with ``_Block``; rows, cells and items are counted
+# inside the text of each table and list
+_ROW_RE = re.compile(r'<tr[^>]*>', re.IGNORECASE)
+_CELL_OPEN_RE = re.compile(r'<(?:td|th)[^>]*>', re.IGNORECASE)
+_CELL_CLOSE_RE = re.compile(r'</(?:td|th)>', re.IGNORECASE)
+_CELL_RE = re.compile(r'<(?:td|th)[^>]*>(.*?)</(?:td|th)>', re.IGNORECASE | re.DOTALL)
+_LAST_CELL_CLOSE_RE = re.compile(r'.*</(?:td|th)>', re.IGNORECASE | re.DOTALL)
+_ITEM_RE = re.compile(r'<li[^>]*>', re.IGNORECASE)
+
+# Characters walked between deadline checks
+SEGMENT_SIZE = 16 * 1024
+
+# Length of the visible-text prefix checked for freshness signals
+EARLY_TEXT_LENGTH = 200
+_EARLY_TEXT_CHUNK = 8192
+
+# Opening patterns match any tag name with the given prefix (``<p[^>]*>``
+# also counts <pre> and <param>); handlers are DocumentScan method names
+_OPEN_PREFIXES = [
+    ('meta', '_on_meta'), ('link', '_on_link'), ('script', '_on_script'),
+    ('style', '_on_style'), ('title', '_on_title'),
+]
+
+# Closing literals such as ``</title>`` need the exact name
+_CLOSE_NAMES = {
+    '/script': ('_on_script_end',), '/style': ('_on_style_end',), '/title': ('_on_title_end',),
+}
+
+# Only tags with handlers are visited; all others are skipped inside the regex engine
+_SELECTOR = tag_selector([prefix for prefix, _ in _OPEN_PREFIXES] + list(_CLOSE_NAMES))
+
+
+def strip_tags(text: str) -> str:
+    """
+    ``re.sub(r'<[^>]+>', '', text)`` in linear time. No tag can start after
+    the last '>', and searching there from every stray '<' is what makes the
+    plain substitution quadratic.
+    """
+    stop = text.rfind('>') + 1
+    return _STRIP_TAGS_RE.sub('', text[:stop]) + text[stop:] if stop else text
+
+
+def _meta_description(html: str, pos: int, end: int) -> Optional[str]:
+    """
+    Group 1 of ``<meta[^>]*name=["']description["'][^>]*content=["']([^"']*)["']``
+    matched at the ``<meta`` at ``pos``.
+
+    The greedy pattern settles on the last ``content=`` quote of the tag that
+    follows some description name and still has a closing quote after it; the
+    value may run past the tag's '>' up to that quote.
+    """
+    name = _DESCRIPTION_NAME_RE.search(html, pos + 5, end - 1)
+    if name is None:
+        return None
+    last = previous = None
+    for attr in _CONTENT_ATTR_RE.finditer(html, name.end(), end - 1):
+        last, previous = attr, last
+    for attr in (last, previous):
+        if attr is None:
+            return None
+        # Only the last one can lack a closing quote; the one before closes at latest on its quote
+        quote = _QUOTE_RE.search(html, attr.end())
+        if quote:
+            return html[attr.end():quote.start()]
+    return None
+
+
+def _table_cells(html: str, start: int, end: int) -> Tuple[int, int]:
+    """
+    Cells of ``<(?:td|th)[^>]*>(.*?)</(?:td|th)>`` in html[start:end] and how
+    many of them contain a digit.
+
+    A cell that finds no closing tag leaves none for any later one either.
+    Ending the range at the last closing tag keeps the regex engine from
+    rescanning the rest of the table from every such '<td'; only ones inside
+    the token that holds that closing tag still would, so a range with a
+    stray '<' there is walked cell by cell instead.
+    """
+    last = _LAST_CELL_CLOSE_RE.match(html, start, end)
+    if last is None:
+        return 0, 0
+    end = last.end()
+    close = end - 5
+    if html.find('<', max(html.rfind('>', start, close) + 1, start), close) == -1:
+        cells = _CELL_RE.findall(html, start, end)
+        return len(cells), len(list(filter(_DIGIT_RE.search, cells)))
+
+    cells = data_cells = 0
+    while True:
+        cell = _CELL_OPEN_RE.search(html, start, end)
+        if cell is None:
+            break
+        close = _CELL_CLOSE_RE.search(html, cell.end(), end)
+        if close is None:
+            break
+        cells += 1
+        if _DIGIT_RE.search(html, cell.end(), close.start()):
+            data_cells += 1
+        start = close.end()
+    return cells, data_cells
+
+
+class _TagCounter:
+    """Counts non-overlapping matches of a ``<name[^>]*>`` style pattern"""
+    __slots__ = ('match', 'count', 'resume', 'failed_end')
+
+    def __init__(self, match: Callable = None):
+        # match(html, pos, end) for patterns that look at attributes
+        self.match = match
+        self.count = 0
+        self.resume = 0
+        # Stray '<' inside a token share its end and see a suffix of the same
+        # attributes, so once a match fails it fails for the rest of the token
+        self.failed_end = -1
+
+    def feed(self, html: str, pos: int, end: int) -> bool:
+        # A match always runs to the token's '>', so at most one per token
+        if pos < self.resume or end == self.failed_end:
+            return False
+        if self.match is None or self.match(html, pos, end):
+            self.count += 1
+            self.resume = end
+            return True
+        self.failed_end = end
+        return False
+
+
+class _Element:
+    """
+    One lazy ``<name[^>]*>(.*?)</name>`` match in progress.
+
+    An opening tag stays pending until the first closing literal after it.
+    If the document ends first the regex would have failed there and at every
+    later opening tag too, so the pending match is simply dropped.
+    """
+    __slots__ = ('start', 'content_start')
+
+    def __init__(self):
+        self.start = -1
+        self.content_start = -1
+
+    def open(self, pos: int, end: int) -> bool:
+        if self.start < 0:
+            self.start = pos
+            self.content_start = end
+            return True
+        return False
+
+    def closes(self, pos: int) -> bool:
+        return self.start >= 0 and pos >= self.content_start
+
+    def reset(self):
+        self.start = -1
+        self.content_start = -1
+
+
+class _Block:
+    """
+    Non-overlapping ``<name[^>]*>(.*?)</name>`` matches. The document is fed
+    one segment at a time; a match still open when a segment ends is carried
+    to the first closing literal of the next, and dropped if the document ends
+    first, as the regex would have failed there and at every later opening tag.
+    """
+    __slots__ = ('names', 'closes', 'open_re', 'close_re', 'block_re', 'start', 'content_start')
+
+    def __init__(self, *names: str):
+        # Lowercase names, matched in case-folded segments
+        self.names = names
+        self.closes = ['</' + name + '>' for name in names]
+        name = '(?:' + '|'.join(names) + ')'
+        self.open_re = re.compile('<' + name + '[^>]*>')
+        self.close_re = re.compile('</' + name + '>')
+        # (.*?)</name> unrolled, so text between tags is one fast run of [^<]
+        self.block_re = re.compile('<' + name + '[^>]*>([^<]*(?:<(?!/' + name + '>)[^<]*)*)</' + name + '>')
+        self.start = -1
+        self.content_start = -1
+
+    def feed(self, folded: str, offset: int, present: Set[str] = None) -> Iterator[Tuple[int, int, int, int]]:
+        """
+        (start, content start, content end, end) in the document of every
+        match that closes in ``folded``, the ``fold_case`` copy of a range
+        from ``segments`` starting at ``offset``. ``present`` holds the tag
+        name prefixes that can match in the range, when known.
+        """
+        pos = 0
+        if self.start >= 0:
+            close = self.close_re.search(folded)
+            if close is None:
+                return
+            yield self.start, self.content_start, offset + close.start(), offset + close.end()
+            self.start = -1
+            pos = close.end()
+        if present is not None and present.isdisjoint(self.names):
+            return
+        opening = self.open_re.search(folded, pos)
+        if opening is None:
+            return
+        # An opening tag before the segment's last closing literal finds a
+        # close, unless that literal ends the tag itself (``<p </p>``), so up
+        # to there the regex engine can only fail inside that last token
+        pos = last = opening.start()
+        for close in self.closes:
+            found = folded.rfind(close, pos)
+            if found >= 0:
+                last = max(last, found + len(close))
+        if last > pos:
+            for match in self.block_re.finditer(folded, pos, last):
+                (start, pos), (content_start, content_end) = match.span(), match.span(1)
+                yield offset + start, offset + content_start, offset + content_end, offset + pos
+            opening = self.open_re.search(folded, pos)
+        if opening is not None:
+            self.start, self.content_start = offset + opening.start(), offset + opening.end()
+
+
+class DocumentScan:
+    """
+    Everything the analyzers need from one walk over a document.
+
+    Attributes are raw counts and extracted fragments; HTMLAnalyzer turns
+    them into the metric dictionaries. If the walk is still running at
+    ``deadline`` (a ``time.perf_counter`` value) it stops there: ``truncated``
+    is set and ``html`` becomes the part of the document that was scanned.
+    """
+
+    def __init__(self, html: str, deadline: float = None):
+        self.html = html
+        self.deadline = deadline
+        self.truncated = False
+
+        # Tag inventory
+        self.tag_counts = Counter()
+        self.markup_tokens = 0
+        self.meta = _TagCounter()
+        self.css_links = _TagCounter(_CSS_LINK_RE.match)
+        self.script_tags = _TagCounter()
+        self.script_src = _TagCounter(_SCRIPT_SRC_RE.match)
+        self.images = _TagCounter()
+        self.forms = _TagCounter()
+        self.p_tags = _TagCounter()
+        self.h2_tags = _TagCounter()
+        self.h3_tags = _TagCounter()
+        self.content_divs = _TagCounter()
+
+        # Scripts and styles
+        self._script = _Element()
+        self._style = _Element()
+        self._jsonld = _Element()
+        # Only for its memo of JSON-LD start tags that did not match
+        self._jsonld_tags = _TagCounter(_JSONLD_RE.match)
+        self.inline_scripts = 0
+        self.inline_js_size = 0
+        self.inline_styles = 0
+        self.script_spans: List[Tuple[int, int]] = []
+        self.jsonld_blocks: List[str] = []
+
+        # Tables
+        self._tables = _Block('table')
+        self.tables = 0
+        self.table_rows = 0
+        self.table_cells = 0
+        self.table_data_cells = 0
+
+        # Paragraphs and headings
+        self._paragraphs = _Block('p')
+        self._headings = _Block('h2', 'h3')
+        self.paragraph_word_counts: List[int] = []
+        self.heading_text: List[str] = []
+
+        # Lists
+        self._lists = (_Block('ul'), _Block('ol'))
+        self.lists = 0
+        self.list_items = 0
+
+        # Freshness signals
+        self._title = _Element()
+        self.title: Optional[str] = None
+        self.meta_description: Optional[str] = None
+        self._meta_checked_end = -1
+        self._early_text: Optional[str] = None
+
+        # Folded tag name -> handlers, filled in lazily during the walk
+        self._handlers: Dict[str, Tuple[Callable, ...]] = {}
+        # (counter, prefix, pattern), and raw tag name -> (its counters, the
+        # _NAME_PREFIXES it starts with)
+        self._plain = [(getattr(self, attr), prefix, pattern) for attr, prefix, pattern in _PLAIN_TAGS]
+        self._prefixes: Dict[str, Tuple[Tuple[_TagCounter, ...], frozenset]] = {}
+
+        self._walk()
+
+    def _handlers_for(self, name: str) -> Tuple[Callable, ...]:
+        # ``name`` comes folded to lowercase from the selector
+        if name.startswith('/'):
+            names = _CLOSE_NAMES.get(name, ())
+        else:
+            names = [handler for prefix, handler in _OPEN_PREFIXES if name.startswith(prefix)]
+        return tuple(getattr(self, handler) for handler in names)
+
+    def _prefixes_for(self, name: str) -> Tuple[Tuple[_TagCounter, ...], frozenset]:
+        folded = fold_case(name)
+        prefixes = frozenset(prefix for prefix in _NAME_PREFIXES if folded.startswith(prefix))
+        return tuple(counter for counter, prefix, _ in self._plain if prefix in prefixes), prefixes
+
+    def _walk(self):
+        html = self.html
+        tag_counts = self.tag_counts
+        handlers = self._handlers
+        known_prefixes = self._prefixes
+        markup_tokens = 0
+        deadline = self.deadline
+        stop = html.rfind('>') + 1
+
+        # The document goes in segments so the deadline costs nothing per tag
+        for start, end in segments(html, SEGMENT_SIZE):
+            folded = fold_case(html, start, end)
+            # Patterns that need no handler only have their matches counted
+            names = Counter(_START_TAG_RE.findall(html, start, end))
+            tag_counts.update(names)
+            tokens = len(_TOKEN_RE.findall(folded))
+            markup_tokens += tokens
+            if folded.count('<') == tokens:
+                # Every '<' starts a token, so each <prefix[^>]*> match is a
+                # start tag that <(\w+)[^>]*> has already named, and a prefix
+                # that no name starts with has no match at all
+                present = set()
+                for name, count in names.items():
+                    try:
+                        counters, prefixes = known_prefixes[name]
+                    except KeyError:
+                        counters, prefixes = known_prefixes[name] = self._prefixes_for(name)
+                    for counter in counters:
+                        counter.count += count
+                    present.update(prefixes)
+            else:
+                present = None
+                for counter, _, pattern in self._plain:
+                    counter.count += len(pattern.findall(folded))
+            if present is None or 'div' in present:
+                content_divs = _CONTENT_DIV_RE.findall(folded)
+                self.content_divs.count += len(content_divs) - content_divs.count('')
+
+            for pos, tag_end, name in iter_selected_tags(folded, _SELECTOR, start):
+                try:
+                    tag_handlers = handlers[name]
+                except KeyError:
+                    tag_handlers = handlers[name] = self._handlers_for(name)
+                for handler in tag_handlers:
+                    handler(pos, tag_end)
+            self._scan_blocks(folded, start, present)
+
+            if deadline is not None and time.perf_counter() > deadline:
+                following = _TOKEN_START_RE.search(html, end, stop)
+                if following is not None:
+                    # Open elements are dropped, as if the document ended here
+                    self.truncated = True
+                    self.html = html[:following.start()]
+                break
+
+        self.markup_tokens = markup_tokens
+
+    def _scan_blocks(self, folded: str, offset: int, present: Optional[Set[str]]):
+        html = self.html
+        for start, _, _, end in self._tables.feed(folded, offset, present):
+            cells, data_cells = _table_cells(html, start, end)
+            self.tables += 1
+            self.table_rows += len(_ROW_RE.findall(html, start, end))
+            self.table_cells += cells
+            self.table_data_cells += data_cells
+        for block in self._lists:
+            for start, _, _, end in block.feed(folded, offset, present):
+                self.lists += 1
+                self.list_items += len(_ITEM_RE.findall(html, start, end))
+        for _, content_start, content_end, _ in self._paragraphs.feed(folded, offset, present):
+            content = strip_tags(html[content_start:content_end])
+            self.paragraph_word_counts.append(len(content.split()))
+        for _, content_start, content_end, _ in self._headings.feed(folded, offset, present):
+            self.heading_text.append(html[content_start:content_end])
+
+    def early_text(self) -> str:
+        """
+        Start of the visible text (at least EARLY_TEXT_LENGTH characters when
+        the page has that many): script blocks, then style blocks, then tags
+        removed and whitespace collapsed.
+
+        The walk has already located the script blocks, so only as much of the
+        document as needed is read again, in chunks.
+        """
+        if self._early_text is None:
+            self._early_text = _visible_text_prefix(self.html, self.script_spans)
+        return self._early_text
+
+    # Opening tags
+
+    def _on_meta(self, pos, end):
+        self.meta.feed(self.html, pos, end)
+        # re.search for the description: the first <meta position that matches.
+        # Later '<meta' in a token that did not match cannot match either.
+        if self.meta_description is None and end != self._meta_checked_end:
+            self._meta_checked_end = end
+            self.meta_description = _meta_description(self.html, pos, end)
+
+    def _on_link(self, pos, end):
+        self.css_links.feed(self.html, pos, end)
+
+    def _on_script(self, pos, end):
+        html = self.html
+        self.script_tags.feed(html, pos, end)
+        self.script_src.feed(html, pos, end)
+        self._script.open(pos, end)
+        if self._jsonld.start < 0 and self._jsonld_tags.feed(html, pos, end):
+            self._jsonld.open(pos, end)
+
+    def _on_style(self, pos, end):
+        self._style.open(pos, end)
+
+    def _on_title(self, pos, end):
+        if self.title is None:
+            self._title.open(pos, end)
+
+    # Closing literals; the token must be exactly </name>
+
+    def _on_script_end(self, pos, end):
+        if end - pos != 9:
+            return
+        if self._script.closes(pos):
+            content_start = self._script.content_start
+            self.inline_scripts += 1
+            self.inline_js_size += utf8_size(self.html, content_start, pos)
+            self.script_spans.append((self._script.start, end))
+            self._script.reset()
+        if self._jsonld.closes(pos):
+            self.jsonld_blocks.append(self.html[self._jsonld.content_start:pos])
+            self._jsonld.reset()
+
+    def _on_style_end(self, pos, end):
+        if end - pos == 8 and self._style.closes(pos):
+            self.inline_styles += 1
+            self._style.reset()
+
+    def _on_title_end(self, pos, end):
+        if end - pos == 8 and self._title.closes(pos):
+            self.title = self.html[self._title.content_start:pos]
+            self._title.reset()
+
+
+def _visible_text_prefix(html: str, script_spans: List[Tuple[int, int]]) -> str:
+    """
+    Streaming equivalent of::
+
+        text = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.I | re.S)
+        text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.I | re.S)
+        text = re.sub(r'<[^>]+>', '', text)
+        re.sub(r'\s+', ' ', text).strip()
+
+    that stops once the first EARLY_TEXT_LENGTH characters can no longer change.
+    The result is only guaranteed to be a prefix of the full visible text.
+    """
+    styles = _ElementStripper('style')
+    tags = _TagStripper()
+    collapser = _WhitespaceCollapser()
+
+    for chunk in _without_spans(html, script_spans):
+        for text in styles.feed(chunk):
+            for visible in tags.feed(text):
+                if collapser.feed(visible):
+                    return collapser.value()
+
+    for text in styles.close():
+        for visible in tags.feed(text):
+            collapser.feed(visible)
+    for visible in tags.close():
+        collapser.feed(visible)
+    return collapser.value()
+
+
+def _without_spans(html: str, spans: List[Tuple[int, int]]) -> Iterator[str]:
+    """Yield the document in bounded chunks, skipping the given spans"""
+    pos = 0
+    for start, end in spans + [(len(html), len(html))]:
+        while pos < start:
+            chunk_end = min(start, pos + _EARLY_TEXT_CHUNK)
+            yield html[pos:chunk_end]
+            pos = chunk_end
+        pos = max(pos, end)
+
+
+class _ElementStripper:
+    """Streaming ``re.sub(r'<name[^>]*>.*?</name>', '', text, flags=re.I | re.S)``"""
+
+    def __init__(self, name: str):
+        self._open = re.compile('<' + name, re.IGNORECASE)
+        self._close = re.compile('</' + name + '>', re.IGNORECASE)
+        self._hold = len(name)
+        self._close_len = len(name) + 3
+        self._text = ''
+        # Chunks of the candidate element while we look for its end
+        self._pending: Optional[List[str]] = None
+        self._in_body = False
+        self._tail = ''
+
+    def feed(self, chunk: str) -> List[str]:
+        out = []
+        while chunk:
+            if self._pending is None:
+                text, chunk = self._text + chunk, ''
+                match = self._open.search(text)
+                if match is None:
+                    # Hold back a possible partial '<name' at the end
+                    keep = text.rfind('<', max(0, len(text) - self._hold))
+                    if keep == -1:
+                        keep = len(text)
+                    out.append(text[:keep])
+                    self._text = text[keep:]
+                else:
+                    out.append(text[:match.start()])
+                    self._text = ''
+                    self._pending = []
+                    self._in_body = False
+                    chunk = text[match.start():]
+
+            elif not self._in_body:
+                # Opening tag runs to the first '>'
+                gt = chunk.find('>')
+                if gt == -1:
+                    self._pending.append(chunk)
+                    chunk = ''
+                else:
+                    self._pending.append(chunk[:gt + 1])
+                    self._in_body = True
+                    self._tail = ''
+                    chunk = chunk[gt + 1:]
+
+            else:
+                text = self._tail + chunk
+                match = self._close.search(text)
+                if match is None:
+                    self._pending.append(chunk)
+                    # Keep enough of the body to spot a closing tag split across chunks
+                    self._tail = text[-(self._close_len - 1):]
+                    chunk = ''
+                else:
+                    # Element removed; scanning resumes after its end
+                    chunk = chunk[match.end() - len(self._tail):]
+                    self._pending = None
+
+        return [text for text in out if text]
+
+    def close(self) -> List[str]:
+        # An element still open at the end never matched, so it stays as text
+        # (and so does anything after it, which could not match either)
+        out = [self._text] + (self._pending or [])
+        self._text = ''
+        self._pending = None
+        return [text for text in out if text]
+
+
+class _TagStripper:
+    """Streaming ``re.sub(r'<[^>]+>', '', text)``"""
+
+    def __init__(self):
+        self._pending: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> List[str]:
+        out = []
+        while chunk:
+            if self._pending is None:
+                lt = chunk.find('<')
+                if lt == -1:
+                    out.append(chunk)
+                    break
+                out.append(chunk[:lt])
+                self._pending = ['<']
+                chunk = chunk[lt + 1:]
+
+            elif self._pending == ['<'] and chunk[0] == '>':
+                # '<>' is not a tag; both characters stay
+                out.append('<')
+                self._pending = None
+
+            else:
+                gt = chunk.find('>')
+                if gt == -1:
+                    self._pending.append(chunk)
+                    break
+                self._pending = None
+                chunk = chunk[gt + 1:]
+
+        return [text for text in out if text]
+
+    def close(self) -> List[str]:
+        out, self._pending = self._pending or [], None
+        return out
+
+
+class _WhitespaceCollapser:
+    """Collapses whitespace runs and leading space until enough text is seen"""
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._length = 0
+        self._trailing_space = False
+
+    def feed(self, text: str) -> bool:
+        """Add text, returning True once the prefix is final"""
+        piece = _WHITESPACE_RE.sub(' ', text)
+        if piece[:1] == ' ' and (self._trailing_space or not self._length):
+            piece = piece[1:]
+        if piece:
+            self._parts.append(piece)
+            self._length += len(piece)
+            self._trailing_space = piece[-1] == ' '
+
+        # Later text can no longer change the first EARLY_TEXT_LENGTH characters
+        return self._length - self._trailing_space >= EARLY_TEXT_LENGTH
+
+    def value(self) -> str:
+        return ''.join(self._parts).rstrip(' ')
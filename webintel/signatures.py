@@ -0,0 +1,122 @@
+"""
+Technology signatures for framework detection.
+
+A signature database lists technologies (frameworks, CMSs, analytics and
+marketing tags, CDNs...) with the literals that give them away in a page's
+source, each with a confidence between 0 and 1. The bundled
+``signatures.json`` covers several hundred; ``WEBINTEL_SIGNATURES`` or
+``load_signatures(path)`` swaps in another file of the same format.
+
+Signatures are lowercase and matched case-insensitively. One starting with a
+letter or digit only matches at the start of a word, so ``vue`` finds
+``vue.min.js`` but not ``revue``. A technology's confidence combines those of
+its matched signatures as independent evidence, ``1 - prod(1 - c)``, and it is
+detected once that reaches the database's threshold.
+
+Every signature goes into one trie-shaped regular expression, tried only
+where a word starts, so a document is scanned once however many signatures
+are loaded.
+"""
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from .tokenizer import trie_pattern
+
+BUNDLED_SIGNATURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'signatures.json')
+DEFAULT_SIGNATURES = os.environ.get('WEBINTEL_SIGNATURES', BUNDLED_SIGNATURES)
+DEFAULT_THRESHOLD = 0.5
+
+# Characters lowercased at a time; the document is never copied whole
+_LOWERCASE_CHUNK = 256 * 1024
+
+
+class Technology(NamedTuple):
+    name: str
+    category: str
+    # Lowercase literal -> confidence that the page uses the technology
+    signatures: Dict[str, float]
+
+
+class SignatureDB:
+    """Compiled signature database; ``match`` scans a document once for all of it"""
+
+    def __init__(self, technologies: Iterable[Technology], threshold: float = DEFAULT_THRESHOLD, version: str = ''):
+        self.technologies = list(technologies)
+        self.threshold = threshold
+        self.version = version
+
+        digest = hashlib.sha256(json.dumps([threshold, self.technologies]).encode('utf-8'))
+        # Identifies the detection rules, for versioning analyses made with them
+        self.digest = digest.hexdigest()[:16]
+
+        # The regex consumes the character before each signature and captures
+        # the rest, so matches are only tried where a word can start. A
+        # signature starting with a letter or digit accepts any such
+        # character; one starting with punctuation needs that exact one.
+        hits: Dict[str, List[Tuple[str, int]]] = {}
+        # (technology index, confidence) of every signature
+        self._signatures: List[Tuple[int, float]] = []
+        for index, technology in enumerate(self.technologies):
+            for signature, confidence in technology.signatures.items():
+                if len(signature) < 2 or signature != signature.lower():
+                    raise ValueError(f"{technology.name}: signatures must be lowercase and at least 2 characters: {signature!r}")
+                if signature[0].isalnum():
+                    hits.setdefault(signature, []).append(('', len(self._signatures)))
+                else:
+                    hits.setdefault(signature[1:], []).append((signature[0], len(self._signatures)))
+                self._signatures.append((index, confidence))
+        self._longest = max((len(tail) + 1 for tail in hits), default=1)
+        self._pattern = re.compile('([^a-z0-9])(?=(' + trie_pattern(hits) + '))') if hits else None
+        # The regex reports the longest match at each position; the shorter
+        # signatures it starts with are there too
+        self._hits: Dict[str, List[Tuple[str, int]]] = {
+            tail: [hit for end in range(1, len(tail) + 1) for hit in hits.get(tail[:end], ())] for tail in hits
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SignatureDB':
+        technologies = [Technology(entry['name'], entry.get('category', ''),
+                                   {signature.lower(): float(confidence) for signature, confidence in entry['signatures'].items()})
+                        for entry in data['technologies']]
+        return cls(technologies, float(data.get('threshold', DEFAULT_THRESHOLD)), str(data.get('version', '')))
+
+    def _found(self, text: str) -> set:
+        """(preceding character, signature tail) pairs present in ``text``"""
+        if self._pattern is None:
+            return set()
+        found = set()
+        overlap = self._longest
+        for pos in range(0, max(len(text), 1), _LOWERCASE_CHUNK):
+            # The document start counts as a word start
+            chunk = text[max(0, pos - overlap):pos + _LOWERCASE_CHUNK].lower() if pos else ' ' + text[:_LOWERCASE_CHUNK].lower()
+            found.update(match.groups() for match in self._pattern.finditer(chunk))
+        return found
+
+    def match(self, text: str) -> Dict[str, float]:
+        """Detected technologies and their confidence, most confident first"""
+        matched = {signature for before, tail in self._found(text)
+                   for required, signature in self._hits[tail] if not required or required == before}
+        # Probability that every matched signature of a technology is a false alarm
+        doubt: Dict[int, float] = {}
+        for signature in matched:
+            index, confidence = self._signatures[signature]
+            doubt[index] = doubt.get(index, 1.0) * (1 - confidence)
+        detected = {index: round(1 - value, 2) for index, value in doubt.items() if round(1 - value, 2) >= self.threshold}
+        return {self.technologies[index].name: detected[index]
+                for index in sorted(detected, key=lambda index: (-detected[index], index))}
+
+
+def load_signatures(path: str = None) -> SignatureDB:
+    """Signature database from a JSON file (default: ``DEFAULT_SIGNATURES``)"""
+    with open(path or DEFAULT_SIGNATURES, encoding='utf-8') as f:
+        return SignatureDB.from_dict(json.load(f))
+
+
+@lru_cache(maxsize=None)
+def default_signatures() -> SignatureDB:
+    """The default database, loaded once per process"""
+    return load_signatures()
@@ -0,0 +1,315 @@
+"""
+Streaming sitemap ingestion.
+
+``SitemapReader`` turns sitemap URLs into page URLs for the batch pipeline.
+Sitemaps are downloaded chunk by chunk and parsed incrementally with
+``XMLPullParser``, so a 50,000-entry sitemap never sits in memory as a whole;
+gzipped files (``.xml.gz``) are decompressed on the fly. Sitemap indexes are
+followed concurrently, entries can be filtered by ``<lastmod>``, and page URLs
+are yielded while the remaining sitemaps are still downloading, so
+``AsyncFetcher.stream`` can start fetching pages right away.
+"""
+import asyncio
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from xml.etree.ElementTree import XMLPullParser
+
+from .bloom import seen_set
+from .body import CHUNK_SIZE
+from .fetcher import normalize_url
+from .pool import AsyncClientPool
+
+DEFAULT_SITEMAP_CONCURRENCY = 4
+# Nested indexes deeper than this are ignored (the protocol allows one level)
+DEFAULT_MAX_INDEX_DEPTH = 3
+# Decompressed size cap per sitemap; the protocol limit is 50 MB
+MAX_SITEMAP_BYTES = 64 * 1024 * 1024
+# Page URLs parsed ahead of the consumer
+OUTPUT_BUFFER = 1024
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_XML_ACCEPT = 'application/xml,text/xml;q=0.9,application/x-gzip;q=0.8,*/*;q=0.5'
+_DONE = object()
+
+
+class SitemapEntry(NamedTuple):
+    loc: str
+    lastmod: Optional[datetime] = None
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """W3C datetime (YYYY, YYYY-MM, YYYY-MM-DD or a full timestamp) as UTC; None if unreadable"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        if len(value) == 4:
+            parsed = datetime(int(value), 1, 1)
+        elif len(value) == 7:
+            parsed = datetime(int(value[:4]), int(value[5:7]), 1)
+        else:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+
+
+def _as_datetime(value: Union[None, str, date, datetime], end: bool = False) -> Optional[datetime]:
+    """Filter bound as UTC; with ``end`` a bare year, month or day covers that whole period"""
+    if value is None or isinstance(value, datetime):
+        return value if value is None or value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, date):
+        value = value.isoformat()
+    parsed = parse_lastmod(value)
+    if parsed is None:
+        raise ValueError(f"Not a date: {value}")
+    period = len(value.strip())
+    if end and period in (4, 7, 10):
+        if period == 4:
+            following = parsed.replace(year=parsed.year + 1)
+        elif period == 7:
+            following = (parsed.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            following = parsed + timedelta(days=1)
+        parsed = following - timedelta(microseconds=1)
+    return parsed
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+class SitemapParser:
+    """
+    Incremental parser for one sitemap document.
+
+    ``feed(chunk)`` returns the entries completed so far as ('url', entry) or
+    ('sitemap', entry) pairs. The document may be gzipped, XML (urlset or
+    sitemapindex) or plain text with one URL per line.
+    """
+
+    def __init__(self, max_bytes: int = MAX_SITEMAP_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._started = False
+        self._inflate = None
+        self._text = None
+        self._xml: Optional[XMLPullParser] = None
+        self._root = None
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, SitemapEntry]]:
+        if not self._started:
+            self._started = True
+            if chunk[:2] == _GZIP_MAGIC:
+                self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._inflate is None:
+            return self._parse(self._count(chunk))
+        # Inflate a chunk at a time: one compressed chunk can expand a hundredfold
+        entries = []
+        while chunk:
+            entries += self._parse(self._count(self._inflate.decompress(chunk, CHUNK_SIZE)))
+            chunk = self._inflate.unconsumed_tail
+        return entries
+
+    def _count(self, data: bytes) -> bytes:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise ValueError(f"Sitemap is larger than {self.max_bytes} bytes")
+        return data
+
+    def close(self) -> List[Tuple[str, SitemapEntry]]:
+        entries = []
+        if self._inflate is not None:
+            entries += self._parse(self._inflate.flush())
+        if self._text is not None:
+            entries += self._lines(final=True)
+        elif self._xml is not None:
+            self._xml.close()
+            entries += self._events()
+        return entries
+
+    def _parse(self, data: bytes) -> List[Tuple[str, SitemapEntry]]:
+        if not data:
+            return []
+        if self._xml is None and self._text is None:
+            # Plain text sitemaps start with the first URL instead of markup
+            if data.lstrip()[:1] in (b'', b'<'):
+                self._xml = XMLPullParser(events=('start', 'end'))
+            else:
+                self._text = b''
+        if self._text is not None:
+            self._text += data
+            return self._lines()
+        self._xml.feed(data)
+        return self._events()
+
+    def _lines(self, final: bool = False) -> List[Tuple[str, SitemapEntry]]:
+        lines = self._text.split(b'\n')
+        self._text = b'' if final else lines.pop()
+        return [('url', SitemapEntry(line.strip().decode('utf-8', 'replace'))) for line in lines if line.strip()]
+
+    def _events(self) -> List[Tuple[str, SitemapEntry]]:
+        entries = []
+        for event, element in self._xml.read_events():
+            if self._root is None:
+                self._root = element
+                continue
+            if event != 'end':
+                continue
+            kind = _local_name(element.tag)
+            if kind not in ('url', 'sitemap'):
+                continue
+            loc = lastmod = None
+            for child in element:
+                name = _local_name(child.tag)
+                if name == 'loc':
+                    loc = (child.text or '').strip()
+                elif name == 'lastmod':
+                    lastmod = parse_lastmod(child.text)
+            if loc:
+                entries.append((kind, SitemapEntry(loc, lastmod)))
+        # Finished entries are not needed again; drop them so memory stays flat
+        if self._root is not None and entries:
+            self._root.clear()
+        return entries
+
+
+class SitemapReader:
+    """
+    Read page URLs from sitemaps and sitemap indexes.
+
+    Up to ``concurrency`` sitemaps download at once. Entries with a
+    ``lastmod`` outside [``since``, ``until``] are skipped, and so are child
+    sitemaps whose index ``lastmod`` is older than ``since``; entries without
+    a date are kept unless ``keep_undated`` is off. URLs are deduplicated and
+    at most ``limit`` are produced. Failed sitemaps are recorded in
+    ``errors`` and counted in ``stats`` without stopping the others.
+    """
+
+    def __init__(self, analyzer=None, timeout: float = 30, concurrency: int = DEFAULT_SITEMAP_CONCURRENCY,
+                 since: Union[None, str, date, datetime] = None, until: Union[None, str, date, datetime] = None,
+                 keep_undated: bool = True, limit: int = None, max_index_depth: int = DEFAULT_MAX_INDEX_DEPTH,
+                 max_bytes: int = MAX_SITEMAP_BYTES, http2: bool = False):
+        self.analyzer = analyzer
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.since = _as_datetime(since)
+        self.until = _as_datetime(until, end=True)
+        self.keep_undated = keep_undated
+        self.limit = limit
+        self.max_index_depth = max_index_depth
+        self.max_bytes = max_bytes
+        self.http2 = http2
+        self.errors: List[Tuple[str, str]] = []
+        self.stats = {'sitemaps': 0, 'failed': 0, 'urls': 0, 'filtered': 0, 'duplicates': 0, 'skipped_sitemaps': 0}
+
+    def wanted(self, entry: SitemapEntry) -> bool:
+        """Whether an entry's lastmod passes the date filter"""
+        if entry.lastmod is None:
+            return self.keep_undated
+        if self.since and entry.lastmod < self.since:
+            return False
+        return not (self.until and entry.lastmod > self.until)
+
+    def _headers(self) -> Dict[str, str]:
+        headers = self.analyzer.get_stealth_headers() if self.analyzer is not None else {}
+        headers['Accept'] = _XML_ACCEPT
+        # httpx decodes gzip transfer encoding; .xml.gz files are inflated by the parser
+        headers['Accept-Encoding'] = 'gzip, deflate'
+        return headers
+
+    def read(self, sources: Iterable[str]) -> List[str]:
+        """Blocking wrapper: every page URL, for callers without an event loop"""
+        async def collect():
+            return [url async for url in self.urls(sources)]
+        return asyncio.run(collect())
+
+    async def urls(self, sources: Iterable[str]) -> AsyncIterator[str]:
+        """Page URLs from ``sources``; can be passed straight to ``AsyncFetcher.stream``"""
+        async for entry in self.entries(sources):
+            yield entry.loc
+
+    async def entries(self, sources: Iterable[str]) -> AsyncIterator[SitemapEntry]:
+        """Page entries from ``sources`` as they are parsed, in no particular order across sitemaps"""
+        output: asyncio.Queue = asyncio.Queue(maxsize=OUTPUT_BUFFER)
+        todo: asyncio.Queue = asyncio.Queue()
+        sitemaps_seen = set()
+        pending = 0
+
+        def enqueue(url: str, depth: int):
+            nonlocal pending
+            url = normalize_url(url)
+            if url not in sitemaps_seen:
+                sitemaps_seen.add(url)
+                pending += 1
+                todo.put_nowait((url, depth))
+
+        for source in sources:
+            enqueue(source, 0)
+        if not pending:
+            return
+
+        async def worker(pool: AsyncClientPool):
+            nonlocal pending
+            while True:
+                url, depth = await todo.get()
+                try:
+                    await self._read_sitemap(pool, url, depth, enqueue, output)
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    self.errors.append((url, str(e) or type(e).__name__))
+                finally:
+                    pending -= 1
+                    if not pending:
+                        await output.put(_DONE)
+
+        # Page URLs are shared across sitemaps, so one seen-set for the whole read
+        seen = seen_set(self.limit or 1_000_000)
+        produced = 0
+        async with AsyncClientPool(timeout=self.timeout, http2=self.http2, connections_per_host=self.concurrency) as pool:
+            workers = [asyncio.ensure_future(worker(pool)) for _ in range(self.concurrency)]
+            try:
+                while self.limit is None or produced < self.limit:
+                    entry = await output.get()
+                    if entry is _DONE:
+                        break
+                    if not seen.add(entry.loc):
+                        self.stats['duplicates'] += 1
+                        continue
+                    produced += 1
+                    self.stats['urls'] += 1
+                    yield entry
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _read_sitemap(self, pool: AsyncClientPool, url: str, depth: int, enqueue, output: asyncio.Queue):
+        parser = SitemapParser(self.max_bytes)
+        async with pool.stream(url, headers=self._headers(), timeout=self.timeout) as response:
+            response.raise_for_status()
+            self.stats['sitemaps'] += 1
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                await self._emit(parser.feed(chunk), depth, enqueue, output)
+        await self._emit(parser.close(), depth, enqueue, output)
+
+    async def _emit(self, entries: List[Tuple[str, SitemapEntry]], depth: int, enqueue, output: asyncio.Queue):
+        for kind, entry in entries:
+            if kind == 'sitemap':
+                # An index's lastmod says when the child sitemap last changed
+                if depth >= self.max_index_depth or (self.since and entry.lastmod and entry.lastmod < self.since):
+                    self.stats['skipped_sitemaps'] += 1
+                else:
+                    enqueue(entry.loc, depth + 1)
+            elif self.wanted(entry):
+                # Blocks while the consumer is behind, which pauses this download
+                await output.put(entry)
+            else:
+                self.stats['filtered'] += 1
+
+
+def format_sitemap_stats(stats: Dict[str, int]) -> str:
+    """One-line sitemap summary for progress output"""
+    return (f"Sitemaps: {stats['sitemaps']} read, {stats['failed']} failed, {stats['skipped_sitemaps']} skipped; "
+            f"{stats['urls']} URLs, {stats['filtered']} outside the lastmod range, {stats['duplicates']} duplicates")
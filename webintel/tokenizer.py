@@ -0,0 +1,171 @@
+"""
+Single-pass markup tokenizer.
+
+The analyzers used to run their own ``re.findall`` over the whole document.
+This module walks the document once and emits a flat event stream that every
+scanner in ``webintel.scan`` consumes together. ``segments`` splits the
+document where no token can cross and ``iter_selected_tags`` emits only the
+events for the tag names a scanner handles, so everything else can be matched
+segment by segment by the regex engine.
+"""
+import re
+from typing import Iterable, Iterator, Pattern, Tuple
+
+# Event kinds
+TEXT = 0    # Text between markup tokens
+TAG = 1     # A ``<...>`` token: start tag, end tag, comment, doctype...
+NESTED = 2  # A stray '<' inside a token (e.g. ``<!-- <meta> -->``), shares the token's end
+
+# A token runs from a '<' to the first '>' after it, exactly like the
+# ``<...[^>]*>`` patterns the analyzers were written against. The groups pick
+# up the raw tag name and whether another '<' appears before the '>'.
+_MARKUP_RE = re.compile(r'<(?!>)(/?\w*)[^<>]*(<)?[^>]*>')
+_TAG_NAME_RE = re.compile(r'/?\w*')
+_NAME_RE = re.compile(r'\w+')
+_ATTR_RE = re.compile(r'([^\s/>="\']+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+
+# ASCII upper case and the non-ASCII characters re.IGNORECASE treats as ASCII
+# letters, folded to lowercase ASCII one character for one
+_CASE_FOLD = str.maketrans({**{chr(code): chr(code + 32) for code in range(ord('A'), ord('Z') + 1)},
+                            '\u0130': 'i', '\u0131': 'i', '\u212a': 'k', '\u017f': 's'})
+
+
+def iter_tags(html: str) -> Iterator[Tuple[int, int, int, str]]:
+    """
+    Yield (kind, start, end, name) for every TAG and NESTED event in order.
+
+    ``start`` is the position of the '<', ``end`` is one past the closing '>'
+    and ``name`` is the raw tag name that follows the '<', with a leading '/'
+    for end tags and empty for comments, doctypes and the like. Offsets index
+    into ``html`` so no text is copied.
+    """
+    # Nothing after the last '>' can form a token; bounding the scan here keeps
+    # a tail full of unterminated '<' from making the walk quadratic
+    stop = html.rfind('>') + 1
+
+    for match in _MARKUP_RE.finditer(html, 0, stop):
+        start, end = match.span()
+        yield TAG, start, end, match.group(1)
+
+        if match.lastindex == 2:
+            inner = match.start(2)
+            while inner != -1:
+                yield NESTED, inner, end, _TAG_NAME_RE.match(html, inner + 1).group()
+                inner = html.find('<', inner + 1, end)
+
+
+def segments(html: str, size: int) -> Iterator[Tuple[int, int]]:
+    """
+    Split the markup part of ``html`` (up to its last '>') into consecutive
+    (start, end) ranges of about ``size`` characters. Every range ends just
+    after a '>', so no token crosses a boundary and ``<...[^>]*>`` patterns
+    matched range by range find exactly what they find in the whole document.
+    """
+    stop = html.rfind('>') + 1
+    start = 0
+    while start < stop:
+        end = html.find('>', min(start + size, stop) - 1) + 1
+        yield start, end
+        start = end
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Regular expression matching any of ``words``, longest first, sharing common prefixes"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # The word ending here is the fallback when no longer one matches
+            return ('(?:' + pattern + ')?') if len(branches) == 1 else pattern + '?'
+        return pattern
+
+    return build(trie)
+
+
+def fold_case(html: str, start: int = 0, end: int = None) -> str:
+    """
+    html[start:end] with ASCII letters, and the non-ASCII characters that
+    re.IGNORECASE equates with them, folded to lowercase one character for
+    one, so every offset stays valid. A lowercase case-sensitive pattern finds
+    in it what the same pattern with re.IGNORECASE finds in the original, and
+    several times faster.
+    """
+    return html[start:end].translate(_CASE_FOLD)
+
+
+def tag_selector(prefixes: Iterable[str]) -> Pattern:
+    """
+    Pattern for ``iter_selected_tags`` accepting tag names that start with one
+    of the lowercase ``prefixes`` (end tags with their '/').
+    """
+    # Group 2 is the token's '>' when no stray '<' comes first
+    return re.compile(r'<(' + trie_pattern(prefixes) + r'\w*)[^<>]*(>)?')
+
+
+def iter_selected_tags(folded: str, selector: Pattern, offset: int = 0) -> Iterator[Tuple[int, int, str]]:
+    """
+    Yield (start, end, name) for the TAG and NESTED events of ``iter_tags``
+    whose name ``selector`` (from ``tag_selector``) accepts, ignoring case.
+    ``folded`` is the ``fold_case`` copy of a range from ``segments`` that
+    starts at ``offset``; positions are in the whole document and names come
+    folded. The other tokens are skipped by the regex engine without a
+    Python step each.
+    """
+    token_end = -1
+    for match in selector.finditer(folded):
+        pos = match.start()
+        if match.lastindex == 2:
+            token_end = match.end()
+        elif pos >= token_end:
+            # Stray '<' before the '>'; ones after it inside the same token reuse the end
+            token_end = folded.find('>', pos) + 1
+        yield offset + pos, offset + token_end, match.group(1)
+
+
+def iter_tokens(html: str) -> Iterator[Tuple[int, int, int, str]]:
+    """
+    Yield (kind, start, end, name) events covering the whole document in order.
+
+    Tags are reported as by ``iter_tags``; the text between them comes as TEXT
+    events with an empty name. ``<>`` is not a tag and stays inside the text,
+    as does anything after the last '>' in the document.
+    """
+    text_start = 0
+    for kind, start, end, name in iter_tags(html):
+        if kind == TAG:
+            if start > text_start:
+                yield TEXT, text_start, start, ''
+            text_start = end
+        yield kind, start, end, name
+
+    if text_start < len(html):
+        yield TEXT, text_start, len(html), ''
+
+
+def tag_name(html: str, start: int) -> str:
+    """Return the tag name of the token starting at ``start`` (lowercase, without '/')"""
+    return _TAG_NAME_RE.match(html, start + 1).group().lstrip('/').lower()
+
+
+def tag_attributes(html: str, start: int, end: int) -> dict:
+    """Parse the attributes of the start tag spanning html[start:end]"""
+    name = _NAME_RE.match(html, start + 1)
+    if not name:
+        return {}
+
+    attrs = {}
+    for key, value in _ATTR_RE.findall(html, name.end(), end - 1):
+        if value[:1] in ('"', "'"):
+            value = value[1:-1]
+        attrs.setdefault(key.lower(), value)
+    return attrs
+